@@ -0,0 +1,421 @@
+"""
+Command line interface, run with `python -m agf_toolkit`.
+
+Every command imports what it needs when it runs, so `--help`, the codec commands and cached calibrations start without
+loading OpenCV, scikit-image or the OCR model.
+"""
+# pylint: disable=import-outside-toplevel
+import argparse
+import json
+import os
+import sys
+from collections.abc import Iterable, Iterator
+
+from agf_toolkit import __description__, __version__
+
+LOGGING_LEVELS = ("TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL")
+
+
+def _configure_logging(level: str) -> None:
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+
+
+def _iter_inputs(values: list[str]) -> Iterator[str]:
+    """Yield the command line values, or the non-empty lines of stdin if none were given."""
+    if values:
+        yield from values
+    else:
+        yield from (line.strip() for line in sys.stdin if line.strip())
+
+
+def _resolve_scaling_factor(args: argparse.Namespace) -> float | None:
+    """Return the scaling factor given on the command line, or the cached one of the profile."""
+    from loguru import logger
+
+    from agf_toolkit.utils.cache import get_scaling_factor
+
+    if args.scaling_factor is not None:
+        return args.scaling_factor
+
+    profile = _profile(args)
+    if (scaling_factor := get_scaling_factor(profile)) is None:
+        logger.warning(f"Profile {profile!r} isn't calibrated. Screenshots must match the template geometry.")
+    return scaling_factor
+
+
+def _profile(args: argparse.Namespace) -> str:
+    """Return the calibration profile: the one given, else the device's identifier, else the default one."""
+    from agf_toolkit.utils.cache import DEFAULT_PROFILE
+
+    return args.profile or getattr(args, "device", None) or DEFAULT_PROFILE
+
+
+def _get_device(identifier: str | None):
+    """Connect to the device given on the command line, or the configured one."""
+    from agf_toolkit.utils import adb
+
+    return adb.connect(identifier) if identifier else adb.get_device()
+
+
+def _print_gears(gears: Iterable, output_format: str) -> None:
+    """Print gears as they come."""
+    for gear in gears:
+        print(json.dumps(gear.as_dict()) if output_format == "json" else gear.encode(), flush=True)
+
+
+def calibrate(args: argparse.Namespace) -> None:
+    """Calibrate the scaling factor of a profile and cache it."""
+    from agf_toolkit.utils.cache import get_scaling_factor, save_scaling_factor
+
+    profile = _profile(args)
+    if not args.force and (scaling_factor := get_scaling_factor(profile)) is not None:
+        print(scaling_factor)
+        return
+
+    import cv2
+
+    from agf_toolkit.processor.calibration import (
+        calibrate_scale,
+        calibrate_scale_by_features,
+    )
+
+    if args.file is not None:
+        if (screenshot := cv2.imread(args.file)) is None:
+            raise SystemExit(f"Failed to read {args.file}.")
+    else:
+        screenshot = _get_device(args.device).screenshot()
+
+    scaling_factor = (
+        calibrate_scale_by_features(screenshot) if args.method == "features" else calibrate_scale(screenshot)
+    )
+    save_scaling_factor(scaling_factor, profile)
+    print(scaling_factor)
+
+
+def parse_files(args: argparse.Namespace) -> None:
+    """Parse screenshot files in order, streaming the gears out."""
+    from contextlib import nullcontext
+
+    from agf_toolkit.processor.gear import Gear
+    from agf_toolkit.processor.transcript import TranscriptStore
+    from agf_toolkit.processor.utils import parse_transcript, transcribe_screenshot
+    from agf_toolkit.utils.loader import iter_images
+    from agf_toolkit.utils.writer import GearWriter
+
+    scaling_factor = _resolve_scaling_factor(args)
+
+    def _parse(files: list[str]) -> Iterator:
+        with TranscriptStore(args.transcripts) if args.transcripts else nullcontext() as store:
+            for path, image, remaining_scaling_factor in iter_images(files, scaling_factor, workers=args.workers):
+                if image is None:
+                    yield Gear()
+                    continue
+                transcript = transcribe_screenshot(image, scaling_factor=remaining_scaling_factor)
+                if store is not None:
+                    store.add(path, transcript)
+                yield parse_transcript(transcript)
+
+    if args.output is None:
+        _print_gears(_parse(args.files), args.format)
+        return
+
+    with GearWriter(args.output, args.format, resume=args.resume) as writer:
+        # Files written before the last checkpoint aren't even decoded
+        for gear in _parse(args.files[writer.completed :]):
+            writer.write(gear)
+
+
+def parse_screen(args: argparse.Namespace) -> None:
+    """Capture and parse the device's screen each time the user asks to."""
+    from agf_toolkit.processor.utils import parse_screenshot
+    from agf_toolkit.utils.writer import GearWriter
+
+    device = _get_device(args.device)
+    scaling_factor = _resolve_scaling_factor(args)
+
+    def _capture() -> Iterator:
+        while True:
+            # Prompt on stderr, so printed gears can be piped
+            print("Press Enter to capture, or type q to quit: ", end="", file=sys.stderr, flush=True)
+            if input().strip().lower() == "q":
+                return
+            yield parse_screenshot(device.screenshot(), scaling_factor=scaling_factor)
+
+    if args.output is None:
+        _print_gears(_capture(), args.format)
+        return
+
+    # Gears of earlier sessions are kept
+    with GearWriter(args.output, args.format, flush_every=1, append=True) as writer:
+        for gear in _capture():
+            writer.write(gear)
+
+
+def parse_video(args: argparse.Namespace) -> None:
+    """Parse every distinct gear shown in a screen recording."""
+    from agf_toolkit.utils.recording import ingest_recording
+    from agf_toolkit.utils.writer import GearWriter
+
+    scaling_factor = _resolve_scaling_factor(args)
+    gears = (gear for _, gear in ingest_recording(args.video, scaling_factor, stride=args.stride))
+
+    if args.output is None:
+        _print_gears(gears, args.format)
+        return
+
+    with GearWriter(args.output, args.format) as writer:
+        for gear in gears:
+            writer.write(gear)
+
+
+def record(args: argparse.Namespace) -> None:
+    """Record the device's screen to a frame archive, for `benchmark`."""
+    from agf_toolkit.utils.replay import record_session
+
+    record_session(
+        _get_device(args.device), args.output, interval=args.interval, max_frames=args.frames, duration=args.duration
+    )
+
+
+def benchmark(args: argparse.Namespace) -> None:
+    """Replay a recorded session through capture, dedup and parsing, and print the time spent in each."""
+    from agf_toolkit.utils.farm import parse_image
+    from agf_toolkit.utils.replay import benchmark_replay
+
+    results = benchmark_replay(
+        args.archive,
+        speed=args.speed or None,
+        parser=None if args.no_parse else parse_image,
+        scaling_factor=None if args.no_parse else _resolve_scaling_factor(args),
+    )
+    print(json.dumps(results, indent=2))
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the resident parse daemon."""
+    from agf_toolkit.utils.daemon import serve as serve_daemon
+
+    serve_daemon(args.socket or (args.host, args.port), max_parses=args.max_parses, path_root=args.path_root)
+
+
+def reparse(args: argparse.Namespace) -> None:
+    """Derive gears again from stored transcripts, without OCR."""
+    from loguru import logger
+
+    from agf_toolkit.processor.gear import Gear
+    from agf_toolkit.processor.transcript import TranscriptStore
+    from agf_toolkit.processor.utils import parse_transcript
+    from agf_toolkit.utils.writer import GearWriter
+
+    def _parse() -> Iterator:
+        # A resumed parse-files run transcribes again the files after its last checkpoint, so the last transcript of a
+        # source wins, in the order sources were first seen
+        transcripts = dict(TranscriptStore(args.transcripts))
+        for source, transcript in transcripts.items():
+            try:
+                yield parse_transcript(transcript)
+            except (RuntimeError, ValueError) as exc:
+                # A placeholder, like parse-files, so outputs line up
+                logger.error(f"Failed to parse the transcript of {source}: {exc}")
+                yield Gear()
+
+    if args.output is None:
+        _print_gears(_parse(), args.format)
+        return
+
+    with GearWriter(args.output, args.format) as writer:
+        for gear in _parse():
+            writer.write(gear)
+
+
+def encode(args: argparse.Namespace) -> None:
+    """Encode JSON gears, as output by `decode` or the parsers. Malformed gears are reported and skipped."""
+    from agf_toolkit.processor.gear import Gear
+
+    for value in _iter_inputs(args.gears):
+        try:
+            print(Gear.from_dict(json.loads(value)).encode())
+        except (KeyError, TypeError, ValueError) as exc:
+            print(f"Failed to encode {value!r}: {exc!r}", file=sys.stderr)
+
+
+def decode(args: argparse.Namespace) -> None:
+    """Decode encoded gear strings into JSON objects. Malformed strings are reported and skipped."""
+    from agf_toolkit.processor.gear import Gear
+
+    for value in _iter_inputs(args.gears):
+        try:
+            print(json.dumps(Gear.decode(value).as_dict()))
+        except ValueError as exc:
+            print(f"Failed to decode {value!r}: {exc!r}", file=sys.stderr)
+
+
+def _shared_options() -> dict[str, argparse.ArgumentParser]:
+    """Build the parent parsers of options shared by several commands."""
+    calibration_options = argparse.ArgumentParser(add_help=False)
+    calibration_options.add_argument("--profile", help="Calibration profile. Defaults to the device, or 'default'.")
+    device_options = argparse.ArgumentParser(add_help=False)
+    device_options.add_argument("--device", help="Serial number or host:port of the device. Defaults to IP and PORT.")
+    scaling_options = argparse.ArgumentParser(add_help=False)
+    scaling_options.add_argument("--scaling-factor", type=float, help="Scaling factor, overriding the profile's.")
+    output_options = argparse.ArgumentParser(add_help=False)
+    output_options.add_argument("--format", choices=("json", "encoded"), default="json", help="Output format.")
+    output_options.add_argument("-o", "--output", help="Output file. Gears are printed if not given.")
+    return {
+        "calibration": calibration_options,
+        "device": device_options,
+        "scaling": scaling_options,
+        "output": output_options,
+    }
+
+
+def _add_calibrate_command(commands, options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser(
+        "calibrate",
+        parents=[options["calibration"], options["device"]],
+        help="Calibrate the toolkit before parsing (default: using Android Debug Bridge).",
+    )
+    command.add_argument("--file", help="Calibrate against a screenshot file instead of the device's screen.")
+    command.add_argument("--method", choices=("features", "sweep"), default="features", help="Calibration method.")
+    command.add_argument("--force", action="store_true", help="Calibrate again even if the profile is cached.")
+    command.set_defaults(handler=calibrate)
+
+
+def _add_parse_files_command(commands, options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser(
+        "parse-files",
+        parents=[options["calibration"], options["scaling"], options["output"]],
+        help="Parse screenshots. Multiple files can be provided to parse at once.",
+    )
+    command.add_argument("files", nargs="+", help="Screenshot files.")
+    command.add_argument("--resume", action="store_true", help="Resume an interrupted run writing to --output.")
+    command.add_argument("--workers", type=int, default=4, help="Number of image decoding threads.")
+    command.add_argument("--transcripts", help="Append the raw OCR transcripts to this file, for `reparse`.")
+    command.set_defaults(handler=parse_files)
+
+
+def _add_parse_screen_command(commands, options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser(
+        "parse-screen",
+        parents=[options["calibration"], options["device"], options["scaling"], options["output"]],
+        help="Start a live parsing session using Android Debug Bridge.",
+    )
+    command.set_defaults(handler=parse_screen)
+
+
+def _add_parse_video_command(commands, options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser(
+        "parse-video",
+        parents=[options["calibration"], options["scaling"], options["output"]],
+        help="Parse a screen recording of the inventory, e.g. made with `adb shell screenrecord`.",
+    )
+    command.add_argument("video", help="Video file.")
+    command.add_argument("--stride", type=int, default=1, help="Only decode every n-th frame of the recording.")
+    command.set_defaults(handler=parse_video)
+
+
+def _add_record_command(commands, options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser(
+        "record",
+        parents=[options["device"]],
+        help="Record the device's screen to a frame archive, to benchmark with later.",
+    )
+    command.add_argument("output", help="Archive file.")
+    command.add_argument("--interval", type=float, default=0.5, help="Minimum seconds between two screenshots.")
+    command.add_argument("--frames", type=int, help="Stop after this many frames.")
+    command.add_argument("--duration", type=float, help="Stop after this many seconds.")
+    command.set_defaults(handler=record)
+
+
+def _add_benchmark_command(commands, options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser(
+        "benchmark",
+        parents=[options["calibration"], options["scaling"]],
+        help="Time capture, dedup and parsing over a recorded session, without a device.",
+    )
+    command.add_argument("archive", help="Archive file made by record.")
+    command.add_argument(
+        "--speed", type=float, default=0, help="Playback speed relative to the recording. 0 serves frames at once."
+    )
+    command.add_argument("--no-parse", action="store_true", help="Stop after dedup.")
+    command.set_defaults(handler=benchmark)
+
+
+def _add_reparse_command(commands, options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser(
+        "reparse",
+        parents=[options["output"]],
+        help="Derive gears again from transcripts stored by parse-files, without OCR.",
+    )
+    command.add_argument("transcripts", help="Transcript file.")
+    command.set_defaults(handler=reparse)
+
+
+def _add_serve_command(commands, _options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser("serve", help="Run a resident parse daemon, keeping the OCR model loaded.")
+    command.add_argument("--host", default="127.0.0.1", help="Host to listen on.")
+    command.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    command.add_argument("--socket", help="Listen on this Unix socket instead of a TCP port.")
+    command.add_argument("--max-parses", type=int, default=1, help="Maximum number of screenshots parsed at once.")
+    command.add_argument(
+        "--path-root", help="Read screenshots by path under this directory. Without it, only over --socket."
+    )
+    command.set_defaults(handler=serve)
+
+
+def _add_encode_command(commands, _options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser("encode", help="Encode JSON gears. Reads lines from stdin if none are given.")
+    command.add_argument("gears", nargs="*", help="Gears as JSON objects.")
+    command.set_defaults(handler=encode)
+
+
+def _add_decode_command(commands, _options: dict[str, argparse.ArgumentParser]) -> None:
+    command = commands.add_parser("decode", help="Decode encoded gears. Reads lines from stdin if none are given.")
+    command.add_argument("gears", nargs="*", help="Encoded gear strings.")
+    command.set_defaults(handler=decode)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser. No command module is imported here."""
+    parser = argparse.ArgumentParser(prog="python -m agf_toolkit", description=__description__)
+    parser.add_argument("--version", action="version", version=__version__)
+    parser.add_argument(
+        "--log-level",
+        choices=LOGGING_LEVELS,
+        type=str.upper,
+        default=os.environ.get("LOGGING_LEVEL") or "INFO",
+        help="Logging level. Defaults to the LOGGING_LEVEL environment variable, or INFO.",
+    )
+    commands = parser.add_subparsers(title="commands", required=True, metavar="COMMAND")
+    options = _shared_options()
+    for add_command in (
+        _add_calibrate_command,
+        _add_parse_files_command,
+        _add_parse_screen_command,
+        _add_parse_video_command,
+        _add_record_command,
+        _add_benchmark_command,
+        _add_reparse_command,
+        _add_serve_command,
+        _add_encode_command,
+        _add_decode_command,
+    ):
+        add_command(commands, options)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the command line interface."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "resume", False) and args.output is None:
+        parser.error("--resume needs the --output of the interrupted run.")
+    _configure_logging(args.log_level)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import sys
 from abc import ABC, abstractmethod
 from collections.abc import Sequence
-from typing import overload
+from typing import NamedTuple, overload
 
 
 class Encodable(ABC):
@@ -11,6 +11,10 @@ class Encodable(ABC):
     def __eq__(self, other):
         ...
 
+    @abstractmethod
+    def __hash__(self):
+        ...
+
     @abstractmethod
     def as_dict(self) -> dict:
         """Return a dictionary representation of the object."""
@@ -36,3 +40,38 @@ class Encodable(ABC):
 
         Method is overloaded to accept either a string, or a collection of strings.
         """
+
+
+class OCRLine(NamedTuple):
+    """A recognised line of text, with its bounding box (left, top, right, bottom) in the image."""
+
+    text: str
+    box: tuple[int, int, int, int]
+    confidence: float
+
+
+class OCRBackend(ABC):
+    """Base class for all OCR backends."""
+
+    def read(self, image) -> list[OCRLine]:
+        """
+        Detect and recognise the text lines of an image.
+
+        Backends without text detection treat the whole image as a single line.
+        """
+        image_h, image_w = image.shape[:2]
+        text, confidence = self.recognise_lines([image])[0]
+        return [OCRLine(text, (0, 0, image_w, image_h), confidence)] if text else []
+
+    def recognise(self, image) -> str:
+        """Recognise all text in an image, with lines joined by spaces."""
+        return " ".join(line.text for line in self.read(image))
+
+    @abstractmethod
+    def recognise_lines(self, images: Sequence) -> list[tuple[str, float]]:
+        """
+        Recognise a batch of images each holding a single line of text.
+
+        :param images: The line images.
+        :return: The text and confidence (between 0 and 1) of each line, in the same order.
+        """
@@ -0,0 +1,175 @@
+import hashlib
+import json
+from collections.abc import Iterable, Iterator
+from os import PathLike
+from pathlib import Path
+
+from loguru import logger
+
+from agf_toolkit import DATA_DIR
+from agf_toolkit.processor.gear import Gear, Stat
+
+INVENTORY_PATH = DATA_DIR / "inventory.txt"
+
+
+def fingerprint(gear: Gear) -> str:
+    """
+    Return the canonical fingerprint of a gear.
+
+    The fingerprint is a digest of `Gear.encode()`, which is already canonical since every value is validated and
+    mapped before encoding. Two gears have the same fingerprint if and only if they are equal.
+    """
+    return hashlib.blake2b(gear.encode().encode(), digest_size=12).hexdigest()
+
+
+def _numeric(stat: Stat) -> float:
+    """Return the stat value as a number, regardless of it being a flat value or a percentage."""
+    if stat.stat_value is None:
+        return float("-inf")
+    return float(str(stat.stat_value).rstrip("%"))
+
+
+def is_upgrade(old: Gear, new: Gear) -> bool:
+    """
+    Check whether `new` could be `old` after enhancement.
+
+    Enhancing keeps the gear set, gear type and main stat type, never lowers any value, and only ever appends new sub
+    stats after the existing ones.
+    """
+    if (old.gear_set, old.gear_type, old.main_stat.stat_type) != (new.gear_set, new.gear_type, new.main_stat.stat_type):
+        return False
+    if (old.gear_star or 0) > (new.gear_star or 0) or len(old.sub_stats) > len(new.sub_stats):
+        return False
+    if _numeric(old.main_stat) > _numeric(new.main_stat):
+        return False
+
+    return all(
+        old_stat.stat_type == new_stat.stat_type and _numeric(old_stat) <= _numeric(new_stat)
+        for old_stat, new_stat in zip(old.sub_stats, new.sub_stats)
+    )
+
+
+class InventoryDiff:
+    """Represents the changes between two inventory snapshots."""
+
+    def __init__(self, added: list[Gear], removed: list[Gear], upgraded: list[tuple[Gear, Gear]]) -> None:
+        """
+        Initialise an InventoryDiff object.
+
+        :param added: Gears only found in the current snapshot.
+        :param removed: Gears only found in the previous snapshot.
+        :param upgraded: Pairs of (previous, current) gears where the current one is the previous one enhanced.
+        """
+        self.added = added
+        self.removed = removed
+        self.upgraded = upgraded
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.upgraded)
+
+    def __repr__(self) -> str:
+        return f"InventoryDiff(added={self.added !r}, removed={self.removed !r}, upgraded={self.upgraded !r})"
+
+    def as_dict(self) -> dict:
+        """Return the diff as a dictionary of encoded gears."""
+        return {
+            "added": [gear.encode() for gear in self.added],
+            "removed": [gear.encode() for gear in self.removed],
+            "upgraded": [[old.encode(), new.encode()] for old, new in self.upgraded],
+        }
+
+    def export(self, path: str | PathLike) -> None:
+        """Write the diff to a JSON file, so only the delta has to be shipped downstream."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.as_dict(), file, indent=2)
+
+
+class InventoryIndex:
+    """
+    A persistent set of gears keyed by fingerprint.
+
+    Adding a gear already in the index is a no-op, so repeated captures of the same piece are deduplicated. Note that
+    this also means two truly identical pieces are indexed once, as they can't be told apart from their info boxes.
+    """
+
+    def __init__(self, gears: Iterable[Gear] = ()) -> None:
+        self._gears: dict[str, Gear] = {}
+        self.update(gears)
+
+    def __len__(self) -> int:
+        return len(self._gears)
+
+    def __iter__(self) -> Iterator[Gear]:
+        return iter(self._gears.values())
+
+    def __contains__(self, gear: object) -> bool:
+        return isinstance(gear, Gear) and fingerprint(gear) in self._gears
+
+    def add(self, gear: Gear) -> bool:
+        """Add a gear to the index. Return `False` if it was already indexed."""
+        if (key := fingerprint(gear)) in self._gears:
+            logger.debug(f"Duplicate gear {key} skipped.")
+            return False
+        self._gears[key] = gear
+        return True
+
+    def update(self, gears: Iterable[Gear]) -> int:
+        """Add multiple gears to the index. Return the number of gears that were not already indexed."""
+        return sum(self.add(gear) for gear in gears)
+
+    def discard(self, gear: Gear) -> None:
+        """Remove a gear from the index if it's present."""
+        self._gears.pop(fingerprint(gear), None)
+
+    def diff(self, previous: "InventoryIndex") -> InventoryDiff:
+        """
+        Diff this index against a previous snapshot.
+
+        Gears are first compared by fingerprint. The leftovers on both sides are then paired up as upgrades where the
+        current gear is a possible enhancement of the previous one (see `is_upgrade`).
+
+        :param previous: The previous snapshot.
+        :return: The changes from `previous` to this index.
+        """
+        added = [gear for gear in self if gear not in previous]
+        removed = [gear for gear in previous if gear not in self]
+
+        upgraded = []
+        for old in list(removed):
+            if (new := next((gear for gear in added if is_upgrade(old, gear)), None)) is not None:
+                upgraded.append((old, new))
+                removed.remove(old)
+                added.remove(new)
+
+        logger.info(f"Inventory diff: {len(added)} added, {len(removed)} removed, {len(upgraded)} upgraded.")
+        return InventoryDiff(added, removed, upgraded)
+
+    def save(self, path: str | PathLike = INVENTORY_PATH) -> None:
+        """Save the index as encoded gears, one per line."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.writelines(f"{gear.encode()}\n" for gear in self)
+
+    @classmethod
+    def load(cls, path: str | PathLike = INVENTORY_PATH) -> "InventoryIndex":
+        """Load an index saved by `save()`. A missing file loads as an empty index."""
+        if not Path(path).exists():
+            logger.info(f"No inventory snapshot found at {path}. Starting afresh.")
+            return cls()
+        with open(path, encoding="utf-8") as file:
+            return cls(Gear.decode(line) for line in file if line.strip())
+
+
+def sync(gears: Iterable[Gear], path: str | PathLike = INVENTORY_PATH) -> InventoryDiff:
+    """
+    Diff freshly captured gears against the saved snapshot, then replace the snapshot with them.
+
+    :param gears: All gears captured in the current session. Duplicated captures are fine.
+    :param path: Path to the snapshot.
+    :return: The changes since the saved snapshot.
+    """
+    previous = InventoryIndex.load(path)
+    current = InventoryIndex(gears)
+    inventory_diff = current.diff(previous)
+    current.save(path)
+    return inventory_diff
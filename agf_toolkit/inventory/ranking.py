@@ -0,0 +1,182 @@
+"""
+Weighted top-k ranking of the inventory.
+
+Every gear is stored once as a row of stat totals, one column per stat type, next to its encoded gear set, gear type and
+star count. A query only builds a small weight vector, scores the rows matching its filters in one matrix product and
+selects the best `k` without sorting the rest. Gears are added and removed in place as they are parsed.
+"""
+from collections.abc import Iterable, Iterator, Mapping
+from typing import cast
+
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.inventory.index import InventoryDiff, fingerprint
+from agf_toolkit.processor.constant import (
+    GEAR_TYPE_MAPPING,
+    SET_NAME_MAPPING,
+    STAT_TYPE_MAPPING,
+)
+from agf_toolkit.processor.gear import Gear
+
+STAT_TYPES = tuple(stat_type for stat_type in STAT_TYPE_MAPPING if stat_type is not None)
+_STAT_COLUMNS = {stat_type: i for i, stat_type in enumerate(STAT_TYPES)}
+_INITIAL_CAPACITY = 64
+
+
+def stat_vector(gear: Gear) -> np.ndarray[int, np.dtype[np.float64]]:
+    """Return the total value of each stat type of a gear, main stat included, in `STAT_TYPES` order."""
+    vector = np.zeros(len(STAT_TYPES))
+    for stat in (gear.main_stat, *gear.sub_stats):
+        if stat.stat_type is not None and stat.stat_value is not None:
+            vector[_STAT_COLUMNS[stat.stat_type]] += float(str(stat.stat_value).rstrip("%"))
+    return vector
+
+
+class GearRanking:  # pylint: disable=too-many-instance-attributes
+    """
+    Rank gears by a weighted sum of their normalised stats.
+
+    Stats are normalised by the highest total of their type seen so far, so a weight of 1 on two stat types values the
+    best CRIT DMG and the best SPD in the inventory equally. Scales only ever grow: removing a gear never rescales the
+    others. Like `InventoryIndex`, gears are deduplicated by fingerprint.
+    """
+
+    def __init__(self, gears: Iterable[Gear] = ()) -> None:
+        self._stats = np.zeros((_INITIAL_CAPACITY, len(STAT_TYPES)), dtype=np.float32)
+        # Encoded gear set, gear type and star count, for filtering
+        self._codes = np.full((_INITIAL_CAPACITY, 3), -1, dtype=np.int16)
+        self._alive = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        # Running count of additions when each slot was filled, to break ties
+        self._added = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._additions = 0
+        self._scales = np.zeros(len(STAT_TYPES), dtype=np.float32)
+        self._gears: list[Gear | None] = []
+        self._slots: dict[str, int] = {}
+        self._free_slots: list[int] = []
+        self.update(gears)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __iter__(self) -> Iterator[Gear]:
+        return (gear for gear in self._gears if gear is not None)
+
+    def __contains__(self, gear: object) -> bool:
+        return isinstance(gear, Gear) and fingerprint(gear) in self._slots
+
+    def _grow(self) -> None:
+        """Double the capacity of the arrays."""
+        capacity = 2 * len(self._alive)
+        self._stats = np.resize(self._stats, (capacity, len(STAT_TYPES)))
+        self._codes = np.resize(self._codes, (capacity, 3))
+        self._added = np.resize(self._added, capacity)
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+
+    def add(self, gear: Gear) -> bool:
+        """Add a gear to the ranking. Return `False` if it was already ranked."""
+        if (key := fingerprint(gear)) in self._slots:
+            return False
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._gears[slot] = gear
+        else:
+            slot = len(self._gears)
+            if slot == len(self._alive):
+                self._grow()
+            self._gears.append(gear)
+
+        vector = stat_vector(gear)
+        self._stats[slot] = vector
+        self._codes[slot] = (
+            SET_NAME_MAPPING[gear.gear_set],
+            GEAR_TYPE_MAPPING[gear.gear_type],
+            -1 if gear.gear_star is None else gear.gear_star,
+        )
+        self._alive[slot] = True
+        self._added[slot] = self._additions
+        self._additions += 1
+        np.maximum(self._scales, vector, out=self._scales)
+        self._slots[key] = slot
+        return True
+
+    def update(self, gears: Iterable[Gear]) -> int:
+        """Add multiple gears to the ranking. Return the number of gears that were not already ranked."""
+        return sum(self.add(gear) for gear in gears)
+
+    def discard(self, gear: Gear) -> None:
+        """Remove a gear from the ranking if it's present."""
+        if (slot := self._slots.pop(fingerprint(gear), None)) is not None:
+            self._alive[slot] = False
+            self._gears[slot] = None
+            self._free_slots.append(slot)
+
+    def apply(self, diff: InventoryDiff) -> None:
+        """Apply the changes between two inventory snapshots, as returned by `InventoryIndex.diff`."""
+        for gear in diff.removed:
+            self.discard(gear)
+        for old, new in diff.upgraded:
+            self.discard(old)
+            self.add(new)
+        self.update(diff.added)
+
+    # pylint: disable=too-many-arguments
+    def top_k(
+        self,
+        weights: Mapping[str, float],
+        k: int = 20,
+        gear_set: str | None = None,
+        gear_type: str | None = None,
+        gear_star: int | None = None,
+    ) -> list[tuple[Gear, float]]:
+        """
+        Return the best gears for a weighting of stats.
+
+        :param weights: Weight of each stat type, e.g. `{"CRIT DMG": 1, "Critical": 0.5}`. Other stats weigh nothing.
+        :param k: Maximum number of gears to return.
+        :param gear_set: Only rank gears of this set.
+        :param gear_type: Only rank gears of this type.
+        :param gear_star: Only rank gears with this many stars.
+        :return: Up to `k` (gear, score) tuples, best first. Ties are broken by the order gears were added in.
+        """
+        if unknown := set(weights) - set(STAT_TYPES):
+            raise ValueError(f"Unknown stat types {sorted(unknown)}.")
+        if gear_set is not None and gear_set not in SET_NAME_MAPPING:
+            raise ValueError(f"Unknown gear set {gear_set!r}.")
+        if gear_type is not None and gear_type not in GEAR_TYPE_MAPPING:
+            raise ValueError(f"Unknown gear type {gear_type!r}.")
+        if k < 1:
+            return []
+
+        weight_vector = np.zeros(len(STAT_TYPES), dtype=np.float32)
+        for stat_type, weight in weights.items():
+            weight_vector[_STAT_COLUMNS[stat_type]] = weight
+        # Normalising the weights instead of the rows keeps the rows valid when a scale grows
+        weight_vector = np.divide(weight_vector, self._scales, out=np.zeros_like(weight_vector), where=self._scales > 0)
+
+        candidates = self._candidates(gear_set, gear_type, gear_star)
+        logger.debug(f"Ranking {len(candidates)} gears for {dict(weights)}.")
+        scores = self._stats[candidates] @ weight_vector
+        if k < len(candidates):
+            # Partial selection: only the best k candidates end up sorted, along with any tied with the k-th best, so
+            # ties at the boundary are broken by addition order too
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            best = np.flatnonzero(scores >= threshold)
+            candidates, scores = candidates[best], scores[best]
+        order = np.lexsort((self._added[candidates], -scores))[:k]
+
+        # Slots of candidates are alive, so they all hold a gear
+        return [(cast(Gear, self._gears[slot]), float(score)) for slot, score in zip(candidates[order], scores[order])]
+
+    def _candidates(self, gear_set: str | None, gear_type: str | None, gear_star: int | None) -> np.ndarray:
+        """Return the slots of the ranked gears matching the filters of `top_k`."""
+        size = len(self._gears)
+        mask = self._alive[:size].copy()
+        if gear_set is not None:
+            mask &= self._codes[:size, 0] == SET_NAME_MAPPING[gear_set]
+        if gear_type is not None:
+            mask &= self._codes[:size, 1] == GEAR_TYPE_MAPPING[gear_type]
+        if gear_star is not None:
+            mask &= self._codes[:size, 2] == gear_star
+        return np.flatnonzero(mask)
@@ -0,0 +1,241 @@
+"""
+Monte Carlo estimate of what gears could become once fully enhanced.
+
+Every enhancement milestone either adds a new sub stat, while a gear has fewer than `MAX_SUB_STATS`, or raises one of
+its sub stats picked at random. The simulations of a batch of gears run together as NumPy arrays with one row per
+simulation, stepping through the milestones one at a time, so the cost of Python is per milestone rather than per roll.
+
+The enhancement rules aren't published, so `EnhancementRules` holds estimates which can be replaced as better figures
+come up.
+"""
+from collections.abc import Iterator, Mapping, Sequence
+from types import MappingProxyType
+from typing import NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.inventory.ranking import STAT_TYPES
+from agf_toolkit.processor.gear import Gear
+
+MAX_SUB_STATS = 4
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+_STAT_COLUMNS = {stat_type: i for i, stat_type in enumerate(STAT_TYPES)}
+# Column of sub stats of unknown type and of empty slots. It's dropped from the results.
+_NO_COLUMN = len(STAT_TYPES)
+
+
+class EnhancementRules(NamedTuple):
+    """Rules of gear enhancement."""
+
+    # Number of enhancement milestones from +0 to fully enhanced
+    milestones: int = 5
+    # Number of sub stats a gear of each rarity starts with
+    initial_sub_stats: Mapping[str, int] = MappingProxyType(
+        {"Yellow": 4, "Purple": 3, "Blue": 2, "Green": 1, "White": 0}
+    )
+    # Range of a single roll of each stat type on a 6 stars gear. Gears with fewer stars roll proportionally less.
+    roll_ranges: Mapping[str, tuple[float, float]] = MappingProxyType(
+        {
+            "ATK": (20, 40),
+            "DEF": (12, 24),
+            "HP": (80, 160),
+            "ATK (%)": (4, 8),
+            "DEF (%)": (4, 8),
+            "HP (%)": (4, 8),
+            "SPD": (2, 4),
+            "Critical": (3, 6),
+            "CRIT DMG": (4, 8),
+            "Status ACC": (4, 8),
+            "Status RES": (4, 8),
+        }
+    )
+    # Roll multiplier of a sub stat by its rarity. New sub stats take the gear's rarity.
+    rarity_multipliers: Mapping[str, float] = MappingProxyType(
+        {"Yellow": 1.0, "Purple": 0.85, "Blue": 0.7, "Green": 0.55, "White": 0.4}
+    )
+    max_stars: int = 6
+
+
+class SimulationResult(NamedTuple):
+    """Percentile outcomes of fully enhancing each gear."""
+
+    percentiles: tuple[float, ...]
+    # Sub stat totals by gear, percentile and stat type, in `STAT_TYPES` order
+    stat_percentiles: np.ndarray[int, np.dtype[np.float32]]
+    # Weighted scores by gear and percentile, if weights were given
+    score_percentiles: np.ndarray[int, np.dtype[np.float32]] | None
+
+    def stat(self, gear_index: int, stat_type: str) -> dict[float, float]:
+        """Return the percentile outcomes of a stat type of a gear, by percentile."""
+        values = self.stat_percentiles[gear_index, :, _STAT_COLUMNS[stat_type]]
+        return dict(zip(self.percentiles, values.tolist()))
+
+
+class _Batch(NamedTuple):
+    """Current sub stats and enhancement state of a batch of gears, before simulating."""
+
+    types: np.ndarray  # (gears, MAX_SUB_STATS) stat columns, -1 for empty slots and `_NO_COLUMN` for unknown types
+    values: np.ndarray  # (gears, MAX_SUB_STATS)
+    multipliers: np.ndarray  # (gears, MAX_SUB_STATS) roll multipliers of the slots
+    main_types: np.ndarray  # (gears,) stat column of the main stat
+    new_multipliers: np.ndarray  # (gears,) roll multiplier of new sub stats
+    star_scales: np.ndarray  # (gears,)
+    remaining: np.ndarray  # (gears,) milestones left
+
+
+def remaining_milestones(gear: Gear, rules: EnhancementRules = EnhancementRules()) -> int:
+    """
+    Estimate the number of enhancement milestones a gear has left.
+
+    A screenshot doesn't tell how often existing sub stats were raised, so only the sub stats added since the gear's
+    initial ones count as spent milestones. This overestimates the potential of gears already raised without adding sub
+    stats.
+    """
+    initial = rules.initial_sub_stats.get(gear.gear_rarity, 0)
+    return max(0, rules.milestones - max(0, len(gear.sub_stats) - initial))
+
+
+def _prepare(gears: Sequence[Gear], remaining: Sequence[int], rules: EnhancementRules) -> _Batch:
+    size = len(gears)
+    batch = _Batch(
+        types=np.full((size, MAX_SUB_STATS), -1, dtype=np.int8),
+        values=np.zeros((size, MAX_SUB_STATS), dtype=np.float32),
+        multipliers=np.zeros((size, MAX_SUB_STATS), dtype=np.float32),
+        main_types=np.full(size, _NO_COLUMN, dtype=np.int8),
+        new_multipliers=np.array([rules.rarity_multipliers.get(gear.gear_rarity, 1.0) for gear in gears], np.float32),
+        star_scales=np.array([(gear.gear_star or rules.max_stars) / rules.max_stars for gear in gears], np.float32),
+        remaining=np.asarray(remaining, dtype=np.int16),
+    )
+    for i, gear in enumerate(gears):
+        batch.main_types[i] = _STAT_COLUMNS.get(gear.main_stat.stat_type, _NO_COLUMN)
+        for slot, stat in enumerate(gear.sub_stats[:MAX_SUB_STATS]):
+            batch.types[i, slot] = _STAT_COLUMNS.get(stat.stat_type, _NO_COLUMN)
+            batch.values[i, slot] = 0 if stat.stat_value is None else float(str(stat.stat_value).rstrip("%"))
+            batch.multipliers[i, slot] = rules.rarity_multipliers.get(stat.stat_rarity, batch.new_multipliers[i])
+    return batch
+
+
+# pylint: disable=too-many-locals
+def _simulate_batch(
+    batch: _Batch, simulations: int, rules: EnhancementRules, rng: np.random.Generator
+) -> np.ndarray[int, np.dtype[np.float32]]:
+    """Simulate a batch of gears, returning the final sub stat totals by gear, simulation and stat type."""
+    size = len(batch.remaining)
+    # Sub stats of unknown type never grow
+    low, high = (
+        np.array([rules.roll_ranges[stat_type][i] for stat_type in STAT_TYPES] + [0], np.float32) for i in (0, 1)
+    )
+
+    # One row per simulation, gear after gear
+    types, values, multipliers = (
+        np.repeat(array, simulations, axis=0) for array in (batch.types, batch.values, batch.multipliers)
+    )
+    main_types, new_multipliers, star_scales, remaining = (
+        np.repeat(array, simulations)
+        for array in (batch.main_types, batch.new_multipliers, batch.star_scales, batch.remaining)
+    )
+    rows = np.arange(len(types))
+
+    for milestone in range(rules.milestones):
+        count = (types >= 0).sum(axis=1)
+        active = milestone < remaining
+        adding = active & (count < MAX_SUB_STATS)
+        raising = active & ~adding & (count > 0)
+
+        # New sub stats: the type is drawn uniformly among those not on the gear yet, main stat included
+        slot = np.minimum(count, MAX_SUB_STATS - 1)
+        if (added := np.flatnonzero(adding)).size:
+            taken = np.zeros((added.size, _NO_COLUMN + 1), dtype=bool)
+            np.put_along_axis(taken, np.where(types[added] >= 0, types[added], _NO_COLUMN).astype(np.intp), True, 1)
+            taken[np.arange(added.size), main_types[added]] = True
+            keys = np.where(taken[:, :_NO_COLUMN], -1, rng.random((added.size, _NO_COLUMN), dtype=np.float32))
+            types[added, slot[added]] = keys.argmax(axis=1)
+            multipliers[added, slot[added]] = new_multipliers[added]
+
+        # Raised sub stats: any of the existing ones, uniformly. An added sub stat also gets its first roll.
+        slot = np.where(adding, slot, (rng.random(len(rows), dtype=np.float32) * np.maximum(count, 1)).astype(np.intp))
+        rolled_types = types[rows, slot].astype(np.intp)
+        rolls = low[rolled_types] + (high - low)[rolled_types] * rng.random(len(rows), dtype=np.float32)
+        rolls *= multipliers[rows, slot] * star_scales
+        values[rows, slot] += np.where(adding | raising, rolls, 0)
+
+    # Sum the slots by stat type: one bin per simulation and stat column
+    bins = rows[:, None] * (_NO_COLUMN + 1) + np.where(types >= 0, types, _NO_COLUMN)
+    sums = np.bincount(bins.ravel(), weights=values.ravel(), minlength=len(rows) * (_NO_COLUMN + 1))
+    totals = sums.astype(np.float32).reshape(size, simulations, _NO_COLUMN + 1)
+    return totals[:, :, :_NO_COLUMN]
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def simulate(
+    gears: Sequence[Gear],
+    simulations: int = 10_000,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    weights: Mapping[str, float] | None = None,
+    seed: int | None = None,
+    rules: EnhancementRules = EnhancementRules(),
+    remaining: Sequence[int] | None = None,
+    batch_size: int = 1 << 20,
+) -> SimulationResult:
+    """
+    Simulate fully enhancing every gear many times, and summarise the outcomes as percentiles.
+
+    :param gears: The gears to simulate.
+    :param simulations: Number of simulations per gear.
+    :param percentiles: Percentiles of the outcomes to return, between 0 and 100.
+    :param weights: Weight of each stat type to score outcomes with, as for `GearRanking.top_k` but unnormalised.
+    :param seed: Seed of the random generator. The same seed, gears and batch size give the same results.
+    :param rules: The enhancement rules.
+    :param remaining: Milestones left for each gear. Estimated with `remaining_milestones` if not given.
+    :param batch_size: Maximum number of simulations, across gears, held in memory at once.
+    :return: The percentile outcomes of each gear, in the order of `gears`.
+    """
+    if simulations < 1:
+        raise ValueError("Number of simulations must be at least 1.")
+    if weights is not None and (unknown := set(weights) - set(STAT_TYPES)):
+        raise ValueError(f"Unknown stat types {sorted(unknown)}.")
+    if remaining is None:
+        remaining = [remaining_milestones(gear, rules) for gear in gears]
+    elif len(remaining) != len(gears):
+        raise ValueError("Milestones left must be given for every gear.")
+
+    weight_vector = None
+    if weights is not None:
+        weight_vector = np.zeros(len(STAT_TYPES), dtype=np.float32)
+        for stat_type, weight in weights.items():
+            weight_vector[_STAT_COLUMNS[stat_type]] = weight
+
+    rng = np.random.default_rng(seed)
+    gears_per_batch = max(1, batch_size // simulations)
+    stat_percentiles = np.zeros((len(gears), len(percentiles), len(STAT_TYPES)), dtype=np.float32)
+    score_percentiles = None if weight_vector is None else np.zeros((len(gears), len(percentiles)), dtype=np.float32)
+
+    for start in range(0, len(gears), gears_per_batch):
+        end = min(start + gears_per_batch, len(gears))
+        totals = _simulate_batch(_prepare(gears[start:end], remaining[start:end], rules), simulations, rules, rng)
+        # (percentiles, gears, stat types) -> (gears, percentiles, stat types)
+        stat_percentiles[start:end] = np.percentile(totals, percentiles, axis=1).transpose(1, 0, 2)
+        if weight_vector is not None and score_percentiles is not None:
+            score_percentiles[start:end] = np.percentile(totals @ weight_vector, percentiles, axis=1).T
+        logger.debug(f"Simulated gears {start} to {end} of {len(gears)}.")
+
+    return SimulationResult(tuple(percentiles), stat_percentiles, score_percentiles)
+
+
+def iter_best_candidates(
+    gears: Sequence[Gear], result: SimulationResult, percentile: float = 50, k: int = 20
+) -> Iterator[tuple[Gear, float]]:
+    """
+    Yield the gears with the best weighted score at a percentile of a simulation, best first.
+
+    :param gears: The simulated gears, in the order they were simulated in.
+    :param result: The simulation's result. It must have been run with weights.
+    :param percentile: One of the simulated percentiles, e.g. 50 for the median outcome.
+    :param k: Maximum number of gears to yield.
+    """
+    if result.score_percentiles is None:
+        raise ValueError("The simulation was run without weights.")
+    scores = result.score_percentiles[:, result.percentiles.index(percentile)]
+    for i in np.argsort(-scores, kind="stable")[:k]:
+        yield gears[i], float(scores[i])
@@ -0,0 +1,109 @@
+"""
+mitmproxy addon for capturing gear data from the game's network traffic.
+
+Run it with `mitmdump -s agf_toolkit/networking/addon.py --set agf_hosts=<game API host>` and point the device's proxy
+at mitmproxy. Decoded gears are logged, kept on the addon, and optionally appended to `agf_output` as encoded lines.
+"""
+
+from collections.abc import Iterator, Mapping, Sequence
+from os import PathLike
+from pathlib import Path
+
+from loguru import logger
+
+from agf_toolkit.networking.payload import DEFAULT_SCHEMA, decode_payload
+from agf_toolkit.processor.gear import Gear
+
+try:
+    from mitmproxy import http, io
+except ImportError as exc:
+    raise ImportError(
+        "mitmproxy is required for network capture. Install the `networking` extra: pip install agf_toolkit[networking]"
+    ) from exc
+
+
+class GearCapture:
+    """mitmproxy addon decoding gear payloads from intercepted responses."""
+
+    def __init__(
+        self,
+        hosts: Sequence[str] = (),
+        path_prefixes: Sequence[str] = (),
+        schema: Mapping[str, str] = DEFAULT_SCHEMA,
+        output: str | PathLike | None = None,
+    ) -> None:
+        """
+        Initialise the addon.
+
+        :param hosts: Only decode responses from these hosts. Empty to decode every host.
+        :param path_prefixes: Only decode responses to request paths starting with these. Empty to decode every path.
+        :param schema: The key names of a gear entry. See `agf_toolkit.networking.payload.DEFAULT_SCHEMA`.
+        :param output: File to append encoded gears to, one per line.
+        """
+        self.hosts = tuple(hosts)
+        self.path_prefixes = tuple(path_prefixes)
+        self.schema = schema
+        self.output = Path(output) if output else None
+        self.gears: list[Gear] = []
+
+    def load(self, loader) -> None:
+        """Register options so the addon can be configured from `mitmdump --set`."""
+        loader.add_option("agf_hosts", Sequence[str], [], "Hosts to decode gear payloads from.")
+        loader.add_option("agf_paths", Sequence[str], [], "Request path prefixes to decode gear payloads from.")
+        loader.add_option("agf_output", str, "", "File to append encoded gears to.")
+
+    def configure(self, updated: set[str]) -> None:
+        """Apply options set from `mitmdump --set`."""
+        from mitmproxy import ctx  # pylint: disable=import-outside-toplevel
+
+        if "agf_hosts" in updated:
+            self.hosts = tuple(ctx.options.agf_hosts)
+        if "agf_paths" in updated:
+            self.path_prefixes = tuple(ctx.options.agf_paths)
+        if "agf_output" in updated:
+            self.output = Path(ctx.options.agf_output) if ctx.options.agf_output else None
+
+    def wants(self, flow: http.HTTPFlow) -> bool:
+        """Check whether the flow's response should be decoded."""
+        if flow.response is None:
+            return False
+        if self.hosts and flow.request.pretty_host not in self.hosts:
+            return False
+        if self.path_prefixes and not flow.request.path.startswith(self.path_prefixes):
+            return False
+        return "json" in flow.response.headers.get("content-type", "json")
+
+    def decode(self, flow: http.HTTPFlow) -> list[Gear]:
+        """Decode the gear payload of a flow's response, if there's any."""
+        if not self.wants(flow):
+            return []
+        return decode_payload(flow.response.get_content(strict=False) or b"", self.schema)  # type: ignore
+
+    def response(self, flow: http.HTTPFlow) -> None:
+        """mitmproxy hook for completed responses."""
+        if not (gears := self.decode(flow)):
+            return
+
+        logger.info(f"Captured {len(gears)} gear(s) from {flow.request.pretty_url}")
+        self.gears.extend(gears)
+        if self.output is not None:
+            with open(self.output, "a", encoding="utf-8") as file:
+                file.writelines(f"{gear.encode()}\n" for gear in gears)
+
+
+def read_flows(path: str | PathLike, capture: GearCapture | None = None) -> Iterator[Gear]:
+    """
+    Decode gears from a recorded flow file (e.g. from `mitmdump -w`), without a live game.
+
+    :param path: Path to the flow file.
+    :param capture: The addon whose filters and schema are used. Defaults to one decoding every JSON response.
+    :return: An iterator of Gear objects, in the order they were captured.
+    """
+    capture = capture or GearCapture()
+    with open(path, "rb") as file:
+        for flow in io.FlowReader(file).stream():
+            if isinstance(flow, http.HTTPFlow):
+                yield from capture.decode(flow)
+
+
+addons = [GearCapture()]
@@ -0,0 +1,252 @@
+"""
+Distributed screenshot parsing over ZeroMQ.
+
+The topology is a push/pull pipeline: a `Dispatcher` pushes encoded frames to any number of workers (`run_worker`) and
+pulls their `Gear.encode()` results back. The dispatcher is both the producer and the sink, so it can re-send frames
+whose result never came back (e.g. the worker died) and yield results in submission order.
+
+Workers on other hosts can be started with `python -m agf_toolkit.networking.distributed <task address> <result
+address>`, where the addresses point at the dispatcher's host.
+"""
+
+import argparse
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from os import PathLike
+
+import cv2
+import numpy as np
+from loguru import logger
+
+try:
+    import zmq
+except ImportError as exc:
+    raise ImportError(
+        "pyzmq is required for distributed parsing. Install the `networking` extra: pip install agf_toolkit[networking]"
+    ) from exc
+
+STATUS_OK = b"ok"
+STATUS_ERROR = b"error"
+
+
+def encode_frame(image: np.ndarray[int, np.dtype[np.generic]]) -> bytes:
+    """Encode a captured frame for sending. PNG is lossless, and low compression keeps encoding cheap."""
+    _, buffer = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    return buffer.tobytes()
+
+
+def iter_file_frames(paths: Iterable[str | PathLike]) -> Iterator[bytes]:
+    """Read screenshot files as frames. Files are sent as-is, since workers decode them anyway."""
+    for path in paths:
+        with open(path, "rb") as file:
+            yield file.read()
+
+
+def parse_frame(frame: bytes, scaling_factor: float | None = None) -> str:
+    """Decode a frame, parse it and return the encoded gear. This is the default parser of workers."""
+    # Imported here so only workers load the OCR model
+    from agf_toolkit.processor.utils import (  # pylint: disable=import-outside-toplevel
+        parse_screenshot,
+    )
+
+    # Frames are sent unscaled, so only their info box is cropped out and rescaled
+    image = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+    return parse_screenshot(image, scaling_factor=scaling_factor).encode()
+
+
+def run_worker(
+    task_address: str,
+    result_address: str,
+    parser: Callable[[bytes, float | None], str] = parse_frame,
+    stop_event: threading.Event | None = None,
+    poll_interval: float = 0.5,
+) -> None:
+    """
+    Pull frames from a dispatcher, parse them and push the results back until stopped.
+
+    :param task_address: The address the dispatcher pushes tasks on, e.g. `tcp://192.168.1.10:5557`.
+    :param result_address: The address the dispatcher pulls results on, e.g. `tcp://192.168.1.10:5558`.
+    :param parser: Function turning a frame and an optional scaling factor into an encoded gear.
+    :param stop_event: Event to stop the worker. Without it the worker runs until killed.
+    :param poll_interval: How often the stop event is checked, in seconds.
+    """
+    context: zmq.Context = zmq.Context.instance()
+    tasks = context.socket(zmq.PULL)
+    tasks.setsockopt(zmq.RCVHWM, 1)  # Don't hoard frames that other workers could be parsing
+    tasks.connect(task_address)
+    results = context.socket(zmq.PUSH)
+    results.connect(result_address)
+    logger.info(f"Worker pulling from {task_address}, pushing to {result_address}.")
+
+    try:
+        while stop_event is None or not stop_event.is_set():
+            if not tasks.poll(int(poll_interval * 1000)):
+                continue
+
+            task_id, raw_scaling_factor, frame = tasks.recv_multipart()
+            scaling_factor = float(raw_scaling_factor) if raw_scaling_factor else None
+            try:
+                results.send_multipart([task_id, STATUS_OK, parser(frame, scaling_factor).encode()])
+            except Exception as exc:  # pylint: disable=broad-except  # Report any failure back instead of dying
+                logger.exception(f"Failed to parse task {task_id.decode()}.")
+                results.send_multipart([task_id, STATUS_ERROR, repr(exc).encode()])
+    finally:
+        tasks.close(linger=0)
+        results.close(linger=1000)
+
+
+def start_workers(
+    count: int,
+    task_address: str,
+    result_address: str,
+    parser: Callable[[bytes, float | None], str] = parse_frame,
+) -> list[multiprocessing.Process]:
+    """Start worker processes on this machine. They are daemonic, so they die along with the calling process."""
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(task_address, result_address, parser), daemon=True)
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
+
+
+class Dispatcher:
+    """Push frames to workers and collect their results in order, re-sending frames lost along with their worker."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        task_address: str = "tcp://127.0.0.1:5557",
+        result_address: str = "tcp://127.0.0.1:5558",
+        max_in_flight: int = 32,
+        task_timeout: float = 60.0,
+        max_retries: int = 2,
+    ) -> None:
+        """
+        Initialise the dispatcher and bind its sockets.
+
+        :param task_address: The address to push tasks on. Use `tcp://*:<port>` to accept workers from other hosts.
+        :param result_address: The address to pull results on.
+        :param max_in_flight: Maximum number of frames sent but not yet answered. This bounds memory usage.
+        :param task_timeout: Seconds to wait for a result before assuming the worker is lost and re-sending the frame.
+        :param max_retries: How many times a frame is re-sent before giving up on it.
+        """
+        if max_in_flight < 1:
+            raise ValueError("Maximum number of in-flight frames must be at least 1.")
+
+        self.max_in_flight = max_in_flight
+        self.task_timeout = task_timeout
+        self.max_retries = max_retries
+
+        context: zmq.Context = zmq.Context.instance()
+        self._tasks = context.socket(zmq.PUSH)
+        self._tasks.setsockopt(zmq.SNDHWM, 1)
+        self._tasks.bind(task_address)
+        self._results = context.socket(zmq.PULL)
+        self._results.bind(result_address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self) -> None:
+        """Close the sockets."""
+        self._tasks.close(linger=0)
+        self._results.close(linger=0)
+
+    def _send(self, task_id: int, frame: bytes, scaling_factor: float | None) -> bool:
+        """Send a task without blocking. Returns False if no worker could take it."""
+        raw_scaling_factor = b"" if scaling_factor is None else str(scaling_factor).encode()
+        try:
+            self._tasks.send_multipart([str(task_id).encode(), raw_scaling_factor, frame], flags=zmq.NOBLOCK)
+        except zmq.Again:
+            return False
+        return True
+
+    # pylint: disable=too-many-locals,too-many-branches
+    def run(self, frames: Iterable[bytes], scaling_factor: float | None = None) -> Iterator[tuple[int, str | None]]:
+        """
+        Dispatch frames to workers and yield their results in the order the frames were given.
+
+        :param frames: The encoded frames to parse.
+        :param scaling_factor: The calibrated scaling factor, forwarded to the workers.
+        :return: An iterator of (index, encoded gear) tuples. The encoded gear is `None` if parsing failed or the
+            frame was given up on after `max_retries` re-sends.
+        """
+        frame_iterator = enumerate(frames)
+        exhausted = False
+        unsent: list[tuple[int, bytes]] = []  # Frames waiting for a free worker, retries first
+        pending: dict[int, tuple[bytes, float, int]] = {}  # Sent frames: (frame, time sent, attempts)
+        done: dict[int, str | None] = {}  # Results waiting for earlier results to arrive
+        next_id = 0
+
+        while True:
+            # Fill the pipeline up to the in-flight limit. Retries waiting for a worker are still counted as pending.
+            while len(pending) + sum(i not in pending for i, _ in unsent) < self.max_in_flight and not exhausted:
+                if (item := next(frame_iterator, None)) is None:
+                    exhausted = True
+                else:
+                    unsent.append(item)
+            while unsent:
+                task_id, frame = unsent[0]
+                if not self._send(task_id, frame, scaling_factor):
+                    break
+                attempts = pending[task_id][2] + 1 if task_id in pending else 1
+                pending[task_id] = (frame, time.monotonic(), attempts)
+                unsent.pop(0)
+
+            if exhausted and not pending and not unsent and next_id not in done:
+                return
+
+            # Collect results
+            if self._results.poll(100):
+                raw_task_id, status, body = self._results.recv_multipart()
+                task_id = int(raw_task_id)
+                if pending.pop(task_id, None) is None:
+                    logger.debug(f"Duplicate result for task {task_id} ignored.")
+                else:
+                    # A late result makes the retry of a timed out task pointless, if it's still waiting for a worker
+                    unsent = [item for item in unsent if item[0] != task_id]
+                    if status == STATUS_OK:
+                        done[task_id] = body.decode()
+                    else:
+                        logger.error(f"Task {task_id} failed on worker: {body.decode()}")
+                        done[task_id] = None
+
+            # Re-send frames that timed out, assuming their worker is lost
+            now = time.monotonic()
+            for task_id, (frame, sent_at, attempts) in list(pending.items()):
+                if now - sent_at < self.task_timeout or any(i == task_id for i, _ in unsent):
+                    continue
+                if attempts > self.max_retries:
+                    logger.error(f"Task {task_id} timed out {attempts} time(s). Giving up.")
+                    del pending[task_id]
+                    done[task_id] = None
+                else:
+                    logger.warning(f"Task {task_id} timed out. Re-sending (attempt {attempts + 1}).")
+                    unsent.insert(0, (task_id, frame))
+
+            # Release results in order
+            while next_id in done:
+                yield next_id, done.pop(next_id)
+                next_id += 1
+
+
+def _main(argv: list[str] | None = None) -> None:
+    """Run a worker from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m agf_toolkit.networking.distributed", description="Run a distributed parse worker."
+    )
+    parser.add_argument("task_address", help="Address the dispatcher pushes tasks on, e.g. tcp://192.168.1.10:5557.")
+    parser.add_argument("result_address", help="Address the dispatcher pulls results on, e.g. tcp://192.168.1.10:5558.")
+    args = parser.parse_args(argv)
+    run_worker(args.task_address, args.result_address)
+
+
+if __name__ == "__main__":
+    _main()
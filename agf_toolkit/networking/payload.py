@@ -0,0 +1,115 @@
+import json
+from collections.abc import Iterator, Mapping
+from types import MappingProxyType
+from typing import Any
+
+from loguru import logger
+
+from agf_toolkit.processor.gear import (
+    _GEAR_TYPE_DECODING,
+    _RARITY_GRADE_DECODING,
+    _SET_NAME_DECODING,
+    _STAT_TYPE_DECODING,
+    Gear,
+    Stat,
+)
+
+# Key names of a gear entry in an intercepted payload. The game's protocol isn't documented, so the defaults mirror
+# `Gear.as_dict()`; pass a schema with the keys observed in a recorded flow when they differ. It's read-only, as it's
+# the default argument of the decoders.
+DEFAULT_SCHEMA = MappingProxyType(
+    {
+        "gear_set": "gear_set",
+        "gear_type": "gear_type",
+        "gear_rarity": "gear_rarity",
+        "gear_star": "gear_star",
+        "main_stat": "main_stat",
+        "sub_stats": "sub_stats",
+        "stat_type": "stat_type",
+        "stat_value": "stat_value",
+        "stat_rarity": "rarity",
+    }
+)
+
+
+def _resolve(value: Any, decoding: dict) -> Any:
+    """Resolve an encoded integer to its name with a decoding table. Names are passed through for `Gear` to validate."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return decoding.get(value, None)
+    if isinstance(value, str) and value.lstrip("-").isdigit():
+        return decoding.get(int(value), None)
+    return value
+
+
+def _decode_stat(entry: Mapping, schema: Mapping[str, str]) -> Stat:
+    """Decode a stat entry of a payload into a Stat object."""
+    return Stat(
+        stat_type=_resolve(entry.get(schema["stat_type"]), _STAT_TYPE_DECODING),
+        stat_value=entry.get(schema["stat_value"]),
+        stat_rarity=_resolve(entry.get(schema["stat_rarity"]), _RARITY_GRADE_DECODING),
+    )
+
+
+def _is_gear_entry(entry: Any, schema: Mapping[str, str]) -> bool:
+    return isinstance(entry, Mapping) and all(schema[i] in entry for i in ("gear_set", "gear_type", "main_stat"))
+
+
+def decode_gear(entry: Mapping, schema: Mapping[str, str] = DEFAULT_SCHEMA) -> Gear:
+    """
+    Decode a single gear entry of a payload into a Gear object.
+
+    Categorical values may either be names (e.g. `"SPD set"`) or their encoded values as defined in the gear structure
+    specs (e.g. `10`). Stat values are taken as-is, so percentages must keep their `%` suffix.
+
+    :param entry: The gear entry, as decoded from JSON.
+    :param schema: The key names of the entry. See `DEFAULT_SCHEMA`.
+    :return: A Gear object.
+    """
+    return Gear(
+        gear_set=_resolve(entry.get(schema["gear_set"]), _SET_NAME_DECODING),
+        gear_type=_resolve(entry.get(schema["gear_type"]), _GEAR_TYPE_DECODING),
+        gear_rarity=_resolve(entry.get(schema["gear_rarity"]), _RARITY_GRADE_DECODING),
+        gear_star=entry.get(schema["gear_star"], -1),
+        main_stat=_decode_stat(entry[schema["main_stat"]], schema),
+        sub_stats=[_decode_stat(i, schema) for i in entry.get(schema["sub_stats"]) or ()],
+    )
+
+
+def iter_gear_entries(data: Any, schema: Mapping[str, str] = DEFAULT_SCHEMA) -> Iterator[Mapping]:
+    """Walk a decoded JSON document depth-first and yield every gear entry in it, in document order."""
+    if _is_gear_entry(data, schema):
+        yield data
+    elif isinstance(data, Mapping):
+        for value in data.values():
+            yield from iter_gear_entries(value, schema)
+    elif isinstance(data, list):
+        for value in data:
+            yield from iter_gear_entries(value, schema)
+
+
+def decode_payload(content: bytes | str, schema: Mapping[str, str] = DEFAULT_SCHEMA) -> list[Gear]:
+    """
+    Decode every gear entry of a JSON payload into Gear objects.
+
+    A whole inventory response is decoded at once, wherever the entries are nested in the document. Payloads that are
+    not JSON yield no gear.
+
+    :param content: The (decompressed) body of the response.
+    :param schema: The key names of a gear entry. See `DEFAULT_SCHEMA`.
+    :return: A list of Gear objects.
+    """
+    try:
+        data = json.loads(content)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        logger.debug("Payload is not JSON. Skipped.")
+        return []
+
+    gears = []
+    for entry in iter_gear_entries(data, schema):
+        try:
+            gears.append(decode_gear(entry, schema))
+        except (AttributeError, KeyError, TypeError) as exc:
+            logger.warning(f"Malformed gear entry skipped ({exc!r}): {entry}")
+
+    logger.debug(f"Decoded {len(gears)} gear(s) from payload.")
+    return gears
@@ -0,0 +1,275 @@
+"""
+Team-wide gear allocation, giving each gear to at most one character.
+
+Optimising characters one at a time hands the best pieces to whoever goes first. Instead, every character's candidate
+gears are pruned to a few per gear type, then a single integer program picks a loadout for every character at once:
+
+*   one binary variable per (character, candidate gear), at most one gear per character and gear type, and at most one
+    character per gear;
+*   one binary variable per character telling whether its constraints are met, which are only enforced when it's set.
+
+Meeting a character's constraints is worth more than any score, so as many characters as possible get a valid loadout,
+and the others still get the best gears left. Scores are weighted sums of stats normalised as in `GearRanking`.
+"""
+from collections.abc import Mapping, Sequence
+from types import MappingProxyType
+from typing import NamedTuple
+
+import numpy as np
+from loguru import logger
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import coo_matrix
+
+from agf_toolkit.inventory.ranking import STAT_TYPES, stat_vector
+from agf_toolkit.processor.constant import GEAR_TYPE_MAPPING, SET_NAME_MAPPING
+from agf_toolkit.processor.gear import Gear
+
+GEAR_TYPES = tuple(gear_type for gear_type in GEAR_TYPE_MAPPING if gear_type is not None)
+_STAT_COLUMNS = {stat_type: i for i, stat_type in enumerate(STAT_TYPES)}
+DEFAULT_CANDIDATES = 10
+
+
+class CharacterGoal(NamedTuple):
+    """What a character wants from its gear."""
+
+    name: str
+    # Weight of each stat type, as for `GearRanking.top_k`
+    weights: Mapping[str, float]
+    # Minimum total of some stat types over the loadout's gears, without the character's base stats
+    min_stats: Mapping[str, float] = MappingProxyType({})
+    # Minimum number of pieces of some gear sets
+    gear_sets: Mapping[str, int] = MappingProxyType({})
+    # Only use gears with at least this many stars
+    min_star: int | None = None
+    # Multiplier of the character's score in the team's score
+    priority: float = 1.0
+
+
+class Loadout(NamedTuple):
+    """The gears given to a character."""
+
+    character: str
+    gears: dict[str, Gear]  # By gear type. Gear types without a suitable gear left are missing.
+    score: float
+    stats: dict[str, float]  # Stat totals of the gears
+    satisfied: bool  # Whether the character's constraints are met
+
+
+class TeamAllocation(NamedTuple):
+    """A loadout per character, sharing no gear."""
+
+    loadouts: list[Loadout]
+    score: float  # Sum of the characters' scores, weighted by priority
+    optimal: bool  # Whether the allocation is proven optimal among the pruned candidates
+
+
+def _validate(goals: Sequence[CharacterGoal]) -> None:
+    if len({goal.name for goal in goals}) != len(goals):
+        raise ValueError("Character names must be unique.")
+    for goal in goals:
+        if unknown := (set(goal.weights) | set(goal.min_stats)) - set(STAT_TYPES):
+            raise ValueError(f"Unknown stat types {sorted(unknown)} for {goal.name}.")
+        if unknown := set(goal.gear_sets) - (set(SET_NAME_MAPPING) - {None}):
+            raise ValueError(f"Unknown gear sets {sorted(map(str, unknown))} for {goal.name}.")
+        if any(pieces < 0 for pieces in goal.gear_sets.values()):
+            raise ValueError(f"Set requirements of {goal.name} must be positive.")
+        if sum(goal.gear_sets.values()) > len(GEAR_TYPES):
+            raise ValueError(f"Set requirements of {goal.name} don't fit in {len(GEAR_TYPES)} gear types.")
+
+
+def _top(values: np.ndarray, indices: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices with the `k` highest values, unordered."""
+    if len(indices) <= k:
+        return indices
+    return indices[np.argpartition(-values[indices], k - 1)[:k]]
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def prune_candidates(
+    goal: CharacterGoal,
+    scores: np.ndarray,
+    stats: np.ndarray,
+    gear_types: np.ndarray,
+    gear_sets: np.ndarray,
+    gear_stars: np.ndarray,
+    k: int,
+) -> np.ndarray:
+    """
+    Keep the gears worth considering for a character, for each gear type.
+
+    These are the `k` best gears by score, the `k` best by each stat type with a minimum, and the `k` best by score of
+    each required set. Without constraints, this loses nothing as long as `k` is at least the number of characters:
+    the other characters can take at most `k - 1` of the best `k` gears of a type.
+
+    :return: Indices of the candidate gears, sorted.
+    """
+    eligible = np.ones(len(scores), dtype=bool)
+    if goal.min_star is not None:
+        eligible &= gear_stars >= goal.min_star
+
+    kept = []
+    for gear_type in GEAR_TYPES:
+        indices = np.flatnonzero(eligible & (gear_types == GEAR_TYPE_MAPPING[gear_type]))
+        kept.append(_top(scores, indices, k))
+        for stat_type in goal.min_stats:
+            kept.append(_top(stats[:, _STAT_COLUMNS[stat_type]], indices, k))
+        for gear_set in goal.gear_sets:
+            kept.append(_top(scores, indices[gear_sets[indices] == SET_NAME_MAPPING[gear_set]], k))
+    return np.unique(np.concatenate(kept))
+
+
+def _greedy(
+    candidates: list[np.ndarray], scores: np.ndarray, gear_types: np.ndarray, priorities: np.ndarray
+) -> list[np.ndarray]:
+    """Allocate gears character by character in order of priority, ignoring constraints."""
+    taken: set[int] = set()
+    chosen: list[np.ndarray] = [np.zeros(0, dtype=np.intp)] * len(candidates)
+    for character in np.argsort(-priorities, kind="stable"):
+        picks = []
+        for gear_type in GEAR_TYPES:
+            pool = [
+                i for i in candidates[character] if gear_types[i] == GEAR_TYPE_MAPPING[gear_type] and i not in taken
+            ]
+            if pool:
+                picks.append(max(pool, key=lambda i: scores[character, i]))  # pylint: disable=cell-var-from-loop
+        taken.update(picks)
+        chosen[character] = np.array(picks, dtype=np.intp)
+    return chosen
+
+
+# pylint: disable=too-many-arguments,too-many-statements,too-many-branches
+def optimize_team(
+    gears: Sequence[Gear],
+    goals: Sequence[CharacterGoal],
+    time_limit: float = 30.0,
+    candidates: int = DEFAULT_CANDIDATES,
+) -> TeamAllocation:
+    """
+    Allocate gears to a team of characters, each gear to at most one of them.
+
+    :param gears: The inventory. Identical gears are considered distinct pieces.
+    :param goals: The characters' goals.
+    :param time_limit: Maximum seconds spent solving. The best allocation found by then is returned, possibly not
+        optimal.
+    :param candidates: Number of gears kept per gear type and criterion when pruning, see `prune_candidates`. It's
+        raised to the number of characters if lower.
+    :return: The loadout of each character, in the order of `goals`.
+    """
+    _validate(goals)
+    if not goals:
+        return TeamAllocation([], 0.0, True)
+
+    stats = np.array([stat_vector(gear) for gear in gears], dtype=np.float64).reshape(len(gears), len(STAT_TYPES))
+    gear_types = np.array([GEAR_TYPE_MAPPING[gear.gear_type] for gear in gears], dtype=np.int16)
+    gear_sets = np.array([SET_NAME_MAPPING[gear.gear_set] for gear in gears], dtype=np.int16)
+    gear_stars = np.array([-1 if gear.gear_star is None else gear.gear_star for gear in gears], dtype=np.int16)
+
+    scales = stats.max(axis=0, initial=0)
+    weights = np.zeros((len(goals), len(STAT_TYPES)))
+    for character, goal in enumerate(goals):
+        for stat_type, weight in goal.weights.items():
+            weights[character, _STAT_COLUMNS[stat_type]] = weight
+    weights = np.divide(weights, scales, out=np.zeros_like(weights), where=scales > 0)
+    scores = weights @ stats.T  # (characters, gears)
+    priorities = np.array([goal.priority for goal in goals], dtype=np.float64)
+
+    k = max(candidates, len(goals))
+    pools = [
+        prune_candidates(goal, scores[character], stats, gear_types, gear_sets, gear_stars, k)
+        for character, goal in enumerate(goals)
+    ]
+    logger.debug(f"Allocating {sum(map(len, pools))} candidate gears of {len(gears)} to {len(goals)} characters.")
+
+    # Variables: one per (character, candidate gear), then one per character telling if its constraints are met
+    pair_characters = np.concatenate([np.full(len(pool), c, dtype=np.intp) for c, pool in enumerate(pools)])
+    pair_gears = np.concatenate(pools).astype(np.intp)
+    pairs, variables = len(pair_gears), len(pair_gears) + len(goals)
+    met = pairs + np.arange(len(goals))
+
+    # A met constraint is worth more than the best loadouts of the whole team
+    pair_scores = priorities[pair_characters] * scores[pair_characters, pair_gears]
+    bonus = 1 + sum(
+        priorities[c] * np.clip(scores[c, pools[c]], 0, None).max(initial=0) * len(GEAR_TYPES)
+        for c in range(len(goals))
+    )
+    objective = np.concatenate([-pair_scores, np.full(len(goals), -bonus)])
+
+    rows: list[np.ndarray] = []
+    columns: list[np.ndarray] = []
+    values: list[np.ndarray] = []
+    lower: list[float] = []
+    upper: list[float] = []
+
+    def _add_row(row_columns: np.ndarray, row_values: np.ndarray, row_lower: float, row_upper: float) -> None:
+        rows.append(np.full(len(row_columns), len(lower)))
+        columns.append(row_columns)
+        values.append(row_values)
+        lower.append(row_lower)
+        upper.append(row_upper)
+
+    # Each gear goes to at most one character
+    order = np.argsort(pair_gears, kind="stable")
+    for group in np.split(order, np.flatnonzero(np.diff(pair_gears[order])) + 1):
+        if len(group) > 1:
+            _add_row(group, np.ones(len(group)), -np.inf, 1)
+
+    for character, goal in enumerate(goals):
+        own = np.flatnonzero(pair_characters == character)
+        # Each character wears at most one gear of each type
+        for gear_type in GEAR_TYPES:
+            of_type = own[gear_types[pair_gears[own]] == GEAR_TYPE_MAPPING[gear_type]]
+            if len(of_type) > 1:
+                _add_row(of_type, np.ones(len(of_type)), -np.inf, 1)
+        # Constraints only bind when the character is flagged as meeting them: sum(x * value) - minimum * met >= 0
+        for stat_type, minimum in goal.min_stats.items():
+            stat_values = stats[pair_gears[own], _STAT_COLUMNS[stat_type]]
+            _add_row(np.append(own, met[character]), np.append(stat_values, -minimum), 0, np.inf)
+        for gear_set, pieces in goal.gear_sets.items():
+            of_set = own[gear_sets[pair_gears[own]] == SET_NAME_MAPPING[gear_set]]
+            _add_row(np.append(of_set, met[character]), np.append(np.ones(len(of_set)), -pieces), 0, np.inf)
+
+    constraints = []
+    if lower:
+        matrix = coo_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))), shape=(len(lower), variables)
+        )
+        constraints.append(LinearConstraint(matrix.tocsr(), lower, upper))
+
+    result = milp(
+        objective,
+        integrality=np.ones(variables),
+        bounds=Bounds(0, 1),
+        constraints=constraints,
+        options={"time_limit": time_limit, "mip_rel_gap": 1e-9},
+    )
+    if result.x is not None:
+        chosen_pairs = result.x[:pairs] > 0.5
+        chosen = [pair_gears[chosen_pairs & (pair_characters == c)] for c in range(len(goals))]
+        optimal = result.status == 0
+    else:
+        logger.warning(f"No allocation found in {time_limit}s ({result.message}). Allocating greedily instead.")
+        chosen = _greedy(pools, scores, gear_types, priorities)
+        optimal = False
+
+    loadouts = []
+    for character, goal in enumerate(goals):
+        totals = stats[chosen[character]].sum(axis=0)
+        satisfied = all(totals[_STAT_COLUMNS[stat_type]] >= minimum for stat_type, minimum in goal.min_stats.items())
+        satisfied &= all(
+            np.count_nonzero(gear_sets[chosen[character]] == SET_NAME_MAPPING[gear_set]) >= pieces
+            for gear_set, pieces in goal.gear_sets.items()
+        )
+        loadouts.append(
+            Loadout(
+                goal.name,
+                {gears[i].gear_type: gears[i] for i in sorted(chosen[character], key=lambda i: gear_types[i])},
+                float(scores[character, chosen[character]].sum()),
+                {stat_type: float(total) for stat_type, total in zip(STAT_TYPES, totals) if total},
+                bool(satisfied),
+            )
+        )
+        if not satisfied:
+            logger.warning(f"Constraints of {goal.name} can't be met with the gears left.")
+
+    team_score = float(sum(goal.priority * loadout.score for goal, loadout in zip(goals, loadouts)))
+    return TeamAllocation(loadouts, team_score, optimal)
@@ -4,7 +4,12 @@ from loguru import logger
 from tqdm import tqdm
 
 from agf_toolkit import templates
-from agf_toolkit.processor.image import calculate_rescaled_size, rescale, template_match
+from agf_toolkit.processor.image import (
+    calculate_rescaled_size,
+    crop,
+    rescale,
+    template_match,
+)
 
 
 def _generate_scaling_factors(lower_bound: float, upper_bound: float, max_step: int) -> list[float]:
@@ -12,6 +17,27 @@ def _generate_scaling_factors(lower_bound: float, upper_bound: float, max_step:
     return list(np.linspace(lower_bound, upper_bound, max_step))[::-1]
 
 
+def _sweep(screenshot: np.ndarray[int, np.dtype[np.generic]], scaling_factors: list[float]) -> dict[float, float]:
+    """Rescale the screenshot by each scaling factor and return the template matching score of each factor."""
+    screenshot_umat = cv2.UMat(screenshot)
+    template_umat = cv2.UMat(templates.INFO_BOX)
+    scores = {}
+    for scaling_factor in tqdm(scaling_factors):
+        resized_w, resized_h = calculate_rescaled_size(screenshot_umat, scaling_factor)
+
+        if resized_h < templates.INFO_BOX.shape[0] or resized_w < templates.INFO_BOX.shape[1]:
+            logger.debug(f"Factor {scaling_factor} results in screenshot smaller than template. Skipped.")
+            continue  #  Skip if scaled image is smaller than template
+
+        rescaled_screenshot_umat: cv2.UMat = rescale(screenshot_umat, target_w=resized_w, target_h=resized_h)
+        _, score, _, _ = template_match(rescaled_screenshot_umat, template_umat)
+
+        scores[scaling_factor] = score
+        logger.debug(f"Resized with factor {scaling_factor} to size {resized_w}x{resized_h} for score of {score}")
+
+    return scores
+
+
 # pylint: disable=too-many-locals
 def calibrate_scale(
     screenshot: np.ndarray[int, np.dtype[np.generic]],
@@ -67,22 +93,7 @@ def calibrate_scale(
         )
 
     logger.info(f"Calibrating scale... {rounds} round(s) left.")
-    screenshot_umat = cv2.UMat(screenshot)
-    template_umat = cv2.UMat(templates.INFO_BOX)
-    scores = {}
-    for scaling_factor in tqdm(_generate_scaling_factors(scale_lower_bound, scale_upper_bound, steps)):
-        resized_w, resized_h = calculate_rescaled_size(screenshot_umat, scaling_factor)
-
-        if (resized_h, resized_w) < templates.INFO_BOX.shape[:2]:
-            logger.debug(f"Factor {scaling_factor} results in screenshot smaller than template. Skipped.")
-            continue  #  Skip if scaled image is smaller than template
-
-        rescaled_screenshot_umat: cv2.UMat = rescale(screenshot_umat, target_w=resized_w, target_h=resized_h)
-        _, score, _, _ = template_match(rescaled_screenshot_umat, template_umat)
-
-        scores[scaling_factor] = score
-        logger.debug(f"Resized with factor {scaling_factor} to size {resized_w}x{resized_h} for score of {score}")
-
+    scores = _sweep(screenshot, _generate_scaling_factors(scale_lower_bound, scale_upper_bound, steps))
     best_scaling_factor = max(scores, key=scores.get)  # type: ignore
     logger.debug(
         f"Best scaling factor as of current round: {best_scaling_factor:05.4f} "
@@ -100,3 +111,105 @@ def calibrate_scale(
         sweep_steps=recursive_sweep_steps,
         _current_state=(scale_lower_bound, best_scaling_factor, scale_upper_bound),
     )
+
+
+def estimate_scale(
+    screenshot: np.ndarray[int, np.dtype[np.generic]],
+    max_features: int = 5000,
+    ratio_test: float = 0.8,
+    min_inliers: int = 10,
+) -> tuple[float, tuple[int, int]] | None:
+    """
+    Estimate the scaling factor and the info box location in one pass using ORB keypoints.
+
+    Keypoints of the info box template are matched against the screenshot, and a similarity transform (uniform scale,
+    rotation and translation) is fitted with RANSAC. The transform's scale is the inverse of the scaling factor that
+    `calibrate_scale` would find, and its translation is the info box's top-left corner in the screenshot.
+
+    :param screenshot: The screenshot to estimate the scale of.
+    :param max_features: The maximum number of keypoints to detect on the screenshot.
+    :param ratio_test: Lowe's ratio test threshold for discarding ambiguous matches.
+    :param min_inliers: The minimum number of RANSAC inliers for the estimate to be trusted.
+    :return: The scaling factor and the info box's top-left corner in original-resolution coordinates, or `None` if
+        no trustworthy transform is found.
+    """
+    orb = cv2.ORB_create(nfeatures=max_features)
+    template_keypoints, template_descriptors = orb.detectAndCompute(templates.INFO_BOX_GRAY, None)
+    screenshot_keypoints, screenshot_descriptors = orb.detectAndCompute(
+        cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY), None
+    )
+    if template_descriptors is None or screenshot_descriptors is None:
+        logger.debug("No keypoints found on either the template or the screenshot.")
+        return None
+
+    matches = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(template_descriptors, screenshot_descriptors, k=2)
+    good_matches = [i[0] for i in matches if len(i) == 2 and i[0].distance < ratio_test * i[1].distance]
+    logger.debug(f"{len(good_matches)} keypoint match(es) passed the ratio test.")
+    if len(good_matches) < min_inliers:
+        return None
+
+    source = np.array([template_keypoints[i.queryIdx].pt for i in good_matches], dtype=np.float32)
+    destination = np.array([screenshot_keypoints[i.trainIdx].pt for i in good_matches], dtype=np.float32)
+    transform, inliers = cv2.estimateAffinePartial2D(source, destination, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+    if transform is None or (inlier_count := int(inliers.sum())) < min_inliers:
+        logger.debug("RANSAC failed to find a transform with enough inliers.")
+        return None
+
+    template_scale = float(np.hypot(transform[0, 0], transform[1, 0]))
+    top_left = (max(0, round(transform[0, 2])), max(0, round(transform[1, 2])))
+    logger.debug(f"Similarity transform found with scale {template_scale:05.4f} at {top_left} ({inlier_count} inliers)")
+
+    return 1 / template_scale, top_left
+
+
+def calibrate_scale_by_features(
+    screenshot: np.ndarray[int, np.dtype[np.generic]],
+    refine_bound_coefficient: float = 0.03,
+    refine_steps: int = 13,
+    min_score: float = 0.6,
+) -> float:
+    """
+    Calibrate the screenshot with a feature-based estimate, using a narrow sweep only to refine it.
+
+    The refining sweep runs on a crop around the estimated info box location instead of the whole screenshot, so it
+    costs a fraction of a single `calibrate_scale` round. If the estimate cannot be made, or the refined match scores
+    below `min_score`, this falls back to the full `calibrate_scale` sweep.
+
+    :param screenshot: The screenshot to calibrate against.
+    :param refine_bound_coefficient: The relative width of the refining sweep around the estimated scaling factor.
+    :param refine_steps: The number of scaling factors tried by the refining sweep.
+    :param min_score: The minimum template matching score for the refined scaling factor to be accepted.
+    :return: The scaling factor.
+    """
+    if not 0 < refine_bound_coefficient < 1:
+        raise ValueError("Refine bound coefficient must be between 0 and 1.")
+
+    logger.info("Estimating scale from keypoints.")
+    if (estimate := estimate_scale(screenshot)) is None:
+        logger.warning("Feature-based estimation failed. Falling back to full calibration sweep.")
+        return calibrate_scale(screenshot)
+
+    estimated_scaling_factor, (left, top) = estimate
+    logger.debug(f"Estimated scaling factor {estimated_scaling_factor:05.4f} with info box at {(left, top)}")
+
+    # Crop out the info box with enough margin to account for the widest scale in the refining sweep
+    template_h, template_w = templates.INFO_BOX.shape[:2]
+    lower_bound = estimated_scaling_factor * (1 - refine_bound_coefficient)
+    upper_bound = estimated_scaling_factor * (1 + refine_bound_coefficient)
+    margin = int(max(template_h, template_w) / lower_bound * refine_bound_coefficient) + 2
+    top_left = (max(0, left - margin), max(0, top - margin))
+    bottom_right = (
+        left + int(template_w / lower_bound) + margin,
+        top + int(template_h / lower_bound) + margin,
+    )
+    region = crop(screenshot, top_left, bottom_right)
+
+    logger.info("Refining estimated scale.")
+    scores = _sweep(region, _generate_scaling_factors(lower_bound, upper_bound, refine_steps))
+    if not scores or (best_score := max(scores.values())) < min_score:
+        logger.warning("Estimated scale failed verification. Falling back to full calibration sweep.")
+        return calibrate_scale(screenshot)
+
+    best_scaling_factor = max(scores, key=scores.get)  # type: ignore
+    logger.debug(f"Refined scaling factor: {best_scaling_factor:05.4f} at {best_score * 100:05.4f}%")
+    return best_scaling_factor
@@ -1,5 +1,5 @@
 import re
-from collections.abc import Sequence
+from collections.abc import Mapping, Sequence
 from typing import overload
 
 from agf_toolkit.abc import Encodable
@@ -17,12 +17,19 @@ def _reverse_dict(input_dict: dict) -> dict:
     return {v: k for k, v in input_dict.items()}
 
 
+# Reversed once here, since decoding large dumps calls the decoders for every line
+_STAT_TYPE_DECODING = _reverse_dict(STAT_TYPE_MAPPING)
+_RARITY_GRADE_DECODING = _reverse_dict(RARITY_GRADE_MAPPING)
+_SET_NAME_DECODING = _reverse_dict(SET_NAME_MAPPING)
+_GEAR_TYPE_DECODING = _reverse_dict(GEAR_TYPE_MAPPING)
+
+
 class Stat(Encodable):
     """Represents a stat of a gear."""
 
     VALUE_REGEX = re.compile(r"\d+\.?\d*%?")
 
-    def __init__(self, stat_type, stat_value, stat_rarity) -> None:
+    def __init__(self, stat_type, stat_value, stat_rarity, confidence: dict[str, float] | None = None) -> None:
         """
         Initialise a Stat object and validate it.
 
@@ -37,10 +44,13 @@ class Stat(Encodable):
         :param stat_type: The type of the stat. This must be one of the keys in STAT_TYPE_MAPPING.
         :param stat_value: The stat_value of the stat. This must be a valid number, or a percentage.
         :param stat_rarity: The rarity grade of the stat. This must be one of the keys in RARITY_GRADE_MAPPING.
+        :param confidence: The OCR confidence of each recognised attribute, by attribute name. It is not part of the
+            stat's identity, so it's left out of comparisons and the encoded form.
         """
         self.stat_type = stat_type
         self.stat_value = stat_value
         self.stat_rarity = stat_rarity
+        self.confidence = dict(confidence or {})
         self.validate()
 
     def __eq__(self, other) -> bool:
@@ -48,6 +58,9 @@ class Stat(Encodable):
             return False
         return self.as_dict() == other.as_dict()
 
+    def __hash__(self) -> int:
+        return hash(self.encode())
+
     def __repr__(self) -> str:
         return f"Stat(stat_type={self.stat_type !r}, stat_value={self.stat_value !r}, rarity={self.stat_rarity !r})"
 
@@ -88,6 +101,11 @@ class Stat(Encodable):
             "rarity": self.stat_rarity,
         }
 
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Stat":
+        """Build a Stat object from `as_dict()`."""
+        return cls(data["stat_type"], data["stat_value"], data["rarity"])
+
     def encode(self) -> str:
         """Encode the gear object"""
         self.validate()
@@ -126,8 +144,8 @@ class Stat(Encodable):
 
         raw_stat_type, raw_rarity, raw_value = args
 
-        stat_type = _reverse_dict(STAT_TYPE_MAPPING).get(int(raw_stat_type), None) if raw_stat_type.isdigit() else None
-        rarity = _reverse_dict(RARITY_GRADE_MAPPING).get(int(raw_rarity), None) if raw_rarity.isdigit() else None
+        stat_type = _STAT_TYPE_DECODING.get(int(raw_stat_type), None) if raw_stat_type.isdigit() else None
+        rarity = _RARITY_GRADE_DECODING.get(int(raw_rarity), None) if raw_rarity.isdigit() else None
 
         return cls(stat_type, raw_value, rarity)
 
@@ -144,6 +162,7 @@ class Gear(Encodable):
         gear_star=-1,
         main_stat: Stat = Stat("", "", ""),
         sub_stats: Sequence[Stat] = (),
+        confidence: dict[str, float] | None = None,
     ):
         """
         Initialise a Gear object and validate it.
@@ -160,6 +179,8 @@ class Gear(Encodable):
         :param gear_star: The number of stars the gear has.
         :param main_stat: The main stat of the gear.
         :param sub_stats: The sub stats of the gear.
+        :param confidence: The OCR confidence of each recognised attribute, by attribute name. Confidences of the stats
+            are kept on the stats themselves.
         """
         self.gear_set = gear_set
         self.gear_type = gear_type
@@ -167,6 +188,7 @@ class Gear(Encodable):
         self.gear_star = gear_star
         self.main_stat = main_stat
         self.sub_stats = sub_stats
+        self.confidence = dict(confidence or {})
         self.validate()
 
     def __eq__(self, other) -> bool:
@@ -174,6 +196,9 @@ class Gear(Encodable):
             return False
         return self.as_dict() == other.as_dict()
 
+    def __hash__(self) -> int:
+        return hash(self.encode())
+
     def __repr__(self):
         return (
             f"Gear(gear_set={self.gear_set !r}, "
@@ -208,6 +233,18 @@ class Gear(Encodable):
             i.validate()
         self.sub_stats = list(self.sub_stats)
 
+    def low_confidence_fields(self, threshold: float) -> list[str]:
+        """
+        List the recognised attributes whose OCR confidence is below a threshold, to flag doubtful gears for review.
+
+        Stat attributes are prefixed with their stat, e.g. `main_stat.stat_value` or `sub_stats.2.stat_type`.
+        """
+        confidences = dict(self.confidence)
+        confidences.update({f"main_stat.{name}": value for name, value in self.main_stat.confidence.items()})
+        for i, sub_stat in enumerate(self.sub_stats):
+            confidences.update({f"sub_stats.{i}.{name}": value for name, value in sub_stat.confidence.items()})
+        return [field for field, confidence in confidences.items() if confidence < threshold]
+
     def as_dict(self) -> dict:
         """Return the Gear object as a dictionary."""
         return {
@@ -219,6 +256,18 @@ class Gear(Encodable):
             "sub_stats": [sub_stat.as_dict() for sub_stat in self.sub_stats],
         }
 
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Gear":
+        """Build a Gear object from `as_dict()`."""
+        return cls(
+            data["gear_set"],
+            data["gear_type"],
+            data["gear_rarity"],
+            data["gear_star"],
+            Stat.from_dict(data["main_stat"]),
+            [Stat.from_dict(sub_stat) for sub_stat in data["sub_stats"]],
+        )
+
     def encode(self) -> str:
         """Encode the gear object"""
         self.validate()
@@ -270,11 +319,9 @@ class Gear(Encodable):
 
         raw_gear_set, raw_gear_type, raw_gear_rarity, raw_gear_star, *raw_stats = args
 
-        gear_set = _reverse_dict(SET_NAME_MAPPING).get(int(raw_gear_set), None) if raw_gear_set.isdigit() else None
-        gear_type = _reverse_dict(GEAR_TYPE_MAPPING).get(int(raw_gear_type), None) if raw_gear_type.isdigit() else None
-        gear_rarity = (
-            _reverse_dict(RARITY_GRADE_MAPPING).get(int(raw_gear_rarity)) if raw_gear_rarity.isdigit() else None
-        )
+        gear_set = _SET_NAME_DECODING.get(int(raw_gear_set), None) if raw_gear_set.isdigit() else None
+        gear_type = _GEAR_TYPE_DECODING.get(int(raw_gear_type), None) if raw_gear_type.isdigit() else None
+        gear_rarity = _RARITY_GRADE_DECODING.get(int(raw_gear_rarity)) if raw_gear_rarity.isdigit() else None
 
         stats = [raw_stats[i : i + 3] for i in range(0, len(raw_stats), 3)]
         main_stat, *sub_stats = [Stat.decode(sub_stat) for sub_stat in stats]
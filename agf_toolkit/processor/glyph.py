@@ -0,0 +1,211 @@
+"""
+Glyph-template recogniser for the numeric stat values of the info box.
+
+Stat values are rendered in a fixed game font, so instead of a neural recogniser they can be read by segmenting a value
+into glyphs and matching all of them against known glyph templates at once, using normalised cross-correlation as a
+single matrix product. A glyph is only as confident as its best character beats the runner-up, so look-alikes such as
+6 and 8 aren't read confidently. Values the recogniser isn't confident about are left to the general purpose backend.
+"""
+from collections.abc import Iterable, Sequence
+from importlib import resources
+from os import PathLike
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.abc import OCRBackend
+from agf_toolkit.processor.gear import Stat
+
+GLYPH_SIZE = 24
+GLYPH_CHARACTERS = "0123456789.%"
+# Built with `from_samples` from the stat values of some of the test screenshots, the others being held out to measure
+# how the templates fare on screenshots they weren't built from. See `tests/test_glyph.py`.
+BUNDLED_GLYPHS = resources.files("agf_toolkit.templates") / "glyphs.npz"
+# Horizontal shears of the templates added by `from_samples`. Values are italic in some clients and upright in others
+# (e.g. `tests/Foreign_1.png`), so every template also gets an upright copy.
+SLANTS = (0.2,)
+# Correlation margin between a glyph's best and runner-up characters at which its confidence is 0.8
+CONFIDENT_MARGIN = 0.125
+# Correlation below which a glyph matches no template, whatever the margin
+MIN_CORRELATION = 0.7
+
+
+def segment(line_image: np.ndarray[int, np.dtype[np.generic]]) -> list[np.ndarray[int, np.dtype[np.generic]]]:
+    """
+    Segment a single line of dark text on a light background into normalised glyph images.
+
+    Connected components are merged when they overlap horizontally (e.g. the parts of `%`), and each glyph is cropped
+    to the height of the whole line before being resized, so that size and vertical position (e.g. of `.`) are kept.
+
+    :param line_image: The BGR image of the line.
+    :return: The glyphs from left to right, each `GLYPH_SIZE` pixels square.
+    """
+    gray = cv2.cvtColor(line_image, cv2.COLOR_BGR2GRAY) if line_image.ndim == 3 else line_image
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    labels, components = _components(binary)
+    glyph_components = _merge_overlapping(components)
+    if not glyph_components:
+        return []
+
+    top = min(box[1] for box, _ in glyph_components)
+    bottom = max(box[3] for box, _ in glyph_components)
+    glyphs = []
+    for (left, _, right, _), component_labels in glyph_components:
+        # Only keep the glyph's own components, so a neighbouring `.` or slanted digit doesn't leak in
+        mask = np.isin(labels[top:bottom, left:right], component_labels).astype(np.uint8) * 255
+        glyphs.append(_square(mask))
+    return glyphs
+
+
+def _components(binary: np.ndarray) -> tuple[np.ndarray, list[tuple[list[int], list[int]]]]:
+    """Label the connected components of a binary line, returning the label image and (box, labels) components."""
+    line_h, line_w = binary.shape
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    # Drop specks, separator lines and anything cut off by the crop
+    components = sorted(
+        ([x, y, x + w, y + h], [label])
+        for label, (x, y, w, h, area) in enumerate(stats[1:count], start=1)
+        if area >= 4 and 2 <= w <= line_w / 2 and y > 0 and y + h < line_h
+    )
+    return labels, components
+
+
+def _merge_overlapping(components: list[tuple[list[int], list[int]]]) -> list[tuple[list[int], list[int]]]:
+    """Merge (box, labels) components sorted by left edge when they overlap horizontally by more than half."""
+    merged: list[tuple[list[int], list[int]]] = []
+    for box, component_labels in components:
+        if merged:
+            last_box, last_labels = merged[-1]
+            overlap = min(box[2], last_box[2]) - max(box[0], last_box[0])
+            if overlap > 0.5 * min(box[2] - box[0], last_box[2] - last_box[0]):
+                last_box[:] = [
+                    min(last_box[0], box[0]),
+                    min(last_box[1], box[1]),
+                    max(last_box[2], box[2]),
+                    max(last_box[3], box[3]),
+                ]
+                last_labels.extend(component_labels)
+                continue
+        merged.append((box, component_labels))
+    return merged
+
+
+def _square(mask: np.ndarray) -> np.ndarray:
+    """Centre a glyph mask as tall as the line on a square canvas, and resize it to `GLYPH_SIZE`."""
+    height, width = mask.shape
+    canvas = np.zeros((height, max(height, width)), dtype=np.uint8)
+    offset = (canvas.shape[1] - width) // 2
+    canvas[:, offset : offset + width] = mask
+    return cv2.resize(canvas, (GLYPH_SIZE, GLYPH_SIZE), interpolation=cv2.INTER_AREA)
+
+
+def shear(glyph: np.ndarray, slant: float) -> np.ndarray:
+    """Shear a glyph horizontally around its centre, a positive `slant` straightening italic glyphs."""
+    centre = (GLYPH_SIZE - 1) / 2
+    matrix = np.array([[1, slant, -slant * centre], [0, 1, 0]], dtype=np.float32)
+    return cv2.warpAffine(glyph, matrix, (GLYPH_SIZE, GLYPH_SIZE))
+
+
+def _normalise(glyphs: np.ndarray) -> np.ndarray:
+    """Flatten glyphs into zero-mean, unit-norm vectors, so their dot product is their normalised correlation."""
+    vectors = glyphs.reshape(len(glyphs), -1).astype(np.float32)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class GlyphRecogniser(OCRBackend):
+    """Recognise numeric values by matching segmented glyphs against glyph templates."""
+
+    def __init__(self, glyphs: np.ndarray, labels: Sequence[str], min_confidence: float = 0.8) -> None:
+        """
+        Initialise the recogniser.
+
+        :param glyphs: Glyph templates, as an array of `GLYPH_SIZE` square images. A character may have several.
+        :param labels: The character of each glyph template.
+        :param min_confidence: The minimum confidence for a value to be considered recognised.
+        """
+        if len(glyphs) != len(labels):
+            raise ValueError("Number of glyph templates and labels must match.")
+
+        self.glyphs = np.asarray(glyphs, dtype=np.uint8)
+        self.labels = np.asarray(list(labels))
+        self.min_confidence = min_confidence
+        self._templates = _normalise(self.glyphs)
+        self._characters, self._character_index = np.unique(self.labels, return_inverse=True)
+
+    def classify(self, glyphs: list[np.ndarray]) -> tuple[str, float]:
+        """
+        Classify segmented glyphs, returning the text and the confidence of its least confident glyph.
+
+        A glyph's score for a character is its best correlation with the character's templates, and its confidence is
+        the best character's softmax probability against the runner-up, scaled so that a margin of `CONFIDENT_MARGIN`
+        gives 0.8. Glyphs correlating less than `MIN_CORRELATION` with every template aren't confident at all.
+        """
+        if not glyphs:
+            return "", 0.0
+
+        scores = _normalise(np.stack(glyphs)) @ self._templates.T
+        # Pad with a character nothing matches, so a single character still has a runner-up
+        character_scores = np.full((len(glyphs), len(self._characters) + 1), -1.0, dtype=np.float32)
+        for i in range(len(self._characters)):
+            character_scores[:, i] = scores[:, self._character_index == i].max(axis=1)
+        runner_up, best = np.sort(character_scores, axis=1)[:, -2:].T
+        text = "".join(self._characters[character_scores.argmax(axis=1)])
+        if not Stat.VALUE_REGEX.fullmatch(text):
+            # A misplaced `.` or `%` is certainly a misread, however well each glyph matched
+            return text, 0.0
+        if best.min() < MIN_CORRELATION:
+            return text, 0.0
+        confidence = 1 / (1 + 4.0 ** (-(best - runner_up) / CONFIDENT_MARGIN))
+        return text, float(confidence.min())
+
+    def recognise(self, image) -> str:
+        """Recognise a single numeric value. Returns an empty string if any glyph isn't recognised confidently."""
+        text, confidence = self.recognise_lines([image])[0]
+        return text if confidence >= self.min_confidence else ""
+
+    def recognise_lines(self, images: Sequence) -> list[tuple[str, float]]:
+        """Recognise a batch of numeric values."""
+        results = [self.classify(segment(image)) for image in images]
+        logger.debug(f"Glyph recogniser results: {results}")
+        return results
+
+    @classmethod
+    def from_samples(
+        cls, samples: Iterable[tuple[np.ndarray, str]], slants: Sequence[float] = SLANTS, **kwargs
+    ) -> "GlyphRecogniser":
+        """
+        Build glyph templates from line images with known text, e.g. stat values with verified OCR results.
+
+        Samples whose number of segmented glyphs doesn't match their text are skipped.
+
+        :param samples: Pairs of (line image, text).
+        :param slants: Shears of every glyph to add as templates too, see `shear`.
+        :param kwargs: Extra keyword arguments for the constructor.
+        :return: A recogniser using every glyph of the samples, and their sheared copies, as templates.
+        """
+        glyphs: list[np.ndarray] = []
+        labels: list[str] = []
+        for image, text in samples:
+            if len(segmented := segment(image)) != len(text):
+                logger.warning(f"Sample {text!r} segmented into {len(segmented)} glyph(s). Skipped.")
+                continue
+            glyphs.extend(segmented)
+            labels.extend(text)
+
+        if missing := set(GLYPH_CHARACTERS) - set(labels):
+            logger.warning(f"No glyph templates for characters: {''.join(sorted(missing))}")
+        sheared = [shear(glyph, slant) for slant in slants for glyph in glyphs]
+        return cls(np.stack(glyphs + sheared), labels * (1 + len(slants)), **kwargs)
+
+    def save(self, path: str | PathLike) -> None:
+        """Save the glyph templates."""
+        np.savez_compressed(path, glyphs=self.glyphs, labels=self.labels)
+
+    @classmethod
+    def load(cls, path: str | PathLike | None = None, **kwargs) -> "GlyphRecogniser":
+        """Load glyph templates saved by `save()`, defaulting to the ones bundled with the toolkit."""
+        with np.load(str(path or BUNDLED_GLYPHS)) as data:
+            return cls(data["glyphs"], data["labels"].tolist(), **kwargs)
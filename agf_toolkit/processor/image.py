@@ -18,6 +18,9 @@ RARITY_COLORS = {
     "White": (246, 247, 247),
 }
 CIEDE_PIXEL_THRESHOLD = 10
+COARSE_SEARCH_SCALE = 0.25
+SEARCH_MARGIN = 16
+RETRY_UPSCALE = 2
 
 
 def template_match(img, template):
@@ -56,6 +59,18 @@ def rescale(
     return cv2.resize(img, (target_w, target_h))
 
 
+def retry_variants(line_image: np.ndarray[int, np.dtype[np.generic]]) -> list[np.ndarray[int, np.dtype[np.generic]]]:
+    """
+    Alternative preprocessings of a text line for a second OCR attempt: upscaled, and upscaled then binarised.
+
+    Small or low-contrast lines (e.g. from low resolution captures) are often read better once enlarged or thresholded.
+    """
+    upscaled = cv2.resize(line_image, None, fx=RETRY_UPSCALE, fy=RETRY_UPSCALE, interpolation=cv2.INTER_CUBIC)
+    gray = cv2.cvtColor(upscaled, cv2.COLOR_BGR2GRAY)
+    binarised = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    return [upscaled, cv2.cvtColor(binarised, cv2.COLOR_GRAY2BGR)]
+
+
 def extract_info_box(
     img: np.ndarray[int, np.dtype[np.generic]], template: np.ndarray[int, np.dtype[np.generic]]
 ) -> np.ndarray[int, np.dtype[np.generic]]:
@@ -80,24 +95,92 @@ def extract_info_box(
     return info_box
 
 
-def extract_gear_star(
+def locate_info_box(
+    img: np.ndarray[int, np.dtype[np.generic]],
+    template: np.ndarray[int, np.dtype[np.generic]],
+    scaling_factor: float,
+) -> tuple[int, int]:
+    """
+    Roughly locate the info box in an unscaled screenshot, returning its top-left corner in original coordinates.
+
+    The search runs on a thumbnail at `COARSE_SEARCH_SCALE` of the template geometry, sampled with nearest-neighbour
+    interpolation so it's cheap to make. The result is only accurate to a few pixels, which the refining match in
+    `extract_info_box_rescaled` takes care of.
+    """
+    logger.info("Searching for info box.")
+    template_h, template_w = template.shape[:2]
+    coarse_factor = scaling_factor * COARSE_SEARCH_SCALE
+    thumbnail = cv2.resize(
+        img, calculate_rescaled_size(img, coarse_factor), interpolation=cv2.INTER_NEAREST  # type: ignore
+    )
+    if template is templates.INFO_BOX and COARSE_SEARCH_SCALE == templates.COARSE_SCALE:
+        coarse_template = templates.INFO_BOX_COARSE
+    else:
+        coarse_template = cv2.resize(
+            template,
+            (int(template_w * COARSE_SEARCH_SCALE), int(template_h * COARSE_SEARCH_SCALE)),
+            interpolation=cv2.INTER_AREA,
+        )
+    _, _, _, (coarse_x, coarse_y) = template_match(thumbnail, coarse_template)
+
+    top_left = (int(coarse_x / coarse_factor), int(coarse_y / coarse_factor))
+    logger.debug(f"Coarse match found at {top_left} in original coordinates.")
+    return top_left
+
+
+def extract_info_box_rescaled(
+    img: np.ndarray[int, np.dtype[np.generic]],
+    template: np.ndarray[int, np.dtype[np.generic]],
+    scaling_factor: float,
+    top_left: tuple[int, int] | None = None,
+) -> np.ndarray[int, np.dtype[np.generic]]:
+    """
+    Get the info box from an unscaled screenshot, rescaled to the template geometry.
+
+    This gives the same result as `extract_info_box` on the screenshot rescaled by `scaling_factor`, but only the
+    region around the info box is ever rescaled. Resize cost and peak memory then scale with the info box instead of
+    the whole screen, which matters most on high resolution screenshots.
+
+    :param img: The unscaled screenshot.
+    :param template: The info box template.
+    :param scaling_factor: The calibrated scaling factor of the screenshot.
+    :param top_left: The approximate top-left corner of the info box in original coordinates, e.g. from
+        `calibration.estimate_scale`. If not given, it is searched for with `locate_info_box`.
+    :return: The info box, with the same size as the template.
+    """
+    template_h, template_w = template.shape[:2]
+    img_h, img_w = img.shape[:2]
+    if top_left is None:
+        top_left = locate_info_box(img, template, scaling_factor)
+
+    # Crop the info box plus a margin for the refining match, in original coordinates
+    margin = SEARCH_MARGIN / scaling_factor
+    region_top_left = (max(0, int(top_left[0] - margin)), max(0, int(top_left[1] - margin)))
+    region_bottom_right = (
+        min(img_w, int(top_left[0] + (template_w + SEARCH_MARGIN) / scaling_factor) + 1),
+        min(img_h, int(top_left[1] + (template_h + SEARCH_MARGIN) / scaling_factor) + 1),
+    )
+    region = crop(img, region_top_left, region_bottom_right)
+    region_w, region_h = calculate_rescaled_size(region, scaling_factor)
+    logger.debug(f"Rescaling region {region_top_left} -> {region_bottom_right} to {region_w}x{region_h}.")
+
+    rescaled_region = rescale(region, max(region_w, template_w), max(region_h, template_h))
+    return extract_info_box(rescaled_region, template)  # type: ignore
+
+
+def score_gear_star(
     info_box: np.ndarray[int, np.dtype[np.generic]], star_templates: dict[int, np.ndarray[int, np.dtype[np.generic]]]
-) -> int:
+) -> tuple[dict[int, float], int]:
     """
-    Get the gear star from the screenshot.
+    Score the gear star templates against the info box.
 
     This works by template-matching the known states of gear star to the screenshot. Despite having to deal with 6
     templates, it's faster than get_info_box() due to the smaller sizes of the template and the info box. To improve
     accuracy, thresholding is applied to both images to improve contrast since the gear star is a single color (save for
-    the 6* star which is purple). The highest score of each template is returned as that indicates confidence in the
-    result.
+    the 6* star which is purple). The highest score of each template is kept as that indicates confidence in the result.
 
-    However, this approach can misidentify 5* and 6* gear, mainly due to the very similar colours of the "indicator
-    star" after thresholding. Test runs had given as low as 0.00098 difference in final score between the two options,
-    but usually this difference will hover around 0.03 to 0.05. In other cases, the difference is 0.1+ with the correct
-    identification giving score on average 0.93.
-
-    Any improvement/rewrite to this is welcomed.
+    :return: The score of each star count, and the number of pixels of the best 6* match with the 6* star colour, which
+        tells 5* and 6* gears apart (see `gear_star_from_scores`).
     """
     logger.info("Extracting gear star.")
 
@@ -106,43 +189,74 @@ def extract_gear_star(
         cv2.cvtColor(info_box, cv2.COLOR_BGR2GRAY), 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU
     )
 
-    # Match against the 6-star templates and store the score and matching region
-    match = {}
-    for star_count, template in star_templates.items():
-        template_h, template_w = template.shape[:2]
+    # The bundled star templates come thresholded already
+    if star_templates is templates.STARS:
+        thresh_templates = templates.STARS_THRESH
+    else:
+        thresh_templates = {
+            star_count: cv2.threshold(
+                cv2.cvtColor(template, cv2.COLOR_BGR2GRAY), 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU
+            )[1]
+            for star_count, template in star_templates.items()
+        }
 
-        _, thresh_template = cv2.threshold(
-            cv2.cvtColor(template, cv2.COLOR_BGR2GRAY), 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU
-        )
+    # Match against the 6-star templates and store the score and matching region
+    scores, six_star_region = {}, None
+    for star_count, thresh_template in thresh_templates.items():
+        template_h, template_w = thresh_template.shape[:2]
 
         _, max_val, _, max_loc = template_match(t_info_box, thresh_template)
         logger.debug(f"Template for {star_count}* scored {max_val * 100 :05.4f}%.")
 
-        match_region = crop(info_box, max_loc, (max_loc[0] + template_w, max_loc[1] + template_h))
-        match[star_count] = {"score": max_val, "region": match_region}
+        scores[star_count] = float(max_val)
+        if star_count == 6:
+            six_star_region = crop(info_box, max_loc, (max_loc[0] + template_w, max_loc[1] + template_h))
+
+    return scores, 0 if six_star_region is None else count_6_star_pixels(six_star_region)
 
+
+def gear_star_from_scores(scores: dict[int, float], six_star_pixels: int) -> int:
+    """
+    Pick the gear star from the template scores of `score_gear_star`.
+
+    However, this approach can misidentify 5* and 6* gear, mainly due to the very similar colours of the "indicator
+    star" after thresholding. Test runs had given as low as 0.00098 difference in final score between the two options,
+    but usually this difference will hover around 0.03 to 0.05. In other cases, the difference is 0.1+ with the correct
+    identification giving score on average 0.93.
+
+    Any improvement/rewrite to this is welcomed.
+    """
     # Sort max first
-    star_order = list(sorted(match, key=lambda x: match[x]["score"], reverse=True))  # type: ignore
+    star_order = list(sorted(scores, key=scores.get, reverse=True))  # type: ignore
 
     # Resolve ambiguity between 5* and 6* should that arise
-    if set(star_order[:2]) == {5, 6} and (delta := abs(match[5]["score"] - match[6]["score"])) < AMBIGUITY_THRESHOLD:
+    if set(star_order[:2]) == {5, 6} and (delta := abs(scores[5] - scores[6])) < AMBIGUITY_THRESHOLD:
         logger.debug(f"Gear star is ambiguous between 5* and 6* with delta {delta * 100 :05.4f}%. Resolving.")
-        return resolve_5_6_ambiguity(match_region_6_star=match[6]["region"])
+        return _resolve_5_6_ambiguity(six_star_pixels)
 
     detected_star = star_order[0]
-    logger.info(f"Gear star detect as {detected_star}* (confidence {match[detected_star]['score'] * 100 :05.4f}%)")
+    logger.info(f"Gear star detect as {detected_star}* (confidence {scores[detected_star] * 100 :05.4f}%)")
     return detected_star
 
 
-def resolve_5_6_ambiguity(match_region_6_star: np.ndarray[int, np.dtype[np.generic]]) -> int:
-    """Resolve 5-star 6-star ambiguity"""
+def extract_gear_star(
+    info_box: np.ndarray[int, np.dtype[np.generic]], star_templates: dict[int, np.ndarray[int, np.dtype[np.generic]]]
+) -> int:
+    """Get the gear star from the screenshot. See `score_gear_star` and `gear_star_from_scores`."""
+    return gear_star_from_scores(*score_gear_star(info_box, star_templates))
+
+
+def count_6_star_pixels(match_region_6_star: np.ndarray[int, np.dtype[np.generic]]) -> int:
+    """Count the pixels of the 6* match region with the known 6* color."""
     lab_match_region_6 = cv2.cvtColor(match_region_6_star, cv2.COLOR_BGR2LAB)
     lab_known_6 = cv2.cvtColor(np.full_like(lab_match_region_6, PURPLE_RARITY_STAR), cv2.COLOR_BGR2LAB)
 
     logger.debug(f"Calculating delta between match region and known 6* color {PURPLE_RARITY_STAR}.")
     match_x, match_y = np.where(skimage.color.deltaE_ciede2000(lab_match_region_6, lab_known_6, kL=2) < 5)
+    return len(tuple(zip(match_x, match_y)))
+
 
-    match_pixel_count = len(tuple(zip(match_x, match_y)))
+def _resolve_5_6_ambiguity(match_pixel_count: int) -> int:
     logger.debug(f"Match region has {match_pixel_count}/{CIEDE_PIXEL_THRESHOLD} pixels matching known 6* color.")
 
     if match_pixel_count > CIEDE_PIXEL_THRESHOLD:  # Arbitrary threshold, but should be enough to have confidence
@@ -153,28 +267,38 @@ def resolve_5_6_ambiguity(match_region_6_star: np.ndarray[int, np.dtype[np.gener
     return 5
 
 
-def extract_sub_stat_rarity(info_box: np.ndarray[int, np.dtype[np.generic]]) -> tuple[str, dict[int, str]]:
+def resolve_5_6_ambiguity(match_region_6_star: np.ndarray[int, np.dtype[np.generic]]) -> int:
+    """Resolve 5-star 6-star ambiguity"""
+    return _resolve_5_6_ambiguity(count_6_star_pixels(match_region_6_star))
+
+
+def sample_rarity_pixels(info_box: np.ndarray[int, np.dtype[np.generic]]) -> list[tuple[int, int, int]]:
+    """Sample the RGB colour of each sub stat's rarity marker."""
+    # Type-check ignored since we verified in the toolkit's __init__.py already.
+    return [
+        tuple(int(channel) for channel in color.get_rgb(info_box, coord_x, coord_y))  # type: ignore
+        for coord_x, coord_y in templates.SUB_STATS
+    ]
+
+
+def rarity_from_pixels(pixels: list[tuple[int, int, int]]) -> tuple[str, dict[int, str]]:
     """
-    Extract sub stats' rarity via pixel-checking.
+    Get the sub stats' rarity from the colours of their markers, see `sample_rarity_pixels`.
 
     This also extract gear's rarity thanks to the sub stat count-gear rarity correlation.
     """
-    logger.info("Extracting sub stat rarity.")
+    # All distances at once, as `color.color_distance` would compute them one by one
+    lab_pixels = cv2.cvtColor(np.array([pixels], dtype=np.uint8).reshape(1, -1, 3), cv2.COLOR_RGB2LAB)
+    lab_targets = cv2.cvtColor(np.array([list(RARITY_COLORS.values())], dtype=np.uint8), cv2.COLOR_RGB2LAB)
+    distances = skimage.color.deltaE_ciede2000(lab_pixels[0, :, None], lab_targets[0, None, :], kL=2)
 
     result = {}
-    for i, (coord_x, coord_y) in enumerate(
-        (templates.SUB_STAT_1, templates.SUB_STAT_2, templates.SUB_STAT_3, templates.SUB_STAT_4)
-    ):
-        # Extract color of pixel, type-check ignored since we verified in the toolkit's __init__.py already.
-        base_rgb = color.get_rgb(info_box, coord_x, coord_y)
+    for i, base_rgb in enumerate(pixels):
         logger.debug(f"Color of sub stat #{i + 1} is {base_rgb}.")
 
-        # Loop over rarity color and calculate distance
-        scores = {}
+        scores = dict(zip(RARITY_COLORS, distances[i].tolist()))
         for rarity, target_rgb in RARITY_COLORS.items():
-            distance = color.color_distance(base_rgb, target_rgb)
-            scores[rarity] = distance
-            logger.debug(f"Delta-E to {rarity}-rarity {target_rgb} is {distance :05.4f}.")
+            logger.debug(f"Delta-E to {rarity}-rarity {target_rgb} is {scores[rarity] :05.4f}.")
 
         # Get rarity. CIEDE2000 should guarantee the closest color is the correct one.
         rarity = min(scores, key=scores.get)  # type: ignore
@@ -189,3 +313,9 @@ def extract_sub_stat_rarity(info_box: np.ndarray[int, np.dtype[np.generic]]) ->
     logger.info(f"Gear rarity detected to be {gear_rarity}")
 
     return gear_rarity, result
+
+
+def extract_sub_stat_rarity(info_box: np.ndarray[int, np.dtype[np.generic]]) -> tuple[str, dict[int, str]]:
+    """Extract sub stats' rarity via pixel-checking. See `rarity_from_pixels`."""
+    logger.info("Extracting sub stat rarity.")
+    return rarity_from_pixels(sample_rarity_pixels(info_box))
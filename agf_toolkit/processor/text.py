@@ -1,31 +1,193 @@
+import functools
 import re
+from collections.abc import Sequence
+from typing import Any
 
 import numpy as np
 from loguru import logger
 from paddleocr import PaddleOCR
 
+from agf_toolkit import templates
+from agf_toolkit.abc import OCRBackend, OCRLine
 from agf_toolkit.processor.constant import (
     GEAR_TYPE_MAPPING,
     SET_NAME_MAPPING,
     STAT_TYPE_REGEX_MAPPING,
 )
+from agf_toolkit.processor.gear import Stat
+from agf_toolkit.processor.glyph import GlyphRecogniser
+from agf_toolkit.processor.image import crop, retry_variants
+from agf_toolkit.processor.transcript import StatRow
 
 stat_types = f"({'|'.join(i.pattern for i in STAT_TYPE_REGEX_MAPPING)})"
 STAT_REGEX = stat_types + r"\s*?([\[\{\(]\s*[LliI1]ocked\s*[\}\]\)])?\s*?(\d+?(\.\d+?)?%?)\s"
 
-logger.info("If this is your first start, the OCR model will be downloaded (roughly 20MB).")
-logger.info("Loading OCR model.")
-OCR = PaddleOCR(use_angle_cls=False, lang="en", show_log=False, rec_algorithm="SVTR_LCNet")
 
+@functools.cache
+def load_ocr() -> PaddleOCR:
+    """Load the OCR model, once. Text processing alone, e.g. parsing transcripts, never loads it."""
+    logger.info("If this is your first start, the OCR model will be downloaded (roughly 20MB).")
+    logger.info("Loading OCR model.")
+    return PaddleOCR(use_angle_cls=False, lang="en", show_log=False, rec_algorithm="SVTR_LCNet")
 
-def extract_text(image: np.ndarray[int, np.dtype[np.generic]]) -> str:
-    """Extract text from gear info box. At least it's more accurate than Tesseract."""
+
+def __getattr__(name: str) -> Any:
+    # The model used to be loaded on import as `OCR`, which is kept working
+    if name == "OCR":
+        return load_ocr()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class PaddleBackend(OCRBackend):
+    """General purpose OCR with PaddleOCR. At least it's more accurate than Tesseract."""
+
+    def __init__(self, ocr: PaddleOCR | None = None) -> None:
+        """
+        Initialise the backend.
+
+        :param ocr: The PaddleOCR instance. Defaults to the shared model, loaded on first use.
+        """
+        self._ocr = ocr
+
+    @property
+    def ocr(self) -> PaddleOCR:
+        """The PaddleOCR instance."""
+        if self._ocr is None:
+            self._ocr = load_ocr()
+        return self._ocr
+
+    def read(self, image) -> list[OCRLine]:
+        """Detect and recognise all text lines, from top to bottom."""
+        lines = []
+        # The last [0] is introduced in PaddleOCR 2.6.0.2, and it's None when nothing is detected
+        for points, (text, confidence) in self.ocr.ocr(image, cls=False)[0] or []:
+            x_coords, y_coords = zip(*points)
+            box = (int(min(x_coords)), int(min(y_coords)), int(max(x_coords)), int(max(y_coords)))
+            lines.append(OCRLine(text, box, float(confidence)))
+        return lines
+
+    def recognise_lines(self, images: Sequence) -> list[tuple[str, float]]:
+        """Recognise pre-cropped lines in one batch, skipping text detection."""
+        if not images:
+            return []
+        return [(text, float(confidence)) for text, confidence in self.ocr.text_recognizer(list(images))[0]]
+
+
+# Backend for the free text (set, type and stat names), and for the numeric stat values. With no numeric backend,
+# everything is read with the text backend. The glyph recogniser reads values in milliseconds, leaving those it isn't
+# confident about to the text backend.
+TEXT_BACKEND: OCRBackend = PaddleBackend()
+NUMERIC_BACKEND: OCRBackend | None = GlyphRecogniser.load()
+
+
+# Stat values read by the numeric backend with a lower confidence are read again by the text backend
+MIN_VALUE_CONFIDENCE = 0.8
+# Lines read by the text backend with a lower confidence are read again from preprocessed crops
+MIN_LINE_CONFIDENCE = 0.9
+# Padding around a detected line's box when cropping it for another attempt
+LINE_PADDING = 4
+
+
+def use_backends(text_backend: OCRBackend, numeric_backend: OCRBackend | None) -> None:
+    """
+    Replace the OCR backends used by the parsers.
+
+    :param text_backend: The backend for free text.
+    :param numeric_backend: The backend for stat values, or `None` to read them with the text backend.
+    """
+    global TEXT_BACKEND, NUMERIC_BACKEND  # pylint: disable=global-statement
+    TEXT_BACKEND, NUMERIC_BACKEND = text_backend, numeric_backend
+
+
+def recognise_with_retry(
+    images: Sequence[np.ndarray[int, np.dtype[np.generic]]],
+    backend: OCRBackend | None = None,
+    min_confidence: float = MIN_LINE_CONFIDENCE,
+) -> list[tuple[str, float]]:
+    """
+    Recognise line images, then read the low confidence ones again from preprocessed variants of them.
+
+    Only lines below `min_confidence` are retried, all their variants in one batch, and the most confident reading of
+    each line is kept.
+
+    :param images: The line images.
+    :param backend: The backend to use. Defaults to the text backend.
+    :param min_confidence: The confidence below which a line is retried.
+    :return: The text and confidence of each line, in the same order.
+    """
+    backend = backend or TEXT_BACKEND
+    results = backend.recognise_lines(images)
+    if not (retry := [i for i, (_, confidence) in enumerate(results) if confidence < min_confidence]):
+        return results
+
+    variants = [(i, variant) for i in retry for variant in retry_variants(images[i])]
+    for (i, _), result in zip(variants, backend.recognise_lines([variant for _, variant in variants])):
+        if result[1] > results[i][1]:
+            logger.debug(f"Line {results[i]} read again as {result}.")
+            results[i] = result
+    return results
+
+
+def extract_lines(
+    image: np.ndarray[int, np.dtype[np.generic]],
+    backend: OCRBackend | None = None,
+    min_confidence: float = MIN_LINE_CONFIDENCE,
+) -> list[OCRLine]:
+    """
+    Extract text lines with their boxes and confidences, retrying only the low confidence lines.
+
+    :param image: The image, e.g. the gear info box.
+    :param backend: The backend to use. Defaults to the text backend.
+    :param min_confidence: The confidence below which a line is read again from preprocessed crops.
+    :return: The text lines.
+    """
+    lines = (backend or TEXT_BACKEND).read(image)
+    if retry := [i for i, line in enumerate(lines) if line.confidence < min_confidence]:
+        logger.debug(f"Reading {len(retry)} low confidence line(s) again.")
+        crops = [
+            crop(
+                image,
+                (max(0, left - LINE_PADDING), max(0, top - LINE_PADDING)),
+                (right + LINE_PADDING, bottom + LINE_PADDING),
+            )
+            for left, top, right, bottom in (lines[i].box for i in retry)
+        ]
+        for i, (text, confidence) in zip(retry, recognise_with_retry(crops, backend, min_confidence)):
+            if confidence > lines[i].confidence:
+                lines[i] = OCRLine(text, lines[i].box, confidence)
+    return lines
+
+
+def extract_text(image: np.ndarray[int, np.dtype[np.generic]], backend: OCRBackend | None = None) -> str:
+    """Extract text from gear info box."""
     logger.info("Starting OCR on gear info.")
-    result = " ".join(i[-1][0] for i in OCR.ocr(image, cls=False)[0])  # The last [0] is introduced in PaddleOCR 2.6.0.2
+    result = " ".join(line.text for line in extract_lines(image, backend))
     logger.debug(f"OCR result: {result}")
     return result
 
 
+def line_confidence(lines: Sequence[OCRLine], text: str | None) -> float:
+    """
+    Return the confidence of the line a piece of text was read from, or 0 if no line contains it.
+
+    Text wrapped over consecutive lines, e.g. a long set name, is found in the lines joined with spaces as
+    `extract_gear_set` reads them, and gets the mean confidence of those lines. The text must appear as whole tokens,
+    so e.g. a value of `10` isn't found in a line reading `110` or `10.5%`.
+    """
+    if not text:
+        return 0.0
+    pattern = re.compile(rf"(?<![\w.%]){re.escape(text)}(?![\w.%])")
+    ocr_string = " ".join(line.text for line in lines)
+    # Offset of each line in the joined string
+    offsets = np.cumsum([0] + [len(line.text) + 1 for line in lines[:-1]])
+    confidences = []
+    for match in pattern.finditer(ocr_string):
+        first = int(np.searchsorted(offsets, match.start(), side="right")) - 1
+        last = int(np.searchsorted(offsets, match.end() - 1, side="right")) - 1
+        confidences.append(float(np.mean([line.confidence for line in lines[first : last + 1]])))
+    return max(confidences, default=0.0)
+
+
 def extract_gear_set(ocr_string: str) -> str:
     """Extract gear grade from OCR-ed string"""
     for i in SET_NAME_MAPPING:
@@ -55,6 +217,83 @@ def extract_stats(ocr_string: str) -> list[tuple[str, str]]:
     return stats
 
 
+def extract_stats_from_lines(lines: Sequence[OCRLine]) -> list[tuple[str, str, dict[str, float]]]:
+    """
+    Extract gear stats from free text lines, as `extract_stats` does from the lines joined with spaces.
+
+    :return: The type, value and the confidence of both for each stat, i.e. of the lines they were read from.
+    """
+    ocr_string = " ".join(line.text for line in lines)
+    # Offset of each line in the joined string
+    offsets = np.cumsum([0] + [len(line.text) + 1 for line in lines[:-1]])
+    stats = []
+    for match in re.finditer(STAT_REGEX, ocr_string):
+        name_line = lines[int(np.searchsorted(offsets, match.start(1), side="right")) - 1]
+        value_line = lines[int(np.searchsorted(offsets, match.start(3), side="right")) - 1]
+        confidence = {"stat_type": name_line.confidence, "stat_value": value_line.confidence}
+        stats.append((parse_sub_stat_type(match.group(1)), match.group(3), confidence))
+    logger.info(f"Stats detected as: {[stat[:2] for stat in stats]}")
+    return stats
+
+
+def read_stat_rows(img: np.ndarray[int, np.dtype[np.generic]]) -> list[StatRow]:
+    """
+    Recognise the stat table of an info box, already rescaled to the template geometry, row by row.
+
+    Stat names are recognised in one batch by the text backend, skipping text detection, and values by the numeric
+    backend. Rows are read until one has no text in its name column, since gears with less stars have less sub stats.
+    Nothing is interpreted here, see `stats_from_rows`.
+    """
+    name_left, name_right = templates.STAT_NAME_COLUMN
+    value_left, value_right = templates.STAT_VALUE_COLUMN
+    names = recognise_with_retry([img[top:bottom, name_left:name_right] for top, bottom in templates.STAT_ROWS])
+
+    rows = []
+    for (top, bottom), (name, confidence) in zip(templates.STAT_ROWS, names):
+        if not name.strip():
+            break
+        rows.append((name, confidence, img[top:bottom, value_left:value_right]))
+
+    values = _read_values([value_image for *_, value_image in rows])
+    return [StatRow(name, name_confidence, *value) for (name, name_confidence, _), value in zip(rows, values)]
+
+
+def _read_values(value_images: list[np.ndarray]) -> list[tuple[str, float]]:
+    """Recognise stat values with the numeric backend, reading low confidence ones again with the text backend."""
+    values = (NUMERIC_BACKEND or TEXT_BACKEND).recognise_lines(value_images)
+    if retry := [i for i, (_, confidence) in enumerate(values) if confidence < MIN_VALUE_CONFIDENCE]:
+        logger.debug(f"Reading {len(retry)} low confidence value(s) with the text backend.")
+        for i, value in zip(retry, recognise_with_retry([value_images[i] for i in retry])):
+            values[i] = value
+    return values
+
+
+def stats_from_rows(rows: Sequence[StatRow]) -> list[tuple[str, str, dict[str, float]]]:
+    """
+    Interpret stat table rows. Rows are taken until one has no recognisable stat name.
+
+    :return: The type, value and the confidence of both for each stat.
+    """
+    stats = []
+    for row in rows:
+        if not any(pattern.match(row.name) for pattern in STAT_TYPE_REGEX_MAPPING):
+            break
+        match = Stat.VALUE_REGEX.search(row.value.replace(" ", ""))
+        confidence = {"stat_type": row.name_confidence, "stat_value": row.value_confidence}
+        stats.append((parse_sub_stat_type(row.name), match.group() if match else row.value, confidence))
+    logger.info(f"Stats detected as: {[stat[:2] for stat in stats]}")
+    return stats
+
+
+def extract_stats_by_row(img: np.ndarray[int, np.dtype[np.generic]]) -> list[tuple[str, str, dict[str, float]]]:
+    """
+    Extract gear stats row by row from the stat table of an info box, already rescaled to the template geometry.
+
+    :return: The type, value and the confidence of both for each stat.
+    """
+    return stats_from_rows(read_stat_rows(img))
+
+
 def parse_sub_stat_type(sub_stat_regex_result: str) -> str:
     """Attempt to parse the sub stat type from the regex result."""
     for pattern, true_value in STAT_TYPE_REGEX_MAPPING.items():
@@ -0,0 +1,100 @@
+"""
+Raw readings of an info box, kept so gears can be derived again without running OCR or template matching.
+
+A transcript holds everything the parser reads from the image: the OCR lines with their boxes and confidences, the raw
+stat table rows, the sampled rarity marker colours and the star template scores. `processor.utils.parse_transcript`
+turns it into a Gear with the current text processing, so fixes to the regexes or thresholds can be rolled out over
+archived screenshots at text processing speed.
+
+Transcripts are stored one per line as JSON objects, along with the source they were read from.
+"""
+import json
+from collections.abc import Iterator
+from os import PathLike
+from pathlib import Path
+from typing import NamedTuple
+
+from loguru import logger
+
+from agf_toolkit.abc import OCRLine
+
+
+class StatRow(NamedTuple):
+    """A row of the stat table, as recognised."""
+
+    name: str
+    name_confidence: float
+    value: str
+    value_confidence: float
+
+
+class Transcript(NamedTuple):
+    """Raw readings of an info box."""
+
+    # Free text lines. With a numeric backend, they were read with the stat table masked out.
+    lines: list[OCRLine]
+    # Rows of the stat table read one by one, or `None` if stats were read from the free text
+    stat_rows: list[StatRow] | None
+    # RGB colour of each sub stat's rarity marker
+    rarity_pixels: list[tuple[int, int, int]]
+    # Template score of each star count
+    star_scores: dict[int, float]
+    # Pixels of the best 6* match with the 6* star colour
+    six_star_pixels: int
+
+    def as_dict(self) -> dict:
+        """Return the transcript as a JSON serialisable dictionary."""
+        return {
+            "lines": [[line.text, list(line.box), line.confidence] for line in self.lines],
+            "stat_rows": None if self.stat_rows is None else [list(row) for row in self.stat_rows],
+            "rarity_pixels": [list(pixel) for pixel in self.rarity_pixels],
+            "star_scores": {str(star): score for star, score in self.star_scores.items()},
+            "six_star_pixels": self.six_star_pixels,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Transcript":
+        """Rebuild a transcript from `as_dict()`."""
+        return cls(
+            lines=[OCRLine(text, tuple(box), confidence) for text, box, confidence in data["lines"]],  # type: ignore
+            stat_rows=None if data["stat_rows"] is None else [StatRow(*row) for row in data["stat_rows"]],
+            rarity_pixels=[tuple(pixel) for pixel in data["rarity_pixels"]],  # type: ignore
+            star_scores={int(star): score for star, score in data["star_scores"].items()},
+            six_star_pixels=data["six_star_pixels"],
+        )
+
+
+class TranscriptStore:
+    """Append-only file of transcripts, one JSON object per line."""
+
+    def __init__(self, path: str | PathLike) -> None:
+        self.path = Path(path)
+        self._file = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        return self
+
+    def __exit__(self, *_):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def add(self, source: str | PathLike, transcript: Transcript) -> None:
+        """Append the transcript of a source, e.g. a screenshot's path. The store must be open."""
+        if self._file is None:
+            raise RuntimeError("Transcript store isn't open for writing.")
+        self._file.write(json.dumps({"source": str(source), **transcript.as_dict()}) + "\n")
+
+    def __iter__(self) -> Iterator[tuple[str, Transcript]]:
+        """Read the stored (source, transcript) tuples in order. Malformed lines are logged and skipped."""
+        with open(self.path, encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                    yield data["source"], Transcript.from_dict(data)
+                except (KeyError, TypeError, ValueError) as exc:
+                    logger.warning(f"Malformed transcript on line {number} of {self.path}: {exc!r}")
@@ -2,38 +2,105 @@ import numpy as np
 from loguru import logger
 
 from agf_toolkit import templates
+from agf_toolkit.processor import text
 from agf_toolkit.processor.gear import Gear, Stat
 from agf_toolkit.processor.image import (
-    extract_gear_star,
     extract_info_box,
-    extract_sub_stat_rarity,
+    extract_info_box_rescaled,
+    gear_star_from_scores,
+    rarity_from_pixels,
+    sample_rarity_pixels,
+    score_gear_star,
 )
 from agf_toolkit.processor.text import (
     extract_gear_set,
     extract_gear_type,
-    extract_stats,
-    extract_text,
+    extract_lines,
+    extract_stats_from_lines,
+    line_confidence,
+    read_stat_rows,
+    stats_from_rows,
 )
+from agf_toolkit.processor.transcript import Transcript
 
 
-def parse_screenshot(screenshot: np.ndarray[int, np.dtype[np.generic]]) -> Gear:
-    """Parse the screenshot into instance's attributes."""
+def transcribe_screenshot(
+    screenshot: np.ndarray[int, np.dtype[np.generic]],
+    scaling_factor: float | None = None,
+    info_box_location: tuple[int, int] | None = None,
+) -> Transcript:
+    """Read the raw OCR and pixel data off a screenshot. See `parse_screenshot` for the parameters."""
+    if scaling_factor is None:
+        img = extract_info_box(screenshot, templates.INFO_BOX)
+    else:
+        img = extract_info_box_rescaled(screenshot, templates.INFO_BOX, scaling_factor, info_box_location)
+
+    return transcribe_info_box(img)
+
+
+def parse_screenshot(
+    screenshot: np.ndarray[int, np.dtype[np.generic]],
+    scaling_factor: float | None = None,
+    info_box_location: tuple[int, int] | None = None,
+) -> Gear:
+    """
+    Parse the screenshot into instance's attributes.
+
+    :param screenshot: The screenshot. If `scaling_factor` is given, this is the unscaled screenshot as captured.
+        Otherwise, it must already be rescaled to the template geometry.
+    :param scaling_factor: The calibrated scaling factor. Only the info box is cropped out and rescaled.
+    :param info_box_location: The approximate top-left corner of the info box in unscaled coordinates, if known.
+    """
     if screenshot is None:
         logger.error("No screenshot found! Returning!")
         return Gear()
 
-    img = extract_info_box(screenshot, templates.INFO_BOX)
-    txt = extract_text(img)
+    return parse_transcript(transcribe_screenshot(screenshot, scaling_factor, info_box_location))
+
+
+def transcribe_info_box(img: np.ndarray[int, np.dtype[np.generic]]) -> Transcript:
+    """
+    Read the raw OCR and pixel data off an info box, already cropped and rescaled to the template geometry.
+
+    With a numeric OCR backend, the stat table is read row by row and masked out of the free text OCR, which then only
+    has the set and type names left to read.
+    """
+    logger.info("Starting OCR on gear info.")
+    if text.NUMERIC_BACKEND is None:
+        lines = extract_lines(img)
+        stat_rows = None
+    else:
+        left, top, right, bottom = templates.STAT_TABLE_REGION
+        masked = img.copy()
+        masked[top:bottom, left:right] = 255
+        lines = extract_lines(masked)
+        stat_rows = read_stat_rows(img)
+
+    star_scores, six_star_pixels = score_gear_star(img, templates.STARS)
+    return Transcript(lines, stat_rows, sample_rarity_pixels(img), star_scores, six_star_pixels)
+
+
+def parse_transcript(transcript: Transcript) -> Gear:
+    """Derive a Gear object from the raw readings of an info box. No OCR or image processing is involved."""
+    lines = transcript.lines
+    txt = " ".join(line.text for line in lines)
+    logger.debug(f"OCR result: {txt}")
+    if transcript.stat_rows is None:
+        _stat_data = extract_stats_from_lines(lines)
+    else:
+        _stat_data = stats_from_rows(transcript.stat_rows)
 
     # As much as I hate it, I have to do this. Currently, there's no concrete data on rarity threshold except for 6-star
     # equipments. Any half-arsed attempt to accommodate 6-star with generic detection will result in code bloat without
     # actually reconciling sub stats' rarity detection and sub stats' stat_value detection. Until then, we make do.
-    rarity, _sub_stat_rarity = extract_sub_stat_rarity(img)
+    rarity, _sub_stat_rarity = rarity_from_pixels(transcript.rarity_pixels)
     _stat_rarity = (None, *_sub_stat_rarity.values())
-    _stat_data = extract_stats(txt)
-    main_stat, *sub_stats = tuple(Stat(*data, rarity) for data, rarity in zip(_stat_data, _stat_rarity))
+    main_stat, *sub_stats = tuple(
+        Stat(stat_type, stat_value, rarity, confidence)
+        for (stat_type, stat_value, confidence), rarity in zip(_stat_data, _stat_rarity)
+    )
 
-    star = extract_gear_star(img, templates.STARS)
+    star = gear_star_from_scores(transcript.star_scores, transcript.six_star_pixels)
     gear_set = extract_gear_set(txt)
     gear_type = extract_gear_type(txt)
 
@@ -44,4 +111,10 @@ def parse_screenshot(screenshot: np.ndarray[int, np.dtype[np.generic]]) -> Gear:
         gear_star=star,
         main_stat=main_stat,
         sub_stats=sub_stats,
+        confidence={"gear_set": line_confidence(lines, gear_set), "gear_type": line_confidence(lines, gear_type)},
     )
+
+
+def parse_info_box(img: np.ndarray[int, np.dtype[np.generic]]) -> Gear:
+    """Parse an info box, already cropped and rescaled to the template geometry, into a Gear object."""
+    return parse_transcript(transcribe_info_box(img))
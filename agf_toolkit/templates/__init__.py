@@ -1,31 +1,143 @@
 import logging
-import sys
+from functools import lru_cache
 from importlib import resources
-from types import NoneType
+from pathlib import Path
+from typing import Any
 
-import cv2
+import numpy as np
 from loguru import logger
 
-__all__ = ["INFO_BOX", "STARS"]
+__all__ = [
+    "INFO_BOX",
+    "INFO_BOX_GRAY",
+    "INFO_BOX_THRESH",
+    "INFO_BOX_LAB",
+    "INFO_BOX_COARSE",
+    "STARS",
+    "STARS_GRAY",
+    "STARS_THRESH",
+    "STARS_LAB",
+    "SUB_STATS",
+    "STAT_ROWS",
+    "STAT_NAME_COLUMN",
+    "STAT_VALUE_COLUMN",
+    "STAT_TABLE_REGION",
+    "get_scaled_info_box",
+]
 
-logging.getLogger(cv2.__name__).setLevel(logging.CRITICAL)
+# The PNGs are precompiled into one `.npy` file per form (raw, grayscale, Otsu-thresholded and Lab), shipped with the
+# package and memory-mapped on first access. Rebuild them with `build_bundle()` whenever a PNG changes.
+BUNDLE_VERSION = 2
+BUNDLE_DIR = Path(__file__).with_name(f"bundle-v{BUNDLE_VERSION}")
 
-INFO_BOX = cv2.imread(str(resources.path("agf_toolkit.templates", "info_box.png")))
 SUB_STAT_1 = (30, 400)
 SUB_STAT_2 = (30, 450)
 SUB_STAT_3 = (30, 500)
 SUB_STAT_4 = (30, 550)
-STARS = {
-    1: cv2.imread(str(resources.path("agf_toolkit.templates", "1.png"))),
-    2: cv2.imread(str(resources.path("agf_toolkit.templates", "2.png"))),
-    3: cv2.imread(str(resources.path("agf_toolkit.templates", "3.png"))),
-    4: cv2.imread(str(resources.path("agf_toolkit.templates", "4.png"))),
-    5: cv2.imread(str(resources.path("agf_toolkit.templates", "5.png"))),
-    6: cv2.imread(str(resources.path("agf_toolkit.templates", "6.png"))),
-}
+SUB_STATS = (SUB_STAT_1, SUB_STAT_2, SUB_STAT_3, SUB_STAT_4)
+
+# Rows of the stat table in template coordinates as (top, bottom), main stat first, and the columns of stat names and
+# values as (left, right)
+STAT_ROWS = ((306, 360), (376, 418), (425, 467), (474, 516), (523, 565))
+STAT_NAME_COLUMN = (60, 360)
+STAT_VALUE_COLUMN = (360, 505)
+STAT_TABLE_REGION = (15, 300, 505, 570)  # (left, top, right, bottom)
+
+# Relative size of the coarse info box template used by `processor.image.locate_info_box`
+COARSE_SCALE = 0.25
+
+_SOURCES = {"info_box": "info_box.png", **{f"star_{i}": f"{i}.png" for i in range(1, 7)}}
+_STAR_COUNTS = range(1, 7)
+
+
+def _build_bundle() -> dict[str, np.ndarray]:
+    """Read the source PNGs and derive all forms of them."""
+    # pylint: disable=import-outside-toplevel
+    import cv2
+
+    logging.getLogger(cv2.__name__).setLevel(logging.CRITICAL)
 
-if any(isinstance(i, NoneType) for i in [INFO_BOX, *STARS.values()]):
-    logger.critical(
-        "Failed to load templates! "
-        "Please verify that ALL templates are present in the 'templates' directory as instructed!"
+    bundle: dict[str, np.ndarray] = {"sub_stats": np.array(SUB_STATS)}
+    for name, file_name in _SOURCES.items():
+        raw = cv2.imread(str(resources.files(__name__) / file_name))
+        if raw is None:
+            logger.critical(
+                "Failed to load templates! "
+                "Please verify that ALL templates are present in the 'templates' directory as instructed!"
+            )
+            raise FileNotFoundError(f"Template {file_name} is missing or unreadable.")
+
+        gray = cv2.cvtColor(raw, cv2.COLOR_BGR2GRAY)
+        bundle[name] = raw
+        bundle[f"{name}_gray"] = gray
+        bundle[f"{name}_thresh"] = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+        bundle[f"{name}_lab"] = cv2.cvtColor(raw, cv2.COLOR_BGR2LAB)
+
+    info_box_h, info_box_w = bundle["info_box"].shape[:2]
+    bundle["info_box_coarse"] = cv2.resize(
+        bundle["info_box"],
+        (int(info_box_w * COARSE_SCALE), int(info_box_h * COARSE_SCALE)),
+        interpolation=cv2.INTER_AREA,
     )
+    return bundle
+
+
+def build_bundle(directory: str | Path = BUNDLE_DIR) -> None:
+    """
+    Precompile the source PNGs into a bundle.
+
+    :param directory: Directory to write the bundle's `.npy` files to. Defaults to the bundle shipped with the package.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, array in _build_bundle().items():
+        np.save(directory / f"{name}.npy", array)
+    logger.info(f"Template bundle written to {directory}.")
+
+
+@lru_cache(maxsize=None)
+def _load(name: str) -> np.ndarray:
+    """Memory-map a member of the bundle. Members are read-only."""
+    return np.load(BUNDLE_DIR / f"{name}.npy", mmap_mode="r")
+
+
+def _rescale_info_box(info_box: np.ndarray, scaling_factor: float) -> np.ndarray:
+    """Rescale the info box template to the geometry of a screenshot with the given scaling factor."""
+    # pylint: disable=import-outside-toplevel
+    import cv2
+
+    info_box_h, info_box_w = info_box.shape[:2]
+    size = (round(info_box_w / scaling_factor), round(info_box_h / scaling_factor))
+    return cv2.resize(info_box, size, interpolation=cv2.INTER_AREA if scaling_factor > 1 else cv2.INTER_LINEAR)
+
+
+@lru_cache(maxsize=16)
+def get_scaled_info_box(scaling_factor: float) -> np.ndarray:
+    """
+    Return the info box template at the geometry of a screenshot with the given scaling factor.
+
+    Variants are computed on first use and cached, rather than shipped, as they'd be several times the size of the
+    rest of the bundle.
+    """
+    return _rescale_info_box(_load("info_box"), scaling_factor)
+
+
+_LAZY_ATTRIBUTES = {
+    "INFO_BOX": lambda: _load("info_box"),
+    "INFO_BOX_GRAY": lambda: _load("info_box_gray"),
+    "INFO_BOX_THRESH": lambda: _load("info_box_thresh"),
+    "INFO_BOX_LAB": lambda: _load("info_box_lab"),
+    "INFO_BOX_COARSE": lambda: _load("info_box_coarse"),
+    "STARS": lambda: {i: _load(f"star_{i}") for i in _STAR_COUNTS},
+    "STARS_GRAY": lambda: {i: _load(f"star_{i}_gray") for i in _STAR_COUNTS},
+    "STARS_THRESH": lambda: {i: _load(f"star_{i}_thresh") for i in _STAR_COUNTS},
+    "STARS_LAB": lambda: {i: _load(f"star_{i}_lab") for i in _STAR_COUNTS},
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Load templates on first access, then cache them as module attributes so the same objects are always returned."""
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = _LAZY_ATTRIBUTES[name]()
+    return value
@@ -4,6 +4,7 @@ import shutil
 import stat
 import subprocess
 import sys
+from typing import Any
 from zipfile import ZipFile
 
 import adbutils
@@ -17,13 +18,13 @@ from tqdm import tqdm
 from agf_toolkit import DATA_DIR
 
 
-def _monkeypatch_screenshot(self: adbutils.AdbDevice) -> np.ndarray[int, np.dtype[np.generic]]:
+def screenshot(device: adbutils.AdbDevice) -> np.ndarray[int, np.dtype[np.generic]]:
     """
-    Monkey patch for adbutils.AdbDevice.screenshot()
+    Take a screenshot from a device as a BGR array, rather than the PIL image of `adbutils.AdbDevice.screenshot()`.
 
     Based on https://github.com/openatx/adbutils/pull/78, replacing PIL with cv2, and using 3.8+ syntax.
     """
-    conn = self.shell(["screencap", "-p"], stream=True)
+    conn = device.shell(["screencap", "-p"], stream=True)
     raw_png = b""
     while chunk := conn.read(4096):
         raw_png += chunk
@@ -32,7 +33,18 @@ def _monkeypatch_screenshot(self: adbutils.AdbDevice) -> np.ndarray[int, np.dtyp
     return img
 
 
-adbutils.AdbDevice.screenshot = _monkeypatch_screenshot
+class Device:
+    """Wrap an `adbutils.AdbDevice`, taking screenshots with `screenshot()`. Everything else goes to the device."""
+
+    def __init__(self, device: adbutils.AdbDevice) -> None:
+        self.device = device
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.device, name)
+
+    def screenshot(self) -> np.ndarray[int, np.dtype[np.generic]]:
+        """Take a screenshot as a BGR array."""
+        return screenshot(self.device)
 
 
 ADB_DOWNLOAD_PATH = DATA_DIR
@@ -83,34 +95,67 @@ if not os.path.exists(ADB):
 logger.info("Starting ADB server...")
 subprocess.run([ADB, "start-server"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-# Connect to device over network if needed
-if all([ip := os.environ.get("IP"), port := os.environ.get("PORT")]):  # Dirty null check
-    logger.info("Connecting to device over network.")
-    try:
-        adb.connect(f"{ip}:{port}", timeout=5.0)  # Should be more than enough
-    except adbutils.errors.AdbTimeout:
-        logger.critical("Timeout! Failed to connect to device over network!")
-        sys.exit(1)
-
-match len(device_list := adb.device_list()):
-    case 0:
-        logger.critical("No devices found!")
-        sys.exit(1)
-    case 1:
-        DEVICE = device_list[0]
-    case _:
-        print("Select your device: ")
-        for i, d in enumerate(device_list):
-            print(f"{i :<2}: {d.serial}")
-
-        print("(Enter a number (1 - {len(device_list)})): ", end="")
-        while not ((choice := input()).isnumeric() and int(choice) in range(1, len(device_list) + 1)):
-            print("Invalid input! Please try again: ", end="")
-
-        DEVICE = device_list[int(choice) - 1]
+
+def connect(identifier: str) -> Device:
+    """
+    Get a device by its serial number, or by `host:port` for devices debugged over network.
+
+    :param identifier: The serial number, or `host:port`, of the device.
+    :return: The device.
+    """
+    if ":" in identifier:
+        logger.info(f"Connecting to {identifier} over network.")
+        adb.connect(identifier, timeout=5.0)  # Should be more than enough
+    return Device(adb.device(serial=identifier))
+
+
+def _select_device() -> adbutils.AdbDevice:
+    """Connect to the configured device, or let the user pick one if several are connected."""
+    # Connect to device over network if needed
+    if all([ip := os.environ.get("IP"), port := os.environ.get("PORT")]):  # Dirty null check
+        try:
+            connect(f"{ip}:{port}")
+        except adbutils.errors.AdbTimeout:
+            logger.critical("Timeout! Failed to connect to device over network!")
+            sys.exit(1)
+
+    match len(device_list := adb.device_list()):
+        case 0:
+            logger.critical("No devices found!")
+            sys.exit(1)
+        case 1:
+            return device_list[0]
+        case _:
+            print("Select your device: ")
+            for i, d in enumerate(device_list):
+                print(f"{i :<2}: {d.serial}")
+
+            print("(Enter a number (1 - {len(device_list)})): ", end="")
+            while not ((choice := input()).isnumeric() and int(choice) in range(1, len(device_list) + 1)):
+                print("Invalid input! Please try again: ", end="")
+
+            return device_list[int(choice) - 1]
+
+
+_DEVICE: Device | None = None
+
+
+def get_device() -> Device:
+    """Return the device to work with, selecting it on first call."""
+    global _DEVICE  # pylint: disable=global-statement
+    if _DEVICE is None:
+        _DEVICE = Device(_select_device())
+    return _DEVICE
+
+
+def __getattr__(name: str):
+    """Select the device on first access of `DEVICE`, so modules driving their own devices aren't prompted."""
+    if name != "DEVICE":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return get_device()
 
 
 def screencap() -> np.ndarray[int, np.dtype[np.generic]]:
     """Take a screenshot from the connected device."""
     logger.info("Taking screenshot.")
-    return DEVICE.screenshot()
+    return get_device().screenshot()
@@ -0,0 +1,49 @@
+"""
+Calibration cache, so a device or screenshot source is only calibrated once.
+
+Scaling factors are stored per profile, a free-form name such as a device's serial number. The cache is a small JSON
+file, cheap to read without importing any of the image processing modules.
+"""
+import json
+import os
+from os import PathLike
+from pathlib import Path
+
+from loguru import logger
+
+from agf_toolkit import DATA_DIR
+
+CALIBRATION_CACHE_PATH = DATA_DIR / "calibration.json"
+DEFAULT_PROFILE = "default"
+
+
+def load_calibrations(path: str | PathLike | None = None) -> dict[str, float]:
+    """Load all cached scaling factors by profile. A missing or corrupt cache is treated as empty."""
+    path = path or CALIBRATION_CACHE_PATH
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        logger.warning(f"Failed to read calibration cache {path} ({exc}). Ignoring it.")
+        return {}
+
+
+def get_scaling_factor(profile: str = DEFAULT_PROFILE, path: str | PathLike | None = None) -> float | None:
+    """Return the cached scaling factor of a profile, or `None` if it was never calibrated."""
+    return load_calibrations(path).get(profile)
+
+
+def save_scaling_factor(
+    scaling_factor: float, profile: str = DEFAULT_PROFILE, path: str | PathLike | None = None
+) -> None:
+    """Cache the scaling factor of a profile, replacing the cache atomically."""
+    path = Path(path or CALIBRATION_CACHE_PATH)
+    calibrations = load_calibrations(path)
+    calibrations[profile] = scaling_factor
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(f"{path.name}.tmp")
+    temporary_path.write_text(json.dumps(calibrations, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(temporary_path, path)
+    logger.debug(f"Cached scaling factor {scaling_factor} for profile {profile!r}.")
@@ -0,0 +1,323 @@
+"""
+Resident parse daemon with a local HTTP API.
+
+The daemon loads the OCR model and the templates once and keeps them warm, so a request only costs its own parsing. It
+listens on a TCP port or a Unix socket, and serves every client connection on its own thread. Reading and decoding
+images runs concurrently, while parsing itself is bounded by `max_parses` since the OCR model isn't thread-safe.
+
+Endpoints:
+-   `GET /health` returns `{"status": "ok"}`.
+-   `POST /parse` parses a screenshot and returns the gear as JSON, as `Gear.as_dict()` does. The body is either the
+    raw image bytes, or a JSON object `{"path": "<path to a screenshot>"}`. The calibration is selected with the
+    `profile` or `scaling_factor` query parameters (or the same keys of the JSON object), defaulting to the default
+    profile of the calibration cache.
+
+Paths are only read under the daemon's `path_root` if it has one, and otherwise only for clients of the Unix socket,
+whose file permissions already restrict who may connect. Any local process could otherwise read files as the daemon.
+"""
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections.abc import Callable
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import PathLike
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils import cache
+from agf_toolkit.utils.farm import parse_image
+
+DEFAULT_ADDRESS = ("127.0.0.1", 8765)
+MAX_BODY_SIZE = 64 << 20
+
+
+class _CalibrationCache:
+    """In-memory copy of the calibration cache, reloaded only when the file changes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._mtime: float | None = None
+        self._calibrations: dict[str, float] = {}
+
+    def get(self, profile: str) -> float | None:
+        """Return the scaling factor of a profile, or None if it isn't calibrated."""
+        path = Path(cache.CALIBRATION_CACHE_PATH)
+        mtime = path.stat().st_mtime if path.exists() else None
+        with self._lock:
+            if mtime != self._mtime:
+                self._calibrations, self._mtime = cache.load_calibrations(path), mtime
+            return self._calibrations.get(profile)
+
+
+class ParseRequestHandler(BaseHTTPRequestHandler):
+    """Handle requests to the parse daemon."""
+
+    server: "ParseServerMixin"  # type: ignore[assignment]  # Always one of the servers below
+    protocol_version = "HTTP/1.1"  # Keep connections alive between requests of the same client
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        logger.debug(f"Request: {format % args}")
+
+    def _reply(self, status: HTTPStatus, body: Any) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Health check."""
+        if urlsplit(self.path).path == "/health":
+            self._reply(HTTPStatus.OK, {"status": "ok"})
+        else:
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint {self.path}."})
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Parse a screenshot."""
+        url = urlsplit(self.path)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY_SIZE:
+            # The body can't be skipped, so the next request on this connection couldn't be found
+            self.close_connection = True
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": f"Content-Length must be an integer up to {MAX_BODY_SIZE}."})
+            return
+
+        # Read the body even when it's not used, so the connection stays usable
+        body = self.rfile.read(length)
+        if url.path != "/parse":
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint {url.path}."})
+            return
+        if not body:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": f"Body must be between 1 and {MAX_BODY_SIZE} bytes."})
+            return
+
+        options = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                request = json.loads(body)
+                options.update({key: request[key] for key in ("profile", "scaling_factor") if key in request})
+                image = cv2.imread(str(self.server.resolve_path(request["path"])))
+            else:
+                image = cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError("Image couldn't be read.")
+            scaling_factor = self.server.resolve_scaling_factor(options)
+        except PermissionError as exc:
+            self._reply(HTTPStatus.FORBIDDEN, {"error": str(exc)})
+            return
+        except (KeyError, TypeError, ValueError) as exc:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": f"Invalid request: {exc!r}"})
+            return
+
+        try:
+            gear = self.server.parse(image, scaling_factor)
+        except Exception as exc:  # pylint: disable=broad-except  # A bad screenshot shouldn't kill the daemon
+            logger.exception("Parsing failed.")
+            self._reply(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Parsing failed: {exc!r}"})
+            return
+        self._reply(HTTPStatus.OK, gear.as_dict())
+
+
+class ParseServerMixin:
+    """Parsing state shared by the TCP and Unix socket servers."""
+
+    daemon_threads = True
+    # Whether only local users allowed by the socket's file permissions can connect
+    local_only = False
+
+    def __init__(
+        self,
+        address: Any,
+        parser: Callable[[np.ndarray, float | None], Gear] = parse_image,
+        max_parses: int = 1,
+        path_root: str | PathLike | None = None,
+    ) -> None:
+        """
+        Initialise the server and bind it.
+
+        :param address: The address to bind to.
+        :param parser: Function parsing an unscaled screenshot with its scaling factor.
+        :param max_parses: Maximum number of screenshots parsed at once.
+        :param path_root: Directory the screenshots of path requests must be in. Without it, path requests are only
+            served over a Unix socket.
+        """
+        if max_parses < 1:
+            raise ValueError("Maximum number of concurrent parses must be at least 1.")
+        self.parser = parser
+        self.path_root = None if path_root is None else Path(path_root).resolve()
+        self._parse_slots = threading.BoundedSemaphore(max_parses)
+        self._calibrations = _CalibrationCache()
+        super().__init__(address, ParseRequestHandler)  # type: ignore[call-arg]
+
+    def resolve_scaling_factor(self, options: dict[str, Any]) -> float | None:
+        """Return the scaling factor requested, either directly or by calibration profile."""
+        if options.get("scaling_factor") not in (None, ""):
+            return float(options["scaling_factor"])
+        return self._calibrations.get(options.get("profile") or cache.DEFAULT_PROFILE)
+
+    def resolve_path(self, path: str) -> Path:
+        """Return the resolved path of a path request, raising PermissionError if the daemon mustn't read it."""
+        resolved = Path(path).resolve()
+        if self.path_root is not None:
+            if not resolved.is_relative_to(self.path_root):
+                raise PermissionError(f"Only screenshots under {self.path_root} can be read.")
+        elif not self.local_only:
+            raise PermissionError("Screenshots can only be read by path over the Unix socket. Send the image instead.")
+        return resolved
+
+    def parse(self, image: np.ndarray, scaling_factor: float | None) -> Gear:
+        """Parse an image, waiting for a free parse slot."""
+        with self._parse_slots:
+            return self.parser(image, scaling_factor)
+
+
+class TCPParseServer(ParseServerMixin, ThreadingHTTPServer):
+    """Parse daemon listening on a TCP address."""
+
+
+class UnixParseServer(ParseServerMixin, socketserver.ThreadingUnixStreamServer):
+    """Parse daemon listening on a Unix socket."""
+
+    local_only = True
+
+    def get_request(self):
+        # Unix socket clients have no address, but the HTTP handler expects a (host, port) pair
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def warm_up() -> None:
+    """Load the OCR model and the templates ahead of the first request."""
+    # pylint: disable=import-outside-toplevel
+    from agf_toolkit import templates
+    from agf_toolkit.processor import text
+
+    logger.info("Warming up the OCR model and templates.")
+    templates.INFO_BOX, templates.STARS_THRESH  # pylint: disable=pointless-statement
+    text.TEXT_BACKEND.recognise_lines([np.full((48, 160, 3), 255, dtype=np.uint8)])
+
+
+def create_server(
+    address: tuple[str, int] | str | PathLike = DEFAULT_ADDRESS,
+    parser: Callable[[np.ndarray, float | None], Gear] = parse_image,
+    max_parses: int = 1,
+    path_root: str | PathLike | None = None,
+) -> TCPParseServer | UnixParseServer:
+    """
+    Create a parse daemon bound to an address. Call `serve_forever()` on it to start serving.
+
+    :param address: A (host, port) pair to listen on over TCP, or the path of a Unix socket.
+    :param parser: Function parsing an unscaled screenshot with its scaling factor.
+    :param max_parses: Maximum number of screenshots parsed at once.
+    :param path_root: Directory the screenshots of path requests must be in. Without it, path requests are only
+        served over a Unix socket.
+    :return: The server.
+    """
+    if isinstance(address, tuple):
+        return TCPParseServer(address, parser, max_parses, path_root)
+
+    Path(address).unlink(missing_ok=True)  # Left over by a daemon that didn't shut down cleanly
+    return UnixParseServer(os.fspath(address), parser, max_parses, path_root)
+
+
+def serve(
+    address: tuple[str, int] | str | PathLike = DEFAULT_ADDRESS,
+    max_parses: int = 1,
+    path_root: str | PathLike | None = None,
+) -> None:
+    """Warm up, then serve parse requests until interrupted."""
+    warm_up()
+    with create_server(address, max_parses=max_parses, path_root=path_root) as server:
+        logger.info(f"Parse daemon listening on {address}.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Parse daemon stopped.")
+        finally:
+            if not isinstance(address, tuple):
+                Path(address).unlink(missing_ok=True)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket."""
+
+    def __init__(self, path: str, timeout: float | None = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ParseClient:
+    """Client of the parse daemon, keeping its connection open between requests."""
+
+    def __init__(self, address: tuple[str, int] | str | PathLike = DEFAULT_ADDRESS, timeout: float = 60.0) -> None:
+        """
+        Initialise the client.
+
+        :param address: The daemon's (host, port) pair, or the path of its Unix socket.
+        :param timeout: Seconds to wait for a response.
+        """
+        if isinstance(address, tuple):
+            self._connection: http.client.HTTPConnection = http.client.HTTPConnection(*address, timeout=timeout)
+        else:
+            self._connection = _UnixHTTPConnection(os.fspath(address), timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._connection.close()
+
+    def _request(self, method: str, url: str, body: bytes | None = None, content_type: str | None = None) -> Any:
+        headers = {"Content-Type": content_type} if content_type else {}
+        self._connection.request(method, url, body=body, headers=headers)
+        response = self._connection.getresponse()
+        result = json.loads(response.read())
+        if response.status != HTTPStatus.OK:
+            raise RuntimeError(f"Parse daemon replied {response.status}: {result.get('error')}")
+        return result
+
+    def health(self) -> bool:
+        """Check that the daemon is up."""
+        return self._request("GET", "/health") == {"status": "ok"}
+
+    def parse_bytes(self, data: bytes, profile: str | None = None, scaling_factor: float | None = None) -> dict:
+        """Parse an encoded screenshot (e.g. PNG bytes), returning the gear as a dictionary."""
+        query = urlencode(
+            {k: v for k, v in (("profile", profile), ("scaling_factor", scaling_factor)) if v is not None}
+        )
+        return self._request("POST", f"/parse?{query}", data, "application/octet-stream")
+
+    def parse_file(self, path: str | PathLike, profile: str | None = None, scaling_factor: float | None = None) -> dict:
+        """
+        Parse a screenshot file readable by the daemon, returning the gear as a dictionary.
+
+        The daemon only reads it over a Unix socket, or under its `path_root`.
+        """
+        request: dict[str, Any] = {"path": os.fspath(Path(path).absolute())}
+        request.update({k: v for k, v in (("profile", profile), ("scaling_factor", scaling_factor)) if v is not None})
+        return self._request("POST", "/parse", json.dumps(request).encode(), "application/json")
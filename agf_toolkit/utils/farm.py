@@ -0,0 +1,226 @@
+"""
+Concurrent capture from multiple Android devices.
+
+Every device gets its own capture loop, rate limited to one screenshot per `min_interval` seconds. Captured frames are
+tagged with their device and fed through a bounded queue to a shared parse backend, so throughput scales with the number
+of devices until the backend is saturated, at which point the queue applies backpressure to the capture loops.
+"""
+import asyncio
+import sys
+import time
+from collections.abc import AsyncIterator, Callable, Mapping, Sequence
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.processor.gear import Gear
+
+if TYPE_CHECKING:
+    from agf_toolkit.utils.ring import FrameRing, SlotHandle
+
+# Frames wait for a free slot of a ring in steps of this many seconds, so stopping the farm never waits on a full ring
+_RING_POLL_INTERVAL = 0.1
+
+
+class Frame(NamedTuple):
+    """A captured screenshot, tagged with the device it came from."""
+
+    device: str
+    timestamp: float
+    image: np.ndarray[int, np.dtype[np.generic]]
+
+
+def parse_image(image: np.ndarray[int, np.dtype[np.generic]], scaling_factor: float | None) -> Gear:
+    """Parse an unscaled screenshot. This is the default parser of the farm."""
+    # Imported here so the OCR model is only loaded by whichever process parses
+    from agf_toolkit.processor.utils import (  # pylint: disable=import-outside-toplevel
+        parse_screenshot,
+    )
+
+    return parse_screenshot(image, scaling_factor=scaling_factor)
+
+
+def parse_info_box(image: np.ndarray[int, np.dtype[np.generic]], _scaling_factor: float | None) -> Gear:
+    """Parse an info box, already cropped and rescaled to the template geometry, e.g. by `FrameRing.put`."""
+    from agf_toolkit.processor import utils  # pylint: disable=import-outside-toplevel
+
+    return utils.parse_info_box(image)
+
+
+def _resolve_device(device: Any) -> Any:
+    """
+    Connect to a device given as a serial number or `host:port`, or wrap an `adbutils.AdbDevice` so it takes screenshots
+    as BGR arrays. Other device objects are passed through.
+    """
+    # Imported here since importing starts the ADB server
+    # pylint: disable=import-outside-toplevel
+    if isinstance(device, str):
+        from agf_toolkit.utils.adb import connect
+
+        return connect(device)
+
+    # A device can only be an adbutils one if adbutils was imported already
+    adbutils = sys.modules.get("adbutils")
+    if adbutils is not None and isinstance(device, adbutils.AdbDevice):
+        from agf_toolkit.utils.adb import Device
+
+        return Device(device)
+    return device
+
+
+class CaptureFarm:  # pylint: disable=too-many-instance-attributes
+    """Capture from several devices concurrently and parse the frames on a shared backend."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        devices: Sequence[Any],
+        scaling_factors: Mapping[str, float] | None = None,
+        parser: Callable[[np.ndarray, float | None], Gear] = parse_image,
+        executor: Executor | None = None,
+        min_interval: float = 1.0,
+        max_pending: int = 8,
+        ring: "FrameRing | None" = None,
+        min_intervals: Mapping[str, float] | None = None,
+    ) -> None:
+        """
+        Initialise the farm and connect to the devices.
+
+        :param devices: Serial numbers, `host:port` addresses, or `adbutils.AdbDevice` objects.
+        :param scaling_factors: Calibrated scaling factor per device serial. Devices not in it are parsed unscaled.
+        :param parser: Function parsing a frame's image with its device's scaling factor. It must be picklable if the
+            executor is a process pool.
+        :param executor: The parse backend. Defaults to a thread pool with one thread per device.
+        :param min_interval: Minimum seconds between two captures on the same device, unless set in `min_intervals`.
+        :param max_pending: Maximum number of frames waiting to be parsed before capture loops are paused.
+        :param ring: A `FrameRing` to hand frames, or just their info boxes, to the executor through shared memory
+            instead of pickling them. The executor must then be created by `create_executor(ring, ...)`, and parses
+            with the parser given to it.
+        :param min_intervals: Minimum seconds between two captures per device serial, e.g. for slower devices.
+        """
+        if not devices:
+            raise ValueError("At least one device is required.")
+        if ring is not None and executor is None:
+            raise ValueError("Frames can only be handed through a ring to an executor created for it.")
+
+        self.devices = [_resolve_device(device) for device in devices]
+        self.scaling_factors = dict(scaling_factors or {})
+        self.parser = parser
+        self.executor = executor or ThreadPoolExecutor(max_workers=len(self.devices), thread_name_prefix="farm-parse")
+        self.min_interval = min_interval
+        self.min_intervals = dict(min_intervals or {})
+        self.max_pending = max_pending
+        self.ring = ring
+
+    async def _capture(self, device: Any, frames: asyncio.Queue) -> None:
+        """Capture from a device forever, no faster than its rate limit allows."""
+        min_interval = self.min_intervals.get(device.serial, self.min_interval)
+        while True:
+            started_at = time.monotonic()
+            try:
+                image = await asyncio.to_thread(device.screenshot)
+            except Exception as exc:  # pylint: disable=broad-except  # A flaky device shouldn't stop the others
+                logger.error(f"Capture failed on {device.serial}: {exc!r}")
+                image = None
+
+            if image is not None:
+                await frames.put(Frame(device.serial, time.time(), image))
+            await asyncio.sleep(max(0.0, min_interval - (time.monotonic() - started_at)))
+
+    async def _put(
+        self, ring: "FrameRing", image: np.ndarray, scaling_factor: float | None, puts: Executor
+    ) -> "SlotHandle":
+        """Copy a frame, or its info box, into a free slot of the ring, waiting for one if needed."""
+
+        def release_if_put(future: Future) -> None:
+            # The put may still take a slot once the farm stopped, with no worker left to release it
+            if not future.cancelled() and future.exception() is None:
+                ring.release(future.result())
+
+        if ring.crop_info_box:
+            # Cropped once, rather than on every attempt of the put
+            image = await asyncio.wrap_future(puts.submit(ring.crop, image, scaling_factor))
+        while True:
+            put = puts.submit(ring.put, image, 1, _RING_POLL_INTERVAL, scaling_factor, False)
+            try:
+                return await asyncio.wrap_future(put)
+            except TimeoutError:
+                continue
+            except asyncio.CancelledError:
+                put.add_done_callback(release_if_put)
+                raise
+
+    async def _parse_slot(self, ring: "FrameRing", handle: "SlotHandle", scaling_factor: float | None) -> Gear:
+        """Parse the frame of a slot on a worker, which releases the slot once parsed."""
+        from agf_toolkit.utils.ring import (  # pylint: disable=import-outside-toplevel
+            parse_slot,
+        )
+
+        def release_if_cancelled(future: Future) -> None:
+            # A parse cancelled before it started, e.g. as the farm stops, never reaches the worker releasing the slot
+            if future.cancelled():
+                ring.release(handle)
+
+        parse = self.executor.submit(parse_slot, handle, scaling_factor)
+        parse.add_done_callback(release_if_cancelled)
+        return await asyncio.wrap_future(parse)
+
+    async def _parse(self, frames: asyncio.Queue, results: asyncio.Queue, puts: Executor | None) -> None:
+        """Parse frames on the backend as they come in."""
+        loop = asyncio.get_running_loop()
+        while True:
+            frame = await frames.get()
+            scaling_factor = self.scaling_factors.get(frame.device)
+            try:
+                if self.ring is None or puts is None:
+                    gear = await loop.run_in_executor(self.executor, self.parser, frame.image, scaling_factor)
+                else:
+                    handle = await self._put(self.ring, frame.image, scaling_factor, puts)
+                    gear = await self._parse_slot(self.ring, handle, scaling_factor)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error(f"Parsing failed for frame from {frame.device}: {exc!r}")
+            else:
+                await results.put((frame, gear))
+            finally:
+                frames.task_done()
+
+    async def run(
+        self, max_frames: int | None = None, duration: float | None = None
+    ) -> AsyncIterator[tuple[Frame, Gear]]:
+        """
+        Capture and parse until enough frames are parsed or time is up, whichever comes first.
+
+        :param max_frames: Stop after this many frames are parsed.
+        :param duration: Stop after this many seconds.
+        :return: An async iterator of (frame, gear) tuples, in the order parsing finishes.
+        """
+        frames: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        results: asyncio.Queue = asyncio.Queue()
+        # Frames are copied into the ring on threads of their own, since a put blocks while the ring is full
+        puts = None if self.ring is None else ThreadPoolExecutor(len(self.devices), thread_name_prefix="farm-put")
+        tasks = [asyncio.create_task(self._capture(device, frames)) for device in self.devices]
+        tasks += [asyncio.create_task(self._parse(frames, results, puts)) for _ in self.devices]
+        logger.info(f"Capturing from {len(self.devices)} device(s).")
+
+        deadline = None if duration is None else time.monotonic() + duration
+        count = 0
+        try:
+            while max_frames is None or count < max_frames:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    yield await asyncio.wait_for(results.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                count += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if puts is not None:
+                # Waits for the last puts to time out or release the slot they took
+                puts.shutdown()
+            logger.info(f"Capture stopped after {count} frame(s).")
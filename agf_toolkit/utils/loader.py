@@ -0,0 +1,84 @@
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import PathLike
+
+import cv2
+import numpy as np
+from loguru import logger
+
+# Reduction ratio to the flag decoding at that ratio, largest first
+REDUCED_READ_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+
+def _reduction_ratio(scaling_factor: float | None) -> int:
+    """Return the largest decode-time reduction ratio that doesn't shrink the image past the scaling factor."""
+    if scaling_factor is None:
+        return 1
+    return next((ratio for ratio in REDUCED_READ_FLAGS if scaling_factor * ratio <= 1), 1)
+
+
+def read_image(
+    path: str | PathLike, scaling_factor: float | None = None
+) -> tuple[np.ndarray[int, np.dtype[np.generic]] | None, float | None]:
+    """
+    Read an image, decoding it at reduced resolution when the scaling factor allows it.
+
+    A scaling factor at or below 0.5 means at least half of the pixels are thrown away when rescaling anyway, so the
+    decoder is asked to skip them instead (JPEG decoders can do so for free at the DCT level).
+
+    :param path: Path to the image.
+    :param scaling_factor: The calibrated scaling factor, if known.
+    :return: The image (`None` if unreadable) and the scaling factor left to apply to the decoded image.
+    """
+    ratio = _reduction_ratio(scaling_factor)
+    if ratio == 1:
+        return cv2.imread(str(path)), scaling_factor
+
+    logger.debug(f"Decoding {path} at 1/{ratio} resolution.")
+    return cv2.imread(str(path), REDUCED_READ_FLAGS[ratio]), scaling_factor * ratio  # type: ignore
+
+
+def iter_images(
+    paths: Iterable[str | PathLike],
+    scaling_factor: float | None = None,
+    workers: int = 4,
+    prefetch: int = 8,
+) -> Iterator[tuple[str | PathLike, np.ndarray[int, np.dtype[np.generic]] | None, float | None]]:
+    """
+    Decode images ahead of time on a thread pool, yielding them in order.
+
+    OpenCV releases the GIL while decoding, so decoding the next images overlaps with whatever the caller does with the
+    current one. At most `prefetch` decoded images are held in memory at once.
+
+    :param paths: Paths to the images.
+    :param scaling_factor: The calibrated scaling factor, if known. See `read_image`.
+    :param workers: Number of decoding threads.
+    :param prefetch: Maximum number of images decoded ahead of the caller.
+    :return: An iterator of (path, image, remaining scaling factor) tuples. See `read_image`.
+    """
+    if prefetch < 1:
+        raise ValueError("Prefetch window must be at least 1.")
+
+    path_iterator = iter(paths)
+    window: deque[tuple[str | PathLike, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-loader") as executor:
+
+        def _submit() -> None:
+            if (path := next(path_iterator, None)) is not None:
+                window.append((path, executor.submit(read_image, path, scaling_factor)))
+
+        for _ in range(prefetch):
+            _submit()
+
+        while window:
+            path, future = window.popleft()
+            _submit()
+            image, remaining_scaling_factor = future.result()
+            if image is None:
+                logger.error(f"Failed to read {path}.")
+            yield path, image, remaining_scaling_factor
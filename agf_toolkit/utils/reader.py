@@ -0,0 +1,190 @@
+"""
+Streaming reader for dumps of encoded gears, one `Gear.encode()` string per line.
+
+The dump is memory-mapped and split into chunks at line boundaries, and chunks are decoded one at a time, optionally by
+worker processes which map the file themselves. Only a bounded number of chunks is in memory at once, so memory usage
+stays flat regardless of the dump's size.
+
+Chunks are decoded either into `Gear` objects, or into columnar batches: dictionaries of NumPy arrays holding the
+encoded values of each field, which are much cheaper to build and can be filtered with boolean masks.
+"""
+import mmap
+import re
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from os import PathLike
+from typing import Any, NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.processor.gear import Gear
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Main stat and up to 4 sub stats
+MAX_STATS = 5
+GEAR_COLUMNS = ("gear_set", "gear_type", "gear_rarity", "gear_star")
+
+# Not `\d`, which also matches non-ASCII digits that `float` would silently accept
+_INT = r"-?[0-9]+"
+_VALUE = r"-?[0-9]+(?:\.[0-9]+)?%?"
+ENCODED_LINE_REGEX = re.compile(rf"{_INT}(?:,{_INT}){{3}}(?:,{_INT},{_INT},{_VALUE}){{1,{MAX_STATS}}}")
+
+
+class MalformedLine(NamedTuple):
+    """A line of a dump that couldn't be decoded."""
+
+    offset: int
+    line: str
+    error: str
+
+
+def _log_malformed(malformed: MalformedLine) -> None:
+    logger.warning(f"Malformed line at byte {malformed.offset}: {malformed.line!r} ({malformed.error})")
+
+
+def iter_chunk_ranges(path: str | PathLike, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple[int, int]]:
+    """
+    Split a file into byte ranges of roughly `chunk_size` bytes, each ending at a line boundary.
+
+    :param path: Path to the dump.
+    :param chunk_size: Target size of a chunk in bytes. Chunks are extended to the end of their last line.
+    :return: An iterator of (start, end) byte offsets.
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be at least 1 byte.")
+
+    with open(path, "rb") as file:
+        size = file.seek(0, 2)
+        if not size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start = 0
+            while start < size:
+                newline = mapped.find(b"\n", min(start + chunk_size, size) - 1)
+                end = size if newline == -1 else newline + 1
+                yield start, end
+                start = end
+
+
+def _iter_lines(path: str | PathLike, start: int, end: int) -> Iterator[tuple[int, str]]:
+    """Yield the non-empty lines of a byte range with their offsets."""
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        offset = start
+        for raw_line in mapped[start:end].splitlines(keepends=True):
+            if line := raw_line.decode(errors="replace").strip():
+                yield offset, line
+            offset += len(raw_line)
+
+
+def decode_chunk(path: str | PathLike, start: int, end: int) -> tuple[list[Gear], list[MalformedLine]]:
+    """Decode a byte range of a dump into Gear objects. This runs in worker processes, so it must stay picklable."""
+    gears, malformed = [], []
+    for offset, line in _iter_lines(path, start, end):
+        try:
+            gears.append(Gear.decode(line))
+        except (ValueError, IndexError) as exc:
+            malformed.append(MalformedLine(offset, line, repr(exc)))
+    return gears, malformed
+
+
+# pylint: disable=too-many-locals
+def decode_chunk_columnar(
+    path: str | PathLike, start: int, end: int
+) -> tuple[dict[str, np.ndarray], list[MalformedLine]]:
+    """
+    Decode a byte range of a dump into a columnar batch, without building Gear objects.
+
+    The batch holds the byte offset of every gear's line, the encoded gear fields, and the encoded stat fields as
+    (gears, `MAX_STATS`) arrays, main stat first. Missing stats have a type and rarity of -1 and a NaN value. Values
+    are floats, with the `stat_is_percent` column telling percentages apart.
+
+    Unlike `Gear.decode`, lines must be exactly as encoded: every field numeric, and between 1 and `MAX_STATS` stats.
+    """
+    offsets, padded_lines, malformed = [], [], []
+    for offset, line in _iter_lines(path, start, end):
+        if not ENCODED_LINE_REGEX.fullmatch(line):
+            malformed.append(MalformedLine(offset, line, "Fields don't match the encoded gear format"))
+            continue
+        offsets.append(offset)
+        # Pad missing stats, so all lines split into the same number of fields
+        padded_lines.append(line + ",-1,-1,-1" * (MAX_STATS - (line.count(",") - 3) // 3))
+
+    # Validated lines are plain ASCII numbers, so whole chunks can be converted at once: values without their `%`, and
+    # percentages told apart by the last byte of each field
+    joined = ",".join(padded_lines)
+    shape = (len(padded_lines), len(GEAR_COLUMNS) + 3 * MAX_STATS)
+    numbers = np.array(joined.replace("%", "").split(",") if joined else [], dtype=np.float64).reshape(shape)
+    raw = np.frombuffer(joined.encode(), dtype=np.uint8)
+    field_ends = np.append(np.flatnonzero(raw == ord(",")), len(raw)) - 1
+    is_percent = (raw[field_ends] == ord("%")).reshape(shape) if joined else np.zeros(shape, dtype=bool)
+    stat_numbers = numbers[:, len(GEAR_COLUMNS) :].reshape(-1, MAX_STATS, 3)
+
+    batch = {"offset": np.array(offsets, dtype=np.int64)}
+    batch.update({name: numbers[:, i].astype(np.int8) for i, name in enumerate(GEAR_COLUMNS)})
+    batch["stat_type"] = stat_numbers[:, :, 0].astype(np.int8)
+    batch["stat_rarity"] = stat_numbers[:, :, 1].astype(np.int8)
+    batch["stat_value"] = np.where(stat_numbers[:, :, 2] == -1, np.nan, stat_numbers[:, :, 2]).astype(np.float32)
+    batch["stat_is_percent"] = is_percent[:, len(GEAR_COLUMNS) :].reshape(-1, MAX_STATS, 3)[:, :, 2]
+    return batch, malformed
+
+
+# pylint: disable=too-many-arguments
+def iter_decoded_chunks(
+    path: str | PathLike,
+    columnar: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 0,
+    prefetch: int | None = None,
+    on_malformed: Callable[[MalformedLine], Any] | None = _log_malformed,
+) -> Iterator[Any]:
+    """
+    Decode a dump chunk by chunk, in file order.
+
+    :param path: Path to the dump.
+    :param columnar: Decode chunks into columnar batches instead of lists of Gear objects.
+    :param chunk_size: Target size of a chunk in bytes.
+    :param workers: Number of worker processes. With 0, chunks are decoded in this process. Gear objects are costly to
+        send back from workers, so workers mostly pay off for columnar batches.
+    :param prefetch: Maximum number of chunks decoded ahead of the consumer. Defaults to twice the number of workers.
+    :param on_malformed: Called with every line that couldn't be decoded. By default they are logged.
+    :return: An iterator of decoded chunks, each a list of Gear objects or a columnar batch.
+    """
+    decoder = decode_chunk_columnar if columnar else decode_chunk
+    ranges = iter_chunk_ranges(path, chunk_size)
+
+    def handle(result: tuple[Any, list[MalformedLine]]) -> Any:
+        decoded, malformed = result
+        if on_malformed is not None:
+            for line in malformed:
+                on_malformed(line)
+        return decoded
+
+    if workers < 1:
+        for start, end in ranges:
+            yield handle(decoder(path, start, end))
+        return
+
+    # Bounded window of in-flight chunks, so workers never run far ahead of the consumer
+    window = max(1, prefetch or 2 * workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight: deque[Future] = deque()
+        for start, end in ranges:
+            in_flight.append(executor.submit(decoder, path, start, end))
+            if len(in_flight) >= window:
+                yield handle(in_flight.popleft().result())
+        while in_flight:
+            yield handle(in_flight.popleft().result())
+
+
+def iter_gears(path: str | PathLike, **kwargs: Any) -> Iterator[Gear]:
+    """
+    Decode a dump into Gear objects one at a time, without loading the whole dump.
+
+    :param path: Path to the dump.
+    :param kwargs: Extra keyword arguments for `iter_decoded_chunks`, e.g. `workers`.
+    :return: An iterator of Gear objects, in file order. Malformed lines are skipped.
+    """
+    for gears in iter_decoded_chunks(path, columnar=False, **kwargs):
+        yield from gears
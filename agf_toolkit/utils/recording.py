@@ -0,0 +1,135 @@
+"""
+Gear ingestion from screen recordings, e.g. made with `adb shell screenrecord`.
+
+Recording once while tapping through the inventory is far cheaper on the device than a `screencap -p` per gear. The
+recording is decoded as a stream, each sampled frame is reduced to a small signature (see `walker.signature`), and
+only frames where the info box has changed and then settled are handed to the parser.
+"""
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import PathLike
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.farm import parse_image
+from agf_toolkit.utils.walker import difference, signature
+
+
+class VideoFrame(NamedTuple):
+    """A decoded frame of a recording."""
+
+    number: int  # Position in the recording, from 0
+    timestamp: float  # Seconds from the start of the recording
+    image: np.ndarray[int, np.dtype[np.generic]]
+
+
+def iter_frames(path: str | PathLike, stride: int = 1) -> Iterator[VideoFrame]:
+    """
+    Decode a video file as a stream of frames.
+
+    :param path: Path to the video.
+    :param stride: Only every `stride`-th frame is decoded. Skipped frames are grabbed without being converted, which
+        costs a fraction of a full decode.
+    :return: An iterator of frames.
+    """
+    if stride < 1:
+        raise ValueError("Stride must be at least 1.")
+
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise ValueError(f"Failed to open video {path}.")
+
+    try:
+        index = 0
+        while capture.grab():
+            if index % stride == 0:
+                retrieved, image = capture.retrieve()
+                if retrieved:
+                    yield VideoFrame(index, capture.get(cv2.CAP_PROP_POS_MSEC) / 1000, image)
+            index += 1
+    finally:
+        capture.release()
+
+
+def select_stable_frames(
+    frames: Iterable[VideoFrame],
+    info_box_region: tuple[int, int, int, int] | None = None,
+    change_threshold: float = 3.0,
+    settle_threshold: float = 1.0,
+    settle_frames: int = 2,
+) -> Iterator[VideoFrame]:
+    """
+    Pick one settled frame per distinct info box.
+
+    A frame is picked once its signature has differed by less than `settle_threshold` from the previous frame for
+    `settle_frames` frames in a row, and differs by more than `change_threshold` from the last picked frame.
+
+    :param frames: The frames, in order.
+    :param info_box_region: Region (left, top, width, height) of the info box in the frames. Only it is compared when
+        given, so unrelated UI animations are ignored.
+    :param change_threshold: Signature difference above which the info box is considered changed.
+    :param settle_threshold: Signature difference below which two consecutive frames are considered settled.
+    :param settle_frames: Number of consecutive settled frames required, to skip past transition animations.
+    :return: An iterator of the picked frames.
+    """
+    picked_signature = previous_signature = None
+    settled_count = 0
+
+    for frame in frames:
+        current_signature = signature(frame.image, info_box_region)
+        if previous_signature is not None and difference(previous_signature, current_signature) < settle_threshold:
+            settled_count += 1
+        else:
+            settled_count = 0
+        previous_signature = current_signature
+
+        if settled_count < settle_frames:
+            continue
+        if picked_signature is None or difference(picked_signature, current_signature) > change_threshold:
+            logger.debug(f"Picked frame {frame.number} at {frame.timestamp:.2f}s.")
+            picked_signature = current_signature
+            yield frame
+
+
+# pylint: disable=too-many-arguments
+def ingest_recording(
+    path: str | PathLike,
+    scaling_factor: float | None = None,
+    parser: Callable[[np.ndarray, float | None], Gear] = parse_image,
+    info_box_region: tuple[int, int, int, int] | None = None,
+    stride: int = 1,
+    workers: int = 1,
+    **selection_kwargs,
+) -> Iterator[tuple[VideoFrame, Gear]]:
+    """
+    Parse every distinct gear shown in a recording.
+
+    Decoding and frame selection carry on while picked frames are parsed, with at most `2 * workers` frames waiting.
+
+    :param path: Path to the video.
+    :param scaling_factor: The calibrated scaling factor of the recording's resolution.
+    :param parser: Function parsing a frame's image with the scaling factor.
+    :param info_box_region: Region (left, top, width, height) of the info box in the frames. See
+        `select_stable_frames`.
+    :param stride: Only every `stride`-th frame is decoded. See `iter_frames`.
+    :param workers: Number of parsing threads.
+    :param selection_kwargs: Extra keyword arguments for `select_stable_frames`.
+    :return: An iterator of (frame, gear) tuples, in recording order.
+    """
+    frames = select_stable_frames(iter_frames(path, stride), info_box_region, **selection_kwargs)
+    in_flight: deque[tuple[VideoFrame, Future]] = deque()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recording-parse") as executor:
+        for frame in frames:
+            in_flight.append((frame, executor.submit(parser, frame.image, scaling_factor)))
+            if len(in_flight) >= 2 * workers:
+                picked, future = in_flight.popleft()
+                yield picked, future.result()
+        while in_flight:
+            picked, future = in_flight.popleft()
+            yield picked, future.result()
@@ -0,0 +1,284 @@
+"""
+Record live capture sessions, and replay them without a device.
+
+A recording is a compact archive of the raw screenshots of a session with their timestamps. Consecutive screenshots
+differ in a small region at most, so every frame but periodic keyframes is stored as its XOR against the previous one,
+which is mostly zeros and compresses to a fraction of a PNG.
+
+`ReplayDevice` stands in for an `adbutils.AdbDevice`, serving the recorded frames at their original cadence, faster, or
+as fast as they're asked for, so the capture, dedup and parse pipeline can be benchmarked deterministically.
+"""
+import struct
+import time
+import zlib
+from collections.abc import Callable, Iterator
+from os import PathLike
+from typing import Any, BinaryIO
+
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.farm import parse_image
+from agf_toolkit.utils.recording import VideoFrame, select_stable_frames
+
+MAGIC = b"AGFREC1\n"
+# Timestamp, keyframe flag, height, width, channels, payload size
+_RECORD_HEADER = struct.Struct("<d?IIBI")
+DEFAULT_KEYFRAME_INTERVAL = 30
+
+
+class FrameArchiveWriter:
+    """Write screenshots to a delta-compressed archive as they are captured."""
+
+    def __init__(
+        self, path: str | PathLike, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, compression_level: int = 1
+    ) -> None:
+        """
+        Initialise the writer and open the archive.
+
+        :param path: Path to the archive. An existing archive is overwritten.
+        :param keyframe_interval: Every `keyframe_interval`-th frame is stored whole, so a damaged frame only spoils
+            the frames up to the next keyframe.
+        :param compression_level: zlib compression level. Low levels keep up with live capture.
+        """
+        if keyframe_interval < 1:
+            raise ValueError("Keyframe interval must be at least 1.")
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+        self.frames = 0
+        self._previous: np.ndarray | None = None
+        self._file: BinaryIO = open(path, "wb")  # pylint: disable=consider-using-with
+        self._file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self) -> None:
+        """Close the archive."""
+        self._file.close()
+
+    def write(self, image: np.ndarray[int, np.dtype[np.uint8]], timestamp: float | None = None) -> None:
+        """
+        Append a screenshot.
+
+        :param image: The screenshot, as returned by `adb.screenshot()`.
+        :param timestamp: Capture time in seconds. Defaults to now.
+        """
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        if image.ndim == 2:
+            image = image[:, :, None]
+        previous = self._previous
+        if previous is None or previous.shape != image.shape or self.frames % self.keyframe_interval == 0:
+            keyframe, payload = True, image
+        else:
+            keyframe, payload = False, np.bitwise_xor(image, previous)
+        compressed = zlib.compress(payload.data, self.compression_level)
+
+        height, width, channels = image.shape
+        timestamp = time.time() if timestamp is None else timestamp
+        self._file.write(_RECORD_HEADER.pack(timestamp, keyframe, height, width, channels, len(compressed)))
+        self._file.write(compressed)
+        self._previous = image.copy()  # The caller may reuse its buffer
+        self.frames += 1
+
+
+def iter_archive(path: str | PathLike) -> Iterator[tuple[float, np.ndarray[int, np.dtype[np.uint8]]]]:
+    """
+    Decode an archive frame by frame.
+
+    :param path: Path to the archive.
+    :return: An iterator of (timestamp, screenshot) tuples, in capture order. Screenshots are read-only.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} isn't a frame archive.")
+
+        previous = None
+        while header := file.read(_RECORD_HEADER.size):
+            if len(header) < _RECORD_HEADER.size:
+                logger.warning(f"Archive {path} ends with a truncated frame. Ignoring it.")
+                return
+            timestamp, keyframe, height, width, channels, size = _RECORD_HEADER.unpack(header)
+            if len(compressed := file.read(size)) < size:
+                logger.warning(f"Archive {path} ends with a truncated frame. Ignoring it.")
+                return
+
+            payload = np.frombuffer(zlib.decompress(compressed), dtype=np.uint8).reshape(height, width, channels)
+            if not keyframe:
+                if previous is None or previous.shape != payload.shape:
+                    raise ValueError(f"Archive {path} has a delta frame without its previous frame.")
+                payload = np.bitwise_xor(payload, previous)
+            payload.flags.writeable = False
+            previous = payload
+            yield timestamp, payload if channels > 1 else payload[:, :, 0]
+
+
+class RecordingDevice:
+    """Wrap a device, recording every screenshot taken from it."""
+
+    def __init__(self, device: Any, writer: FrameArchiveWriter) -> None:
+        self.device = device
+        self.writer = writer
+
+    def __getattr__(self, name: str) -> Any:
+        # Everything but screenshots goes straight to the device
+        return getattr(self.device, name)
+
+    def screenshot(self) -> np.ndarray[int, np.dtype[np.uint8]]:
+        """Take a screenshot from the device, and record it."""
+        image = self.device.screenshot()
+        if image is not None:
+            self.writer.write(image)
+        return image
+
+
+class ReplayDevice:  # pylint: disable=too-many-instance-attributes
+    """
+    Stand-in for an `adbutils.AdbDevice`, serving the frames of an archive.
+
+    Each screenshot is the next recorded frame, served no earlier than its recorded time since the first screenshot,
+    divided by `speed`. Shell commands, such as taps and swipes, are kept in `commands` and otherwise ignored.
+    """
+
+    def __init__(
+        self, path: str | PathLike, speed: float | None = 1.0, loop: bool = False, serial: str = "replay"
+    ) -> None:
+        """
+        Initialise the device.
+
+        :param path: Path to the archive.
+        :param speed: Playback speed relative to the recording. With `None`, frames are served as fast as they are
+            asked for.
+        :param loop: Start over once the archive is exhausted, instead of raising `EOFError`.
+        :param serial: Serial number reported by the device.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("Playback speed must be positive.")
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.serial = serial
+        self.commands: list[Any] = []
+        self.frames_served = 0
+        self._frames = iter_archive(path)
+        self._start: tuple[float, float] | None = None  # (recorded, monotonic) time of the first frame
+
+    def shell(self, command: Any, **_: Any) -> str:
+        """Record a shell command without running it."""
+        self.commands.append(command)
+        return ""
+
+    def _next_frame(self) -> tuple[float, np.ndarray]:
+        if (frame := next(self._frames, None)) is None and self.loop and self.frames_served:
+            logger.debug(f"Replaying {self.path} from the start.")
+            self._frames, self._start = iter_archive(self.path), None
+            frame = next(self._frames, None)
+        if frame is None:
+            raise EOFError(f"Recording {self.path} is exhausted.")
+        return frame
+
+    def screenshot(self) -> np.ndarray[int, np.dtype[np.uint8]]:
+        """Return the next recorded frame, once it's due."""
+        timestamp, image = self._next_frame()
+        if self._start is None:
+            self._start = (timestamp, time.monotonic())
+        elif self.speed is not None:
+            due = self._start[1] + (timestamp - self._start[0]) / self.speed
+            if (delay := due - time.monotonic()) > 0:
+                time.sleep(delay)
+        self.frames_served += 1
+        return image
+
+
+def record_session(
+    device: Any,
+    path: str | PathLike,
+    interval: float = 0.5,
+    max_frames: int | None = None,
+    duration: float | None = None,
+) -> int:
+    """
+    Record the screen of a device at a fixed interval, until enough frames are recorded, time is up, or interrupted.
+
+    :param device: The device.
+    :param path: Path to the archive.
+    :param interval: Minimum seconds between two screenshots.
+    :param max_frames: Stop after this many frames.
+    :param duration: Stop after this many seconds.
+    :return: The number of frames recorded.
+    """
+    deadline = None if duration is None else time.monotonic() + duration
+    with FrameArchiveWriter(path) as writer:
+        recording_device = RecordingDevice(device, writer)
+        try:
+            while (max_frames is None or writer.frames < max_frames) and (
+                deadline is None or time.monotonic() < deadline
+            ):
+                started_at = time.monotonic()
+                recording_device.screenshot()
+                time.sleep(max(0.0, interval - (time.monotonic() - started_at)))
+        except KeyboardInterrupt:
+            logger.info("Recording stopped.")
+        logger.info(f"Recorded {writer.frames} frame(s) to {path}.")
+        return writer.frames
+
+
+def benchmark_replay(
+    path: str | PathLike,
+    speed: float | None = None,
+    parser: Callable[[np.ndarray, float | None], Gear] | None = parse_image,
+    scaling_factor: float | None = None,
+    **selection_kwargs: Any,
+) -> dict[str, float]:
+    """
+    Run a recording through capture, dedup and parsing, timing each stage.
+
+    Frames are deduplicated as in `recording.select_stable_frames`, so only settled frames of distinct info boxes are
+    parsed.
+
+    :param path: Path to the archive.
+    :param speed: Playback speed, see `ReplayDevice`. By default frames are served as fast as they're asked for.
+    :param parser: Function parsing a frame's image with the scaling factor, or `None` to stop after dedup.
+    :param scaling_factor: The calibrated scaling factor of the recording.
+    :param selection_kwargs: Extra keyword arguments for `select_stable_frames`, e.g. `info_box_region`.
+    :return: Number of frames captured and parsed, and seconds spent capturing, deduplicating and parsing.
+    """
+    device = ReplayDevice(path, speed)
+    capture_time = parse_time = 0.0
+    benchmark_started_at = time.perf_counter()
+
+    def _capture() -> Iterator[VideoFrame]:
+        nonlocal capture_time
+        while True:
+            started_at = time.perf_counter()
+            try:
+                image = device.screenshot()
+            except EOFError:
+                return
+            capture_time += time.perf_counter() - started_at
+            yield VideoFrame(device.frames_served - 1, started_at - benchmark_started_at, image)
+
+    parsed = 0
+    for frame in select_stable_frames(_capture(), **selection_kwargs):
+        parsed += 1
+        if parser is not None:
+            parse_started_at = time.perf_counter()
+            parser(frame.image, scaling_factor)
+            parse_time += time.perf_counter() - parse_started_at
+    total_time = time.perf_counter() - benchmark_started_at
+
+    results = {
+        "frames": device.frames_served,
+        "parsed": parsed,
+        "capture_seconds": capture_time,
+        "dedup_seconds": total_time - capture_time - parse_time,
+        "parse_seconds": parse_time,
+        "total_seconds": total_time,
+    }
+    logger.info(f"Replayed {device.frames_served} frame(s), {parsed} distinct, in {total_time:.2f}s.")
+    return results
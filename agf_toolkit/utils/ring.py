@@ -0,0 +1,228 @@
+"""
+Shared-memory ring of frames, to hand screenshots to parse worker processes without pickling them.
+
+The capturing process crops the info box out of each frame as `extract_info_box` does, and copies just the info box into
+a free slot of a `multiprocessing.shared_memory` block once, unless the ring is made to hold whole frames. Workers are
+sent a small `SlotHandle` instead of the array, and read the slot in place. Every slot is reference counted: it's reused
+once all its holders released it, and `put` blocks while every slot is held, which throttles capture down to the pace of
+the workers.
+"""
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from agf_toolkit import templates
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.processor.image import extract_info_box, extract_info_box_rescaled
+from agf_toolkit.utils.farm import parse_image, parse_info_box
+
+# Reference counts are kept at the start of the block, padded so slots stay cache line aligned
+_HEADER_ALIGNMENT = 64
+
+
+class SlotHandle(NamedTuple):
+    """Reference to a frame in a ring, cheap to send to another process."""
+
+    slot: int
+    shape: tuple[int, ...]
+    dtype: str
+
+
+class FrameRing:  # pylint: disable=too-many-instance-attributes
+    """
+    Fixed number of equally sized frame slots in shared memory.
+
+    A ring is created by the capturing process, and reaches worker processes by being passed to them when they start,
+    e.g. as an argument of `create_executor`. Only its creator should `unlink()` it.
+    """
+
+    def __init__(
+        self, slots: int, slot_size: int | None = None, context: Any = None, crop_info_box: bool = True
+    ) -> None:
+        """
+        Create a ring.
+
+        :param slots: Number of slots, i.e. the maximum number of frames held at once.
+        :param slot_size: Size of a slot in bytes. It must fit the largest frame, e.g. `height * width * 3` for whole
+            screenshots. Defaults to the size of an info box when cropping.
+        :param context: The multiprocessing context the workers are started with. Defaults to the default context.
+        :param crop_info_box: Whether `put` crops the info box out of frames by default, so workers parse it with
+            `parse_info_box`. Otherwise whole frames are copied.
+        """
+        if slot_size is None:
+            if not crop_info_box:
+                raise ValueError("The slot size of a ring holding whole frames must be given.")
+            slot_size = templates.INFO_BOX.nbytes
+        if slots < 1 or slot_size < 1:
+            raise ValueError("A ring needs at least 1 slot of at least 1 byte.")
+        self.context = context or multiprocessing.get_context()
+        self.crop_info_box = crop_info_box
+
+        self.slots = slots
+        self.slot_size = -(-slot_size // _HEADER_ALIGNMENT) * _HEADER_ALIGNMENT
+        self._header_size = -(-slots * 4 // _HEADER_ALIGNMENT) * _HEADER_ALIGNMENT
+        self._memory = shared_memory.SharedMemory(create=True, size=self._header_size + slots * self.slot_size)
+        self._lock = self.context.Lock()
+        self._free = self.context.BoundedSemaphore(slots)
+        self._attach()
+        self._refcounts[:] = 0
+        logger.debug(f"Created frame ring {self.name} of {slots} slot(s) of {self.slot_size} bytes.")
+
+    def _attach(self) -> None:
+        self._refcounts: np.ndarray[int, np.dtype[np.int32]] = np.ndarray(
+            (self.slots,), dtype=np.int32, buffer=self._memory.buf
+        )
+
+    def __getstate__(self) -> dict:
+        # Only sent to processes as they start, since the lock and the semaphore can't be pickled otherwise
+        return {
+            "name": self._memory.name,
+            "slots": self.slots,
+            "slot_size": self.slot_size,
+            "header_size": self._header_size,
+            "crop_info_box": self.crop_info_box,
+            "lock": self._lock,
+            "free": self._free,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.slots, self.slot_size, self._header_size = state["slots"], state["slot_size"], state["header_size"]
+        self.crop_info_box = state["crop_info_box"]
+        self._lock, self._free = state["lock"], state["free"]
+        self.context = multiprocessing.get_context()
+        self._memory = shared_memory.SharedMemory(name=state["name"])
+        self._attach()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+        self.unlink()
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._memory.name
+
+    @staticmethod
+    def crop(image: np.ndarray, scaling_factor: float | None = None) -> np.ndarray:
+        """Crop the info box out of an unscaled screenshot, rescaled to the template geometry, as `parse_image` does."""
+        if scaling_factor is None:
+            return extract_info_box(image, templates.INFO_BOX)
+        return extract_info_box_rescaled(image, templates.INFO_BOX, scaling_factor)
+
+    # pylint: disable=too-many-arguments
+    def put(
+        self,
+        image: np.ndarray,
+        refs: int = 1,
+        timeout: float | None = None,
+        scaling_factor: float | None = None,
+        crop: bool | None = None,
+    ) -> SlotHandle:
+        """
+        Copy a frame, or its info box, into a free slot, waiting for one if every slot is held.
+
+        :param image: The frame. It may be a non-contiguous view, such as a crop.
+        :param refs: Number of holders of the slot, each of which must `release` it.
+        :param timeout: Maximum seconds to wait for a free slot. Waits indefinitely if not given.
+        :param scaling_factor: The calibrated scaling factor of the frame, to crop its info box.
+        :param crop: Whether to crop the info box out of the frame with `crop` first. Defaults to `crop_info_box`.
+            Pass `False` for an info box cropped already, e.g. to retry a put that timed out.
+        :return: The handle of the slot.
+        """
+        if self.crop_info_box if crop is None else crop:
+            image = self.crop(image, scaling_factor)
+        if image.nbytes > self.slot_size:
+            raise ValueError(f"Frame of {image.nbytes} bytes doesn't fit in slots of {self.slot_size} bytes.")
+        if refs < 1:
+            raise ValueError("A frame needs at least 1 holder.")
+        if not self._free.acquire(timeout=timeout):
+            raise TimeoutError(f"No free slot in frame ring {self.name} after {timeout} seconds.")
+
+        with self._lock:
+            slot = int(np.flatnonzero(self._refcounts == 0)[0])
+            self._refcounts[slot] = refs
+
+        handle = SlotHandle(slot, tuple(image.shape), image.dtype.str)
+        np.copyto(self.view(handle), image)
+        return handle
+
+    def view(self, handle: SlotHandle) -> np.ndarray:
+        """Return the frame in a slot, backed by the shared memory. It's only valid until the slot is released."""
+        offset = self._header_size + handle.slot * self.slot_size
+        return np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=self._memory.buf, offset=offset)
+
+    def retain(self, handle: SlotHandle, count: int = 1) -> None:
+        """Add holders to a slot, e.g. before handing it to another worker."""
+        with self._lock:
+            if self._refcounts[handle.slot] < 1:
+                raise ValueError(f"Slot {handle.slot} isn't held.")
+            self._refcounts[handle.slot] += count
+
+    def release(self, handle: SlotHandle) -> None:
+        """Drop a holder of a slot. The slot is reused once its last holder released it."""
+        with self._lock:
+            if self._refcounts[handle.slot] < 1:
+                raise ValueError(f"Slot {handle.slot} isn't held.")
+            self._refcounts[handle.slot] -= 1
+            freed = self._refcounts[handle.slot] == 0
+        if freed:
+            self._free.release()
+
+    def held(self) -> int:
+        """Return the number of slots currently held."""
+        with self._lock:
+            return int(np.count_nonzero(self._refcounts))
+
+    def close(self) -> None:
+        """Detach from the shared memory. Views of the slots must not be used afterwards."""
+        del self._refcounts
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory once every process closed it. Only the creator of the ring should call this."""
+        self._memory.unlink()
+
+
+# State of a worker process, set by `_init_worker`
+_worker_ring: FrameRing | None = None  # pylint: disable=invalid-name
+_worker_parser: Callable[[np.ndarray, float | None], Gear] = parse_image
+
+
+def _init_worker(ring: FrameRing, parser: Callable[[np.ndarray, float | None], Gear]) -> None:
+    global _worker_ring, _worker_parser  # pylint: disable=global-statement
+    _worker_ring, _worker_parser = ring, parser
+
+
+def parse_slot(handle: SlotHandle, scaling_factor: float | None) -> Gear:
+    """Parse the frame of a slot in a worker started by `create_executor`, then release the slot."""
+    if _worker_ring is None:
+        raise RuntimeError("Not in a worker process of a frame ring.")
+    try:
+        return _worker_parser(_worker_ring.view(handle), scaling_factor)
+    finally:
+        _worker_ring.release(handle)
+
+
+def create_executor(
+    ring: FrameRing, workers: int, parser: Callable[[np.ndarray, float | None], Gear] | None = None
+) -> ProcessPoolExecutor:
+    """
+    Start parse worker processes attached to a ring. Submit `parse_slot` to them with the handles of frames.
+
+    :param ring: The ring frames are put in.
+    :param workers: Number of worker processes.
+    :param parser: Function parsing the content of a slot with its frame's scaling factor. It must be picklable.
+        Defaults to `parse_info_box` if the ring crops info boxes, and to `parse_image` otherwise.
+    :return: The executor.
+    """
+    if parser is None:
+        parser = parse_info_box if ring.crop_info_box else parse_image
+    return ProcessPoolExecutor(workers, ring.context, initializer=_init_worker, initargs=(ring, parser))
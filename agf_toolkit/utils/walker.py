@@ -0,0 +1,219 @@
+"""
+Unattended inventory scanning over ADB.
+
+The walker taps through the inventory grid cell by cell, scrolling with slow swipes when it runs out of visible rows.
+After each tap it polls screenshots until the info box has changed and settled, so it neither captures the previous
+gear nor a mid-animation frame, then hands the frame to a parser thread and moves on to the next tap while it's parsed.
+"""
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.farm import parse_image
+
+SIGNATURE_WIDTH = 64
+
+
+class GridLayout:
+    """Geometry of the inventory grid on the device's screen, in device pixels."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        origin: tuple[int, int],
+        pitch: tuple[int, int],
+        columns: int,
+        visible_rows: int,
+        rows_per_swipe: int | None = None,
+        swipe_duration: int = 800,
+    ) -> None:
+        """
+        Initialise a GridLayout object.
+
+        :param origin: Centre of the top-left cell.
+        :param pitch: Horizontal and vertical distance between the centres of neighbouring cells.
+        :param columns: Number of cells per row.
+        :param visible_rows: Number of rows fully visible without scrolling.
+        :param rows_per_swipe: Number of rows scrolled by one swipe. Defaults to all visible rows but one.
+        :param swipe_duration: Duration of a swipe in milliseconds. Slow swipes scroll precisely instead of flinging.
+        """
+        if columns < 1 or visible_rows < 1:
+            raise ValueError("Grid must have at least one column and one visible row.")
+
+        self.origin = origin
+        self.pitch = pitch
+        self.columns = columns
+        self.visible_rows = visible_rows
+        self.rows_per_swipe = rows_per_swipe or max(1, visible_rows - 1)
+        self.swipe_duration = swipe_duration
+
+    def tap_position(self, column: int, visible_row: int) -> tuple[int, int]:
+        """Return the centre of a cell on the currently visible page."""
+        return self.origin[0] + column * self.pitch[0], self.origin[1] + visible_row * self.pitch[1]
+
+    def row_region(self, visible_row: int) -> tuple[int, int, int, int]:
+        """Return the region (left, top, width, height) of a row on the currently visible page."""
+        left = max(0, self.origin[0] - self.pitch[0] // 2)
+        top = max(0, self.origin[1] - self.pitch[1] // 2 + visible_row * self.pitch[1])
+        return left, top, self.columns * self.pitch[0], self.pitch[1]
+
+    def swipe_positions(self) -> tuple[int, int, int, int]:
+        """Return the start and end of a swipe scrolling the grid up by `rows_per_swipe` rows."""
+        start_x, start_y = self.tap_position(0, self.rows_per_swipe)
+        return start_x, start_y, start_x, start_y - self.rows_per_swipe * self.pitch[1]
+
+
+def signature(
+    image: np.ndarray[int, np.dtype[np.generic]], region: tuple[int, int, int, int] | None = None
+) -> np.ndarray[int, np.dtype[np.generic]]:
+    """Return a small grayscale thumbnail of a region of the image, cheap to compare between frames."""
+    if region is not None:
+        left, top, width, height = region
+        image = image[top : top + height, left : left + width]
+    image_h, image_w = image.shape[:2]
+    size = (SIGNATURE_WIDTH, max(1, SIGNATURE_WIDTH * image_h // image_w))
+    return cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def difference(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Mean absolute difference between two signatures."""
+    return float(np.abs(signature_a - signature_b).mean())
+
+
+class InventoryWalker:
+    """Walk the inventory grid, capturing and parsing every gear."""
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        device: Any,
+        layout: GridLayout,
+        scaling_factor: float | None = None,
+        parser: Callable[[np.ndarray, float | None], Gear] = parse_image,
+        info_box_region: tuple[int, int, int, int] | None = None,
+        change_threshold: float = 3.0,
+        settle_threshold: float = 1.0,
+        max_polls: int = 20,
+    ) -> None:
+        """
+        Initialise the walker.
+
+        :param device: The `adbutils.AdbDevice` to walk the inventory on.
+        :param layout: The geometry of the inventory grid.
+        :param scaling_factor: The calibrated scaling factor of the device.
+        :param parser: Function parsing a captured frame with the scaling factor.
+        :param info_box_region: Region (left, top, width, height) of the info box on screen, in device pixels. Change
+            detection only looks at it when given, so unrelated UI animations are ignored.
+        :param change_threshold: Signature difference above which the info box is considered changed.
+        :param settle_threshold: Signature difference below which two consecutive frames are considered settled.
+        :param max_polls: Maximum number of screenshots to wait for a change before capturing anyway.
+        """
+        self.device = device
+        self.layout = layout
+        self.scaling_factor = scaling_factor
+        self.parser = parser
+        self.info_box_region = info_box_region
+        self.change_threshold = change_threshold
+        self.settle_threshold = settle_threshold
+        self.max_polls = max_polls
+
+    def tap(self, position: tuple[int, int]) -> None:
+        """Tap a position on the screen."""
+        self.device.shell(["input", "tap", str(position[0]), str(position[1])])
+
+    def swipe(self) -> None:
+        """Scroll the grid by one swipe."""
+        positions = self.layout.swipe_positions()
+        self.device.shell(["input", "swipe", *map(str, positions), str(self.layout.swipe_duration)])
+
+    def scroll(self) -> int:
+        """
+        Scroll the grid by one swipe, and return the number of rows it actually scrolled.
+
+        The grid scrolls less than a full swipe on its last page, so the rows visible before and after the swipe are
+        matched to find how far it went. Ties go to the full swipe.
+        """
+        overlap = self.layout.visible_rows - self.layout.rows_per_swipe
+        if overlap < 1:
+            # No row stays visible to match, so a full swipe is assumed
+            self.swipe()
+            return self.layout.rows_per_swipe
+
+        before = self._row_signatures(self.device.screenshot())
+        self.swipe()
+        after = self._row_signatures(self.device.screenshot())
+
+        def mismatch(rows: int) -> float:
+            return float(np.mean([difference(a, b) for a, b in zip(before[rows:], after)]))
+
+        scrolled = min(range(self.layout.rows_per_swipe, -1, -1), key=mismatch)
+        if scrolled == 0:
+            raise RuntimeError("The grid didn't scroll. Does the inventory hold fewer gears than expected?")
+        if scrolled < self.layout.rows_per_swipe:
+            logger.debug(f"Grid only scrolled {scrolled} row(s) out of {self.layout.rows_per_swipe}.")
+        return scrolled
+
+    def _row_signatures(self, image: np.ndarray[int, np.dtype[np.generic]]) -> list[np.ndarray]:
+        return [signature(image, self.layout.row_region(row)) for row in range(self.layout.visible_rows)]
+
+    def wait_for_change(self, previous: np.ndarray) -> tuple[np.ndarray[int, np.dtype[np.generic]], np.ndarray]:
+        """
+        Poll screenshots until the info box differs from `previous` and has stopped changing.
+
+        :param previous: Signature of the info box before the tap.
+        :return: The settled frame and its signature.
+        """
+        image = self.device.screenshot()
+        current = signature(image, self.info_box_region)
+        changed = difference(previous, current) > self.change_threshold
+
+        for _ in range(self.max_polls):
+            next_image = self.device.screenshot()
+            next_signature = signature(next_image, self.info_box_region)
+            settled = difference(current, next_signature) < self.settle_threshold
+            image, current = next_image, next_signature
+
+            if changed and settled:
+                return image, current
+            changed = changed or difference(previous, current) > self.change_threshold
+
+        logger.warning("Info box didn't change after tapping. Capturing anyway (duplicate gear?).")
+        return image, current
+
+    def walk(self, total: int, start: int = 0) -> Iterator[tuple[int, Gear]]:
+        """
+        Tap through `total` gears from the grid's top-left, yielding each gear as soon as it's parsed.
+
+        Parsing of a frame overlaps with tapping and waiting for the next one, so the walk runs as fast as the device's
+        UI and screenshots allow as long as parsing keeps up.
+
+        :param total: Number of gears in the inventory.
+        :param start: Index of the first gear to capture, e.g. to resume an interrupted walk from the top of the grid.
+        :return: An iterator of (index, gear) tuples, in grid order.
+        """
+        scrolled_rows = 0
+        previous_signature = signature(self.device.screenshot(), self.info_box_region)
+        in_flight: tuple[int, Future] | None = None
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="walker-parse") as executor:
+            for index in range(start, total):
+                row, column = divmod(index, self.layout.columns)
+                while row - scrolled_rows >= self.layout.visible_rows:
+                    logger.debug(f"Scrolling past row {scrolled_rows}.")
+                    scrolled_rows += self.scroll()
+
+                self.tap(self.layout.tap_position(column, row - scrolled_rows))
+                image, previous_signature = self.wait_for_change(previous_signature)
+                logger.info(f"Captured gear {index + 1}/{total}.")
+
+                if in_flight is not None:
+                    yield in_flight[0], in_flight[1].result()
+                in_flight = (index, executor.submit(self.parser, image, self.scaling_factor))
+
+            if in_flight is not None:
+                yield in_flight[0], in_flight[1].result()
@@ -0,0 +1,142 @@
+import json
+import os
+from collections.abc import Callable, Iterable
+from itertools import islice
+from os import PathLike
+from pathlib import Path
+from typing import Any, TypeVar
+
+from loguru import logger
+
+from agf_toolkit.processor.gear import Gear
+
+OUTPUT_FORMATS = ("json", "encoded")
+
+T = TypeVar("T")
+
+
+class GearWriter:
+    """
+    Write gears to a file as soon as they are parsed, with periodic flushes and resumable checkpoints.
+
+    Each gear is written on its own line, either as a JSON object (NDJSON) or as an encoded gear string. Every
+    `flush_every` gears the output is flushed and a checkpoint recording the number of inputs written and the output's
+    size is saved next to it. Resuming truncates the output back to the last checkpoint, so inputs must be fed in the
+    same order and the first `completed` of them skipped (see `write_parsed`).
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        path: str | PathLike,
+        output_format: str = "json",
+        flush_every: int = 100,
+        checkpoint_path: str | PathLike | None = None,
+        resume: bool = False,
+        append: bool = False,
+    ) -> None:
+        """
+        Initialise the writer and open the output file.
+
+        :param path: Path to the output file.
+        :param output_format: Either `json` for one JSON object per line, or `encoded` for one encoded gear per line.
+        :param flush_every: Number of gears between flushes and checkpoints.
+        :param checkpoint_path: Path to the checkpoint file. Defaults to the output path suffixed with `.checkpoint`.
+        :param resume: Continue from the last checkpoint instead of overwriting the output.
+        :param append: Write after the existing output instead of overwriting it, e.g. across live sessions.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Output format must be one of {OUTPUT_FORMATS}.")
+        if flush_every < 1:
+            raise ValueError("Flush interval must be at least 1.")
+        if resume and append:
+            raise ValueError("Output can't be both resumed and appended to.")
+
+        self.path = Path(path)
+        self.output_format = output_format
+        self.flush_every = flush_every
+        self.checkpoint_path = (
+            Path(checkpoint_path) if checkpoint_path else self.path.with_name(f"{self.path.name}.checkpoint")
+        )
+        self.completed = 0
+
+        offset = 0
+        if resume and self.checkpoint_path.exists():
+            checkpoint = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+            if checkpoint["format"] != output_format:
+                raise ValueError(f"Checkpoint was written in {checkpoint['format']} format, not {output_format}.")
+            self.completed, offset = checkpoint["completed"], checkpoint["offset"]
+            logger.info(f"Resuming from checkpoint: {self.completed} input(s) already written.")
+        elif append and self.path.exists():
+            offset = self.path.stat().st_size
+
+        # Anything past the checkpointed offset belongs to inputs that will be parsed again
+        self._file = open(self.path, "r+b" if offset else "wb")  # pylint: disable=consider-using-with
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        self.close(finished=exc_type is None)
+
+    def _format(self, gear: Gear) -> str:
+        if self.output_format == "json":
+            return json.dumps(gear.as_dict())
+        return gear.encode()
+
+    def write(self, gear: Gear) -> None:
+        """Write a gear, counting it as one completed input."""
+        self._file.write(f"{self._format(gear)}\n".encode())
+        self.completed += 1
+        if self.completed % self.flush_every == 0:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Flush the output and atomically save a checkpoint."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        temporary_path = self.checkpoint_path.with_name(f"{self.checkpoint_path.name}.tmp")
+        temporary_path.write_text(
+            json.dumps({"format": self.output_format, "completed": self.completed, "offset": self._file.tell()}),
+            encoding="utf-8",
+        )
+        os.replace(temporary_path, self.checkpoint_path)
+        logger.debug(f"Checkpoint saved after {self.completed} input(s).")
+
+    def close(self, finished: bool = True) -> None:
+        """
+        Close the output file.
+
+        :param finished: Whether all inputs were written. If so the checkpoint is removed, otherwise a final one is
+            saved to resume from.
+        """
+        if self._file.closed:
+            return
+        if finished:
+            self._file.close()
+            self.checkpoint_path.unlink(missing_ok=True)
+        else:
+            self.checkpoint()
+            self._file.close()
+
+
+def write_parsed(inputs: Iterable[T], parser: Callable[[T], Gear], writer: GearWriter, **kwargs: Any) -> int:
+    """
+    Parse inputs one at a time and stream the gears to the writer, skipping inputs completed in a previous run.
+
+    Only one gear is held in memory at a time, so memory usage stays flat regardless of the number of inputs.
+
+    :param inputs: The inputs to parse, e.g. screenshot paths, in the same order as the previous run when resuming.
+    :param parser: Function parsing an input into a Gear object.
+    :param writer: The writer to stream to.
+    :param kwargs: Extra keyword arguments passed to the parser.
+    :return: The number of inputs parsed in this run.
+    """
+    count = 0
+    for item in islice(inputs, writer.completed, None):
+        writer.write(parser(item, **kwargs))
+        count += 1
+    return count
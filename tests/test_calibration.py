@@ -0,0 +1,29 @@
+import cv2
+import pytest
+
+from agf_toolkit.processor.calibration import (
+    calibrate_scale_by_features,
+    estimate_scale,
+)
+
+
+@pytest.mark.parametrize(
+    "file_name,scaling_factor",
+    [
+        ("tests/Normal_1.jpg", 1.0038),
+        ("tests/Foreign_1.png", 0.7529),
+        ("tests/Foreign_2.png", 1.5058),
+        ("tests/Foreign_3.jpg", 1.0777),
+    ],
+)
+class TestFeatureCalibration:
+    """Test feature-based calibration against the scaling factors found by the full sweep."""
+
+    def test_estimate(self, file_name, scaling_factor):
+        estimate = estimate_scale(cv2.imread(file_name))
+        assert estimate is not None
+        assert estimate[0] == pytest.approx(scaling_factor, rel=0.03)
+
+    def test_refined(self, file_name, scaling_factor):
+        result = calibrate_scale_by_features(cv2.imread(file_name))
+        assert result == pytest.approx(scaling_factor, rel=0.01)
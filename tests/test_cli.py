@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from agf_toolkit.__main__ import main
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils import cache
+
+ENCODED_GEAR = "5,5,2,3,10,-1,43%,7,4,12.2,9,1,40%,6,3,0.4%,1,2,988.0"
+
+
+@pytest.fixture
+def calibration_cache(tmp_path, monkeypatch):
+    path = tmp_path / "calibration.json"
+    monkeypatch.setattr(cache, "CALIBRATION_CACHE_PATH", path)
+    return path
+
+
+class TestCommandLine:
+    """Test the command line interface."""
+
+    def test_lazy_imports(self):
+        """Test that the codec commands don't load any heavy module."""
+        code = (
+            "import sys; from agf_toolkit.__main__ import main; "
+            f"main(['decode', '{ENCODED_GEAR}']); "
+            "assert not {'cv2', 'skimage', 'paddleocr'} & set(sys.modules), sorted(sys.modules)"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+
+    def test_codec(self, capsys):
+        main(["decode", ENCODED_GEAR])
+        decoded = capsys.readouterr().out.strip()
+        assert json.loads(decoded) == Gear.decode(ENCODED_GEAR).as_dict()
+
+        main(["encode", decoded])
+        assert capsys.readouterr().out.strip() == ENCODED_GEAR
+
+    def test_malformed_codec_inputs(self, capsys):
+        """Malformed lines are reported on stderr without stopping the others."""
+        main(["decode", "", "garbage", ENCODED_GEAR])
+        captured = capsys.readouterr()
+        assert [json.loads(line) for line in captured.out.splitlines()] == [Gear.decode(ENCODED_GEAR).as_dict()]
+        assert captured.err.count("Failed to decode") == 2
+
+        main(["encode", "{}", "[]", "not json", json.dumps(Gear.decode(ENCODED_GEAR).as_dict())])
+        captured = capsys.readouterr()
+        assert captured.out.splitlines() == [ENCODED_GEAR]
+        assert captured.err.count("Failed to encode") == 3
+
+    def test_resume_without_output(self, capsys):
+        with pytest.raises(SystemExit):
+            main(["parse-files", "tests/Normal_1.jpg", "--resume"])
+        assert "--resume" in capsys.readouterr().err
+
+    def test_calibrate(self, calibration_cache, capsys):
+        main(["calibrate", "--file", "tests/Foreign_1.png", "--profile", "foreign"])
+        scaling_factor = float(capsys.readouterr().out)
+        assert scaling_factor == pytest.approx(0.7529, abs=0.005)
+        assert json.loads(calibration_cache.read_text()) == {"foreign": scaling_factor}
+
+        # Cache hit, the file isn't even read
+        main(["calibrate", "--file", "missing.png", "--profile", "foreign"])
+        assert float(capsys.readouterr().out) == scaling_factor
@@ -53,6 +53,10 @@ class TestNonNullOperations:
     def test_decode_gear(self, gear_object, gear_decode):
         assert Gear.decode(gear_decode) == gear_object
 
+    def test_dict_round_trip(self, gear_object):
+        assert Gear.from_dict(gear_object.as_dict()) == gear_object
+        assert Gear.from_dict(Gear().as_dict()) == Gear()
+
 
 class TestNullOperations:
     """Test the encoding and decoding of a Gear instance with some null values."""
@@ -78,3 +82,21 @@ class TestInvallidCharacterHandling:
         polluted_gear_decode = "".join(gear_decode_array)
 
         assert Gear.decode(polluted_gear_decode) == gear_object
+
+
+class TestConfidence:
+    """Test the OCR confidences carried by Gear and Stat instances."""
+
+    def test_identity(self, gear_object, gear_decode):
+        gear_object.confidence = {"gear_set": 0.5}
+        gear_object.main_stat.confidence = {"stat_value": 0.5}
+        assert gear_object == Gear.decode(gear_decode)
+        assert hash(gear_object) == hash(Gear.decode(gear_decode))
+
+    def test_low_confidence_fields(self, gear_object):
+        gear_object.confidence = {"gear_set": 0.99, "gear_type": 0.6}
+        gear_object.main_stat.confidence = {"stat_type": 0.95, "stat_value": 0.7}
+        gear_object.sub_stats[2].confidence = {"stat_type": 0.3, "stat_value": 0.99}
+
+        assert gear_object.low_confidence_fields(0.9) == ["gear_type", "main_stat.stat_value", "sub_stats.2.stat_type"]
+        assert not gear_object.low_confidence_fields(0.2)
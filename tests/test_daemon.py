@@ -0,0 +1,121 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils import cache
+from agf_toolkit.utils.daemon import ParseClient, create_server
+
+ENCODED_GEAR = "5,5,2,3,10,-1,43%,7,4,12.2,9,1,40%,6,3,0.4%,1,2,988.0"
+SCREENSHOT = "tests/Foreign_1.png"
+
+
+class _FakeParser:
+    """Record the image shapes and scaling factors it's called with, and allow at most one call at a time."""
+
+    def __init__(self):
+        self.calls = []
+        self._busy = threading.Lock()
+
+    def __call__(self, image, scaling_factor):
+        if not self._busy.acquire(blocking=False):
+            raise AssertionError("Parser called concurrently.")
+        try:
+            self.calls.append((image.shape, scaling_factor))
+            return Gear.decode(ENCODED_GEAR)
+        finally:
+            self._busy.release()
+
+
+@pytest.fixture(params=["tcp", "unix"])
+def daemon(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CALIBRATION_CACHE_PATH", tmp_path / "calibration.json")
+    cache.save_scaling_factor(0.75, "phone")
+
+    parser = _FakeParser()
+    address = ("127.0.0.1", 0) if request.param == "tcp" else tmp_path / "daemon.sock"
+    # Over TCP, screenshots are only read by path under a root
+    server = create_server(address, parser=parser, path_root="tests" if request.param == "tcp" else None)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield (server.server_address if request.param == "tcp" else address), parser
+
+    server.shutdown()
+    server.server_close()
+
+
+class TestParseDaemon:
+    """Test the resident parse daemon and its client."""
+
+    def test_parse(self, daemon):
+        address, parser = daemon
+        with ParseClient(address) as client:
+            assert client.health()
+            assert client.parse_file(SCREENSHOT, profile="phone") == Gear.decode(ENCODED_GEAR).as_dict()
+            assert client.parse_bytes(Path(SCREENSHOT).read_bytes(), scaling_factor=0.5)
+            assert client.parse_file(SCREENSHOT)
+
+        shape = parser.calls[0][0]
+        assert parser.calls == [(shape, 0.75), (shape, 0.5), (shape, None)]
+
+    def test_concurrent_clients(self, daemon):
+        address, parser = daemon
+
+        def _parse(_):
+            with ParseClient(address) as client:
+                return [client.parse_file(SCREENSHOT) for _ in range(3)]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = [gear for gears in executor.map(_parse, range(4)) for gear in gears]
+
+        assert len(results) == len(parser.calls) == 12
+        assert all(gear == results[0] for gear in results)
+
+    def test_bad_requests(self, daemon):
+        address, parser = daemon
+        with ParseClient(address) as client:
+            with pytest.raises(RuntimeError, match="400"):
+                client.parse_bytes(b"not an image")
+            with pytest.raises(RuntimeError, match="400"):
+                client.parse_file("tests/missing.png")
+            assert client.health()  # The connection survives errors
+        assert not parser.calls
+
+    def test_unread_bodies(self, daemon):
+        """Bodies are read even when they're refused, or the connection is closed if they can't be."""
+        address, _ = daemon
+        with ParseClient(address) as client:
+            connection = client._connection
+            connection.request("POST", "/unknown", body=b"x" * 1000)
+            response = connection.getresponse()
+            assert response.status == 404 and not response.will_close
+            response.read()
+            assert client.health()
+
+            connection.putrequest("POST", "/parse")
+            connection.putheader("Content-Length", "many")
+            connection.endheaders()
+            response = connection.getresponse()
+            assert response.status == 400 and response.will_close
+            response.read()
+
+    def test_path_root(self, tmp_path):
+        """Paths outside the root, or any path over TCP without a root, are refused."""
+        outside = tmp_path / "screenshot.png"
+        outside.write_bytes(Path(SCREENSHOT).read_bytes())
+        for path_root, allowed in ((None, []), ("tests", [SCREENSHOT]), (tmp_path, [outside])):
+            server = create_server(("127.0.0.1", 0), parser=_FakeParser(), path_root=path_root)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                with ParseClient(server.server_address) as client:
+                    for path in (SCREENSHOT, outside):
+                        if path in allowed:
+                            assert client.parse_file(path)
+                        else:
+                            with pytest.raises(RuntimeError, match="403"):
+                                client.parse_file(path)
+            finally:
+                server.shutdown()
+                server.server_close()
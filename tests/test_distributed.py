@@ -0,0 +1,114 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+import pytest
+
+zmq = pytest.importorskip("zmq")
+
+from agf_toolkit.networking.distributed import (
+    Dispatcher,
+    encode_frame,
+    parse_frame,
+    run_worker,
+)
+from agf_toolkit.processor import utils
+from agf_toolkit.processor.gear import Gear
+
+
+def _echo_parser(frame, scaling_factor):
+    if frame == b"bad":
+        raise ValueError("Unparsable frame")
+    return f"{frame.decode()}@{scaling_factor}"
+
+
+_PORTS = itertools.count(25557, 2)
+
+
+@pytest.fixture
+def addresses():
+    # Fresh ports per test, so workers of a previous test can't reconnect and swallow frames
+    port = next(_PORTS)
+    return f"tcp://127.0.0.1:{port}", f"tcp://127.0.0.1:{port + 1}"
+
+
+@pytest.fixture
+def stop_event():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def _start_worker(addresses, stop_event, parser=_echo_parser):
+    thread = threading.Thread(target=run_worker, args=(*addresses, parser, stop_event, 0.05), daemon=True)
+    thread.start()
+    return thread
+
+
+class TestLocalhostPipeline:
+    """Test the push/pull pipeline on localhost."""
+
+    def test_results_in_order(self, addresses, stop_event):
+        frames = [str(i).encode() for i in range(50)]
+        with Dispatcher(*addresses, max_in_flight=8) as dispatcher:
+            for _ in range(3):
+                _start_worker(addresses, stop_event)
+            results = list(dispatcher.run(frames, scaling_factor=0.5))
+
+        assert results == [(i, f"{i}@0.5") for i in range(50)]
+
+    def test_failed_frame(self, addresses, stop_event):
+        with Dispatcher(*addresses) as dispatcher:
+            _start_worker(addresses, stop_event)
+            results = list(dispatcher.run([b"1", b"bad", b"2"]))
+
+        assert results == [(0, "1@None"), (1, None), (2, "2@None")]
+
+    def test_retry_on_worker_loss(self, addresses, stop_event):
+        def _dying_parser(frame, scaling_factor):
+            raise SystemExit  # Worker dies without replying
+
+        with Dispatcher(*addresses, max_in_flight=1, task_timeout=0.5) as dispatcher:
+            _start_worker(addresses, stop_event, _dying_parser)
+            threading.Timer(1.0, _start_worker, args=(addresses, stop_event)).start()
+            results = list(dispatcher.run([b"1", b"2"]))
+
+        assert results == [(0, "1@None"), (1, "2@None")]
+
+    def test_late_result(self, addresses, stop_event):
+        """A result arriving after its task timed out is kept, and the retry still waiting for a worker is dropped."""
+
+        def _slow_parser(frame, scaling_factor):
+            time.sleep(0.5)
+            return _echo_parser(frame, scaling_factor)
+
+        with Dispatcher(*addresses, max_in_flight=1, task_timeout=0.2) as dispatcher:
+            sent = set()
+            send = dispatcher._send
+
+            def _send(task_id, frame, scaling_factor):
+                # No worker ever takes a retry, so it stays queued
+                if task_id in sent:
+                    return False
+                sent.add(task_id)
+                return send(task_id, frame, scaling_factor)
+
+            dispatcher._send = _send
+            _start_worker(addresses, stop_event, _slow_parser)
+            results = list(dispatcher.run([b"1", b"2"]))
+
+        assert results == [(0, "1@None"), (1, "2@None")]
+
+    def test_parse_frame(self, monkeypatch):
+        """Workers hand the unscaled frame and the scaling factor to the parser, which only rescales the info box."""
+        calls = []
+
+        def _parse_screenshot(image, scaling_factor):
+            calls.append((image, scaling_factor))
+            return Gear()
+
+        monkeypatch.setattr(utils, "parse_screenshot", _parse_screenshot)
+        image = np.zeros((90, 160, 3), dtype=np.uint8)
+        assert parse_frame(encode_frame(image), 0.5) == Gear().encode()
+        assert calls[0][0].shape == image.shape and calls[0][1] == 0.5
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import numpy as np
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.farm import CaptureFarm
+
+
+class _FakeDevice:
+    def __init__(self, serial, value):
+        self.serial = serial
+        self.value = value
+
+    def screenshot(self):
+        time.sleep(0.01)
+        return np.full((4, 4, 3), self.value, dtype=np.uint8)
+
+
+def _parser(image, scaling_factor):
+    return Gear(gear_star=int(image[0, 0, 0]) if scaling_factor is None else int(scaling_factor))
+
+
+async def _collect(farm, **kwargs):
+    return [result async for result in farm.run(**kwargs)]
+
+
+class TestCaptureFarm:
+    """Test concurrent capture with fake devices."""
+
+    def test_frames_tagged_by_device(self):
+        farm = CaptureFarm(
+            [_FakeDevice("a", 1), _FakeDevice("b", 2), _FakeDevice("c", 3)],
+            scaling_factors={"c": 5.0},
+            parser=_parser,
+            min_interval=0.05,
+        )
+        results = asyncio.run(_collect(farm, max_frames=30))
+
+        assert len(results) == 30
+        assert {frame.device for frame, _ in results} == {"a", "b", "c"}
+        assert all(gear.gear_star == {"a": 1, "b": 2, "c": 5}[frame.device] for frame, gear in results)
+
+    def test_rate_limit(self):
+        farm = CaptureFarm([_FakeDevice("a", 1), _FakeDevice("b", 2)], parser=_parser, min_interval=0.1)
+        results = asyncio.run(_collect(farm, duration=0.55))
+
+        for serial in ("a", "b"):
+            timestamps = [frame.timestamp for frame, _ in results if frame.device == serial]
+            assert 4 <= len(timestamps) <= 6
+            assert min(np.diff(timestamps)) >= 0.09
+
+    def test_rate_limit_per_device(self):
+        farm = CaptureFarm(
+            [_FakeDevice("a", 1), _FakeDevice("b", 2)], parser=_parser, min_interval=0.1, min_intervals={"b": 0.25}
+        )
+        results = asyncio.run(_collect(farm, duration=0.55))
+
+        assert 4 <= sum(frame.device == "a" for frame, _ in results) <= 6
+        timestamps = [frame.timestamp for frame, _ in results if frame.device == "b"]
+        assert 2 <= len(timestamps) <= 3
+        assert min(np.diff(timestamps)) >= 0.24
@@ -0,0 +1,117 @@
+import cv2
+import numpy as np
+import pytest
+
+from agf_toolkit import templates
+from agf_toolkit.processor import text
+from agf_toolkit.processor.glyph import GLYPH_SIZE, GlyphRecogniser, segment
+from agf_toolkit.processor.image import extract_info_box, extract_info_box_rescaled
+
+# Screenshots the bundled glyph templates are built from, between them showing every character
+TRAINING_SCREENSHOTS = [
+    ("tests/Normal_1.jpg", None, ["125", "9.8%", "399"]),
+    ("tests/Normal_3.jpg", None, ["125", "527", "13.9%", "9.2%", "104"]),
+    ("tests/Foreign_2.png", 1.5058, ["70", "14.3%", "24.6%", "15.4", "25.5%"]),
+    ("tests/Foreign_3.jpg", 1.0777, ["8.0%", "362", "8.2%", "14.9%", "10.8%"]),
+]
+# Screenshots held out of the bundled glyph templates
+HELD_OUT_SCREENSHOTS = [
+    ("tests/Normal_2.jpg", None, ["10"]),
+    ("tests/Foreign_1.png", 0.7529, ["17.5", "6.2%", "11.4%", "9.5%"]),
+]
+SCREENSHOTS = TRAINING_SCREENSHOTS + HELD_OUT_SCREENSHOTS
+
+
+def value_images(file_name, scaling_factor):
+    """Crop the stat values of every row of a screenshot's info box."""
+    image = cv2.imread(file_name)
+    if scaling_factor is None:
+        info_box = extract_info_box(image, templates.INFO_BOX)
+    else:
+        info_box = extract_info_box_rescaled(image, templates.INFO_BOX, scaling_factor)
+    left, right = templates.STAT_VALUE_COLUMN
+    return [info_box[top:bottom, left:right] for top, bottom in templates.STAT_ROWS]
+
+
+@pytest.fixture(scope="module")
+def samples():
+    return [
+        (value_image, value)
+        for file_name, scaling_factor, values in SCREENSHOTS
+        for value_image, value in zip(value_images(file_name, scaling_factor), values)
+    ]
+
+
+class TestGlyphRecogniser:
+    """Test the glyph-template recogniser for stat values."""
+
+    def test_bundled_glyphs_provenance(self):
+        """The bundled templates are exactly those of the training screenshots, so held out ones are truly unseen."""
+        training_samples = [
+            (value_image, value)
+            for file_name, scaling_factor, values in TRAINING_SCREENSHOTS
+            for value_image, value in zip(value_images(file_name, scaling_factor), values)
+        ]
+        bundled, rebuilt = GlyphRecogniser.load(), GlyphRecogniser.from_samples(training_samples)
+        assert np.array_equal(bundled.glyphs, rebuilt.glyphs)
+        assert bundled.labels.tolist() == rebuilt.labels.tolist()
+
+    @pytest.mark.parametrize("file_name,scaling_factor,values", HELD_OUT_SCREENSHOTS)
+    def test_held_out_screenshots(self, file_name, scaling_factor, values):
+        """Values of screenshots the templates weren't built from are read right, or left to the text backend."""
+        recogniser = GlyphRecogniser.load()
+        results = recogniser.recognise_lines(value_images(file_name, scaling_factor)[: len(values)])
+
+        for (text, confidence), value in zip(results, values):
+            assert text == value or confidence < recogniser.min_confidence
+        assert sum(confidence >= recogniser.min_confidence for _, confidence in results) >= len(values) / 2
+
+    def test_confusable_glyphs(self):
+        """Without upright templates, an upright 6 is closer to an italic 8, but not by enough to be read confidently."""
+        training_samples = [
+            (value_image, value)
+            for file_name, scaling_factor, values in TRAINING_SCREENSHOTS
+            for value_image, value in zip(value_images(file_name, scaling_factor), values)
+        ]
+        value_image = value_images(*HELD_OUT_SCREENSHOTS[1][:2])[1]
+
+        text, confidence = GlyphRecogniser.from_samples(training_samples, slants=()).classify(segment(value_image))
+        assert text == "8.2%" and confidence < 0.8
+        assert GlyphRecogniser.load().classify(segment(value_image))[0] == "6.2%"
+
+    @pytest.mark.parametrize("file_name,scaling_factor,values", SCREENSHOTS)
+    def test_retry_keeps_values(self, file_name, scaling_factor, values):
+        """Reading every value of the test screenshots again from its retry variants doesn't change any of them."""
+        images = value_images(file_name, scaling_factor)[: len(values)]
+        results = text.recognise_with_retry(images, GlyphRecogniser.load(), min_confidence=1.0)
+
+        assert [value for value, _ in results] == values
+
+    def test_segment(self, samples):
+        for value_image, value in samples:
+            glyphs = segment(value_image)
+            assert len(glyphs) == len(value)
+            assert all(glyph.shape == (GLYPH_SIZE, GLYPH_SIZE) for glyph in glyphs)
+
+        assert not segment(np.full((40, 120, 3), 255, dtype=np.uint8))
+
+    def test_malformed_value(self, samples):
+        """Test that a reading which can't be a stat value is never confident, however well the glyphs matched."""
+        recogniser = GlyphRecogniser.from_samples(samples)
+        glyphs = segment(dict((value, image) for image, value in samples)["9.8%"])
+
+        assert recogniser.classify(glyphs)[1] > recogniser.min_confidence
+        assert recogniser.classify(glyphs[::-1]) == ("%8.9", 0.0)
+        assert not recogniser.recognise(np.full((40, 120, 3), 255, dtype=np.uint8))
+
+    def test_save_load(self, samples, tmp_path):
+        recogniser = GlyphRecogniser.from_samples(samples[:5])
+        recogniser.save(tmp_path / "glyphs.npz")
+        loaded = GlyphRecogniser.load(tmp_path / "glyphs.npz")
+
+        assert np.array_equal(loaded.glyphs, recogniser.glyphs)
+        assert loaded.labels.tolist() == recogniser.labels.tolist()
+
+    def test_mismatched_labels(self):
+        with pytest.raises(ValueError):
+            GlyphRecogniser(np.zeros((2, GLYPH_SIZE, GLYPH_SIZE)), ["1"])
@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+import pytest
+
+from agf_toolkit import templates
+from agf_toolkit.processor.image import (
+    calculate_rescaled_size,
+    extract_gear_star,
+    extract_info_box,
+    extract_info_box_rescaled,
+    rescale,
+    retry_variants,
+)
+
+
+@pytest.mark.parametrize(
+    "file_name,scaling_factor",
+    [
+        ("tests/Normal_1.jpg", 1.0038),
+        ("tests/Foreign_1.png", 0.7529),
+        ("tests/Foreign_2.png", 1.5058),
+        ("tests/Foreign_3.jpg", 1.0777),
+    ],
+)
+def test_crop_first_extraction(file_name, scaling_factor):
+    """Test that cropping before rescaling gives the same info box as rescaling the whole screenshot."""
+    image = cv2.imread(file_name)
+    expected = extract_info_box(rescale(image, *calculate_rescaled_size(image, scaling_factor)), templates.INFO_BOX)
+    result = extract_info_box_rescaled(image, templates.INFO_BOX, scaling_factor)
+
+    assert result.shape == templates.INFO_BOX.shape
+    assert np.abs(result.astype(int) - expected).mean() < 8  # Allow for interpolation differences
+
+
+@pytest.mark.parametrize(
+    "file_name,gear_star", [("tests/Normal_1.jpg", 6), ("tests/Normal_2.jpg", 1), ("tests/Normal_3.jpg", 6)]
+)
+def test_gear_star(file_name, gear_star):
+    """Test gear star extraction against the bundled, pre-thresholded star templates."""
+    info_box = extract_info_box(cv2.imread(file_name), templates.INFO_BOX)
+    assert extract_gear_star(info_box, templates.STARS) == gear_star
+    assert extract_gear_star(info_box, dict(templates.STARS)) == gear_star
+
+
+def test_retry_variants():
+    """Test that retry variants are enlarged colour images, so any backend can read them."""
+    info_box = extract_info_box(cv2.imread("tests/Normal_1.jpg"), templates.INFO_BOX)
+    line = info_box[306:360, 360:505]
+    upscaled, binarised = retry_variants(line)
+
+    assert upscaled.shape == binarised.shape == (line.shape[0] * 2, line.shape[1] * 2, 3)
+    assert set(np.unique(binarised)) <= {0, 255}
@@ -0,0 +1,202 @@
+import numpy as np
+import pytest
+
+from agf_toolkit.inventory.index import InventoryIndex, fingerprint, sync
+from agf_toolkit.inventory.ranking import GearRanking
+from agf_toolkit.inventory.simulator import (
+    DEFAULT_PERCENTILES,
+    EnhancementRules,
+    iter_best_candidates,
+    remaining_milestones,
+    simulate,
+)
+from agf_toolkit.processor.gear import Gear, Stat
+
+
+@pytest.fixture
+def gear_object():
+    return Gear.decode(r"5,5,2,3,10,-1,43%,7,4,12.2,9,1,40%,6,3,0.4%,1,2,988.0")
+
+
+@pytest.fixture
+def upgraded_gear_object():
+    return Gear.decode(r"5,5,2,4,10,-1,48%,7,4,14.1,9,1,40%,6,3,0.4%,1,2,988.0")
+
+
+@pytest.fixture
+def other_gear_object():
+    return Gear.decode(r"10,1,5,1,1,-1,10.0")
+
+
+class TestHashing:
+    """Test that hashing is consistent with equality."""
+
+    def test_equal_gears(self, gear_object):
+        same_gear = Gear(
+            gear_set="DEF set",
+            gear_type="Aiming Component",
+            gear_rarity="Purple",
+            gear_star="3",
+            main_stat=Stat(stat_type="Status ACC", stat_value="43%", stat_rarity=None),
+            sub_stats=[
+                Stat(stat_type="SPD", stat_value=12.2, stat_rarity="Green"),
+                Stat(stat_type="CRIT DMG", stat_value="40%", stat_rarity="Yellow"),
+                Stat(stat_type="HP", stat_value="0.4%", stat_rarity="Blue"),
+                Stat(stat_type="ATK", stat_value="988", stat_rarity="Purple"),
+            ],
+        )
+        assert same_gear == gear_object
+        assert hash(same_gear) == hash(gear_object)
+        assert fingerprint(same_gear) == fingerprint(gear_object)
+        assert len({same_gear, gear_object}) == 1
+
+    def test_different_gears(self, gear_object, other_gear_object):
+        assert fingerprint(gear_object) != fingerprint(other_gear_object)
+
+
+class TestInventoryIndex:
+    """Test deduplication, diffing and persistence of the inventory index."""
+
+    def test_dedup(self, gear_object, other_gear_object):
+        index = InventoryIndex([gear_object, other_gear_object, Gear.decode(gear_object.encode())])
+        assert len(index) == 2
+        assert not index.add(gear_object)
+
+    def test_diff(self, gear_object, upgraded_gear_object, other_gear_object):
+        new_gear = Gear.decode(r"3,4,1,6,7,-1,17.5,8,1,6.2%")
+        previous = InventoryIndex([gear_object, other_gear_object])
+        current = InventoryIndex([upgraded_gear_object, new_gear])
+
+        diff = current.diff(previous)
+        assert diff.added == [new_gear]
+        assert diff.removed == [other_gear_object]
+        assert diff.upgraded == [(gear_object, upgraded_gear_object)]
+
+    def test_sync(self, tmp_path, gear_object, upgraded_gear_object, other_gear_object):
+        path = tmp_path / "inventory.txt"
+        assert sync([gear_object, other_gear_object, gear_object], path).as_dict() == {
+            "added": [gear_object.encode(), other_gear_object.encode()],
+            "removed": [],
+            "upgraded": [],
+        }
+        assert not sync([other_gear_object, gear_object], path)
+
+        diff = sync([other_gear_object, upgraded_gear_object], path)
+        assert diff.upgraded == [(gear_object, upgraded_gear_object)]
+        assert list(InventoryIndex.load(path)) == [other_gear_object, upgraded_gear_object]
+
+
+class TestGearRanking:
+    """Test weighted top-k queries and in-place updates of the gear ranking."""
+
+    @pytest.fixture
+    def gears(self):
+        return [
+            Gear.decode(r"4,5,1,6,9,-1,60%,8,1,10.0%,7,2,8.0"),
+            Gear.decode(r"4,5,2,5,9,-1,40%,8,1,12.0%"),
+            Gear.decode(r"4,1,1,6,1,-1,500.0,9,1,20%"),
+            Gear.decode(r"5,5,1,6,10,-1,40%,9,1,24%,7,3,12.0"),
+        ]
+
+    def test_top_k(self, gears):
+        ranking = GearRanking(gears)
+        results = ranking.top_k({"CRIT DMG": 1}, k=2)
+        assert [gear for gear, _ in results] == [gears[0], gears[1]]
+        assert results[0][1] == pytest.approx(1.0)
+        assert results[1][1] == pytest.approx(40 / 60)
+
+        results = ranking.top_k({"CRIT DMG": 1, "Critical": 1}, gear_type="Aiming Component", gear_star=6)
+        assert [gear for gear, _ in results] == [gears[0], gears[3]]
+        assert results[0][1] == pytest.approx(1 + 10 / 12)
+        assert ranking.top_k({"SPD": 1}, gear_set="DEF set") == [(gears[3], pytest.approx(1.0))]
+        assert ranking.top_k({"SPD": 1}, gear_set="HP set") == []
+
+    def test_ties(self, gears):
+        """Gears scoring the same come back in the order they were added in."""
+        ranking = GearRanking(gears)
+        assert [gear for gear, _ in ranking.top_k({"ATK (%)": 1})] == gears
+
+        # Including ties at the boundary of the best k
+        tied = [Gear.decode(f"10,1,5,6,7,-1,10.0,9,1,{i}%") for i in range(1, 41)]
+        assert [gear for gear, _ in GearRanking(tied).top_k({"SPD": 1}, k=5)] == tied[:5]
+
+    def test_unknown_filters(self, gears):
+        ranking = GearRanking(gears)
+        with pytest.raises(ValueError):
+            ranking.top_k({"Luck": 1})
+        with pytest.raises(ValueError):
+            ranking.top_k({"SPD": 1}, gear_type="Hat")
+
+    def test_updates(self, gears):
+        """Adding, removing and upgrading gears updates the ranking in place, reusing freed rows."""
+        ranking = GearRanking(gears[:2])
+        assert not ranking.add(gears[0])
+        ranking.discard(gears[0])
+        assert gears[0] not in ranking
+        assert [gear for gear, _ in ranking.top_k({"CRIT DMG": 1})] == [gears[1]]
+
+        upgraded = Gear.decode(r"4,5,2,6,9,-1,70%,8,1,12.0%")
+        previous, current = InventoryIndex(gears[1:2]), InventoryIndex([upgraded, *gears[2:]])
+        ranking.apply(current.diff(previous))
+        assert len(ranking) == 3
+        assert [gear for gear, _ in ranking.top_k({"CRIT DMG": 1})] == [upgraded, gears[3], gears[2]]
+
+    def test_growth(self):
+        """The ranking grows past its initial capacity."""
+        gears = [Gear.decode(f"10,1,5,{i % 7},7,-1,{i}.0") for i in range(1, 201)]
+        ranking = GearRanking(gears)
+        assert len(ranking) == 200
+        assert [gear.main_stat.stat_value for gear, _ in ranking.top_k({"SPD": 1}, k=3)] == [200.0, 199.0, 198.0]
+        assert len(ranking.top_k({"SPD": 1}, k=500, gear_star=3)) == len([i for i in range(1, 201) if i % 7 == 3])
+
+
+class TestSimulator:
+    """Test the Monte Carlo enhancement simulator."""
+
+    @pytest.fixture
+    def gears(self, gear_object):
+        return [
+            gear_object,
+            Gear.decode(r"10,1,5,6,7,-1,10.0"),
+            Gear.decode(r"4,5,1,6,9,-1,60%,8,1,10.0%,7,2,8.0,9,1,5%,2,1,20.0"),
+        ]
+
+    def test_seeded(self, gears):
+        first = simulate(gears, 500, seed=7)
+        assert np.array_equal(first.stat_percentiles, simulate(gears, 500, seed=7).stat_percentiles)
+        assert simulate(gears, 500, seed=7, batch_size=500).stat_percentiles.shape == (3, 5, 11)
+        assert not np.array_equal(first.stat_percentiles, simulate(gears, 500, seed=8).stat_percentiles)
+
+    def test_fully_enhanced(self, gears):
+        """Gears with no milestones left keep their sub stats."""
+        result = simulate(gears, 100, seed=0, remaining=[0, 0, 0])
+        assert result.stat(0, "CRIT DMG") == {p: 40.0 for p in DEFAULT_PERCENTILES}
+        assert result.stat(2, "CRIT DMG") == {p: 5.0 for p in DEFAULT_PERCENTILES}
+        assert not result.stat_percentiles[1].any()
+
+    def test_outcomes(self, gears):
+        rules = EnhancementRules()
+        result = simulate(gears, 2000, percentiles=(0, 50, 100), weights={"CRIT DMG": 1}, seed=0, rules=rules)
+        low, high = rules.roll_ranges["CRIT DMG"]
+
+        # A gear with 4 sub stats only raises them: CRIT DMG gets between 0 and 5 rolls
+        assert result.stat(2, "CRIT DMG")[0] == pytest.approx(5.0)
+        assert result.stat(2, "CRIT DMG")[100] <= 5.0 + 5 * high
+        assert result.stat(2, "CRIT DMG")[50] > 5.0 + low
+        # Neither new stat types nor the main stat's type show up on a gear with 4 sub stats
+        assert result.stat(2, "ATK")[100] == 0
+        assert result.stat(2, "SPD")[0] == pytest.approx(8.0)
+        # A gear without sub stats can't roll its main stat's type
+        assert result.stat(1, "SPD")[100] == 0
+        assert result.stat(1, "CRIT DMG")[100] > 0
+        assert np.allclose(result.score_percentiles[:, 1], result.stat_percentiles[:, 1, 8])
+
+        best = list(iter_best_candidates(gears, result, percentile=50, k=2))
+        assert [gear for gear, _ in best] == [gears[0], gears[2]]
+        with pytest.raises(ValueError):
+            next(iter_best_candidates(gears, simulate(gears, 10)))
+
+    def test_remaining_milestones(self, gear_object):
+        """Only sub stats added past a rarity's initial ones count as spent milestones."""
+        assert remaining_milestones(gear_object) == 4
+        assert remaining_milestones(Gear.decode(r"10,1,5,6,7,-1,10.0")) == 5
@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+import pytest
+
+from agf_toolkit.utils.loader import iter_images, read_image
+
+
+@pytest.fixture
+def image_paths(tmp_path):
+    paths = []
+    for i in range(12):
+        path = tmp_path / f"{i}.png"
+        cv2.imwrite(str(path), np.full((480, 640, 3), i * 10, dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+class TestImageLoader:
+    """Test the prefetching image loader."""
+
+    @pytest.mark.parametrize(
+        "scaling_factor,expected_shape,expected_factor",
+        [
+            (None, (480, 640, 3), None),
+            (1.2, (480, 640, 3), 1.2),
+            (0.5, (240, 320, 3), 1.0),
+            (0.3, (240, 320, 3), 0.6),
+            (0.125, (60, 80, 3), 1.0),
+        ],
+    )
+    def test_reduced_decoding(self, image_paths, scaling_factor, expected_shape, expected_factor):
+        image, remaining_factor = read_image(image_paths[0], scaling_factor)
+        assert image.shape == expected_shape
+        assert remaining_factor == pytest.approx(expected_factor)
+
+    def test_order(self, image_paths):
+        results = list(iter_images(image_paths, workers=3, prefetch=4))
+        assert [path for path, _, _ in results] == image_paths
+        assert [int(image[0, 0, 0]) for _, image, _ in results] == [i * 10 for i in range(12)]
+
+    def test_unreadable(self, tmp_path):
+        ((_, image, _),) = iter_images([tmp_path / "missing.png"])
+        assert image is None
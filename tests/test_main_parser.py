@@ -1,10 +1,22 @@
+import json
+
 import cv2
 import pytest
 
-from agf_toolkit.processor.calibration import calibrate_scale
+from agf_toolkit.processor import text
+from agf_toolkit.processor.calibration import (
+    calibrate_scale,
+    calibrate_scale_by_features,
+)
 from agf_toolkit.processor.gear import Gear, Stat
+from agf_toolkit.processor.glyph import GlyphRecogniser
 from agf_toolkit.processor.image import calculate_rescaled_size, rescale
-from agf_toolkit.processor.utils import parse_screenshot
+from agf_toolkit.processor.transcript import Transcript
+from agf_toolkit.processor.utils import (
+    parse_screenshot,
+    parse_transcript,
+    transcribe_screenshot,
+)
 
 
 class TestKnownScreenshots:
@@ -61,6 +73,31 @@ class TestKnownScreenshots:
         parser_result = parse_screenshot(cv2.imread(file_name))
         assert parser_result == gear_object
 
+    @pytest.mark.parametrize(
+        "file_name,scaling_factor", [("tests/Normal_2.jpg", None), ("tests/Foreign_1.png", 0.7529)]
+    )
+    def test_glyph_backend(self, file_name, scaling_factor, monkeypatch):
+        """Test that the glyph recogniser gives the same gear as the text backend on screenshots it wasn't built from"""
+        image = cv2.imread(file_name)
+        monkeypatch.setattr(text, "NUMERIC_BACKEND", GlyphRecogniser.load())
+        expected = parse_screenshot(image, scaling_factor=scaling_factor)
+        monkeypatch.setattr(text, "NUMERIC_BACKEND", None)
+        assert parse_screenshot(image, scaling_factor=scaling_factor) == expected
+
+    def test_confidence(self):
+        """Test that every recognised attribute carries an OCR confidence"""
+        parser_result = parse_screenshot(cv2.imread("tests/Normal_3.jpg"))
+        assert set(parser_result.confidence) == {"gear_set", "gear_type"}
+        for stat in (parser_result.main_stat, *parser_result.sub_stats):
+            assert set(stat.confidence) == {"stat_type", "stat_value"}
+            assert all(0 < confidence <= 1 for confidence in stat.confidence.values())
+
+    def test_transcript(self):
+        """Test that a stored transcript gives back the same gear without OCR"""
+        transcript = transcribe_screenshot(cv2.imread("tests/Normal_3.jpg"))
+        stored = Transcript.from_dict(json.loads(json.dumps(transcript.as_dict())))
+        assert parse_transcript(stored) == parse_screenshot(cv2.imread("tests/Normal_3.jpg"))
+
 
 @pytest.mark.parametrize(
     "file_name,gear_object",
@@ -130,3 +167,17 @@ class TestForeignScreenshots:
         scaling_factor = calibrate_scale(image, rounds=2, sweep_steps=[50, 20])
         parser_result = parse_screenshot(rescale(image, *calculate_rescaled_size(image, scaling_factor)))
         assert parser_result == gear_object
+
+    def test_feature_calibration(self, file_name, gear_object):
+        """Test feature-based calibration for foreign screenshots"""
+        image = cv2.imread(file_name)
+        scaling_factor = calibrate_scale_by_features(image)
+        parser_result = parse_screenshot(rescale(image, *calculate_rescaled_size(image, scaling_factor)))
+        assert parser_result == gear_object
+
+    def test_crop_first_parsing(self, file_name, gear_object):
+        """Test parsing unscaled foreign screenshots by rescaling only the info box"""
+        image = cv2.imread(file_name)
+        scaling_factor = calibrate_scale_by_features(image)
+        parser_result = parse_screenshot(image, scaling_factor=scaling_factor)
+        assert parser_result == gear_object
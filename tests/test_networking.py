@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from agf_toolkit.networking.payload import decode_payload
+from agf_toolkit.processor.gear import Gear
+
+
+@pytest.fixture
+def gear_encoded():
+    return r"5,5,2,3,10,-1,43%,7,4,12.2,9,1,40%,6,3,0.4%,1,2,988.0"
+
+
+@pytest.fixture
+def named_payload():
+    return json.dumps(
+        {
+            "code": 0,
+            "data": {
+                "inventory": [
+                    {
+                        "gear_set": "DEF set",
+                        "gear_type": "Aiming Component",
+                        "gear_rarity": "Purple",
+                        "gear_star": 3,
+                        "main_stat": {"stat_type": "Status ACC", "stat_value": "43%", "rarity": None},
+                        "sub_stats": [
+                            {"stat_type": "SPD", "stat_value": 12.2, "rarity": "Green"},
+                            {"stat_type": "CRIT DMG", "stat_value": "40%", "rarity": "Yellow"},
+                            {"stat_type": "HP (%)", "stat_value": "0.4%", "rarity": "Blue"},
+                            {"stat_type": "ATK", "stat_value": 988, "rarity": "Purple"},
+                        ],
+                    },
+                    {
+                        "gear_set": 10,
+                        "gear_type": 1,
+                        "gear_rarity": 5,
+                        "gear_star": 1,
+                        "main_stat": {"stat_type": 1, "stat_value": 10, "rarity": -1},
+                        "sub_stats": [],
+                    },
+                ]
+            },
+        }
+    )
+
+
+class TestPayloadDecoding:
+    """Test decoding of intercepted JSON payloads."""
+
+    def test_decode_inventory(self, named_payload, gear_encoded):
+        gears = decode_payload(named_payload)
+        assert [gear.encode() for gear in gears] == [gear_encoded, "10,1,5,1,1,-1,10.0"]
+
+    def test_decode_non_json(self):
+        assert decode_payload(b"\x89PNG\r\n") == []
+
+    def test_decode_custom_schema(self, gear_encoded):
+        schema = {
+            "gear_set": "suit",
+            "gear_type": "slot",
+            "gear_rarity": "quality",
+            "gear_star": "star",
+            "main_stat": "main",
+            "sub_stats": "subs",
+            "stat_type": "attr",
+            "stat_value": "val",
+            "stat_rarity": "grade",
+        }
+        payload = {
+            "suit": 5,
+            "slot": 5,
+            "quality": 2,
+            "star": 3,
+            "main": {"attr": 10, "val": "43%"},
+            "subs": [
+                {"attr": 7, "grade": 4, "val": 12.2},
+                {"attr": 9, "grade": 1, "val": "40%"},
+                {"attr": 6, "grade": 3, "val": "0.4%"},
+                {"attr": 1, "grade": 2, "val": 988},
+            ],
+        }
+        assert decode_payload(json.dumps([payload]), schema) == [Gear.decode(gear_encoded)]
+
+
+class TestRecordedFlows:
+    """Test the mitmproxy addon against flow files recorded without a live game."""
+
+    def test_read_flows(self, tmp_path, named_payload, gear_encoded):
+        io = pytest.importorskip("mitmproxy.io")
+        tflow = pytest.importorskip("mitmproxy.test.tflow")
+        from agf_toolkit.networking.addon import GearCapture, read_flows
+
+        flow_file = tmp_path / "session.flow"
+        with open(flow_file, "wb") as file:
+            writer = io.FlowWriter(file)
+            for host, body in (("api.example", named_payload), ("cdn.example", "[]")):
+                flow = tflow.tflow(resp=True)
+                flow.request.host = host
+                flow.response.headers["content-type"] = "application/json"
+                flow.response.set_content(body.encode())
+                writer.add(flow)
+
+        gears = list(read_flows(flow_file, GearCapture(hosts=["api.example"])))
+        assert [gear.encode() for gear in gears] == [gear_encoded, "10,1,5,1,1,-1,10.0"]
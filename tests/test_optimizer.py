@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from agf_toolkit.optimizer.team import GEAR_TYPES, CharacterGoal, optimize_team
+from agf_toolkit.processor.constant import (
+    GEAR_TYPE_MAPPING,
+    SET_NAME_MAPPING,
+    STAT_TYPE_MAPPING,
+)
+from agf_toolkit.processor.gear import Gear
+
+
+def _gear(gear_type=1, subs=(), gear_set=1, star=6):
+    """A gear with a flat ATK main stat and the given (stat type code, value) sub stats."""
+    fields = [gear_set, gear_type, 1, star, 1, -1, "100.0"]
+    for stat_type, value in subs:
+        fields += [stat_type, 1, value]
+    return Gear.decode(",".join(map(str, fields)))
+
+
+CRIT_DMG = STAT_TYPE_MAPPING["CRIT DMG"]
+ATK_PERCENT = STAT_TYPE_MAPPING["ATK (%)"]
+SPD = STAT_TYPE_MAPPING["SPD"]
+
+
+def _assigned(allocation):
+    return [id(gear) for loadout in allocation.loadouts for gear in loadout.gears.values()]
+
+
+class TestTeamOptimizer:
+    """Test team-wide allocation of gears with exclusive ownership."""
+
+    def test_beats_greedy(self):
+        """The best weapon goes to whoever needs it most, not to whoever comes first."""
+        weapons = [
+            _gear(subs=[(CRIT_DMG, "60%"), (ATK_PERCENT, "20%")]),
+            _gear(subs=[(CRIT_DMG, "20%"), (ATK_PERCENT, "40%")]),
+        ]
+        goals = [CharacterGoal("A", {"CRIT DMG": 1, "ATK (%)": 1}), CharacterGoal("B", {"CRIT DMG": 1})]
+        allocation = optimize_team(weapons, goals)
+        assert allocation.optimal
+        assert allocation.loadouts[0].gears == {"Weapon System": weapons[1]}
+        assert allocation.loadouts[1].gears == {"Weapon System": weapons[0]}
+        assert allocation.score == pytest.approx(20 / 60 + 1 + 1)
+
+    def test_exclusive_ownership(self):
+        """No gear is given twice, and every character gets one gear per type while there are enough."""
+        gears = [_gear(gear_type, [(CRIT_DMG, f"{value}%")]) for gear_type in range(1, 7) for value in (10, 20, 30)]
+        goals = [CharacterGoal(name, {"CRIT DMG": 1}) for name in "ABC"]
+        allocation = optimize_team(gears, goals)
+        assert len(set(_assigned(allocation))) == len(_assigned(allocation)) == 18
+        assert all(list(loadout.gears) == list(GEAR_TYPES) for loadout in allocation.loadouts)
+
+    def test_min_stats(self):
+        """A stat minimum is met at the expense of score."""
+        gears = [_gear(subs=[(CRIT_DMG, "60%")]), _gear(subs=[(CRIT_DMG, "30%"), (SPD, "10.0")])]
+        allocation = optimize_team(gears, [CharacterGoal("A", {"CRIT DMG": 1}, min_stats={"SPD": 5})])
+        assert allocation.loadouts[0].gears == {"Weapon System": gears[1]}
+        assert allocation.loadouts[0].satisfied
+        assert allocation.loadouts[0].stats["SPD"] == 10
+
+    def test_gear_sets(self):
+        """Set requirements are met, leaving the other gears to the rest of the team."""
+        gears = [_gear(gear_type, [(CRIT_DMG, "60%")], gear_set=1) for gear_type in (1, 2)]
+        gears += [_gear(gear_type, [(CRIT_DMG, "20%")], gear_set=SET_NAME_MAPPING["SPD set"]) for gear_type in (1, 2)]
+        goals = [
+            CharacterGoal("A", {"CRIT DMG": 1}),
+            CharacterGoal("B", {"CRIT DMG": 1}, gear_sets={"SPD set": 2}, priority=10),
+        ]
+        allocation = optimize_team(gears, goals)
+        assert list(allocation.loadouts[0].gears.values()) == gears[:2]
+        assert list(allocation.loadouts[1].gears.values()) == gears[2:]
+        assert all(loadout.satisfied for loadout in allocation.loadouts)
+
+    def test_unsatisfiable(self):
+        """A character whose constraints can't be met still gets gears, without spoiling the others'."""
+        gears = [_gear(subs=[(SPD, "10.0")]), _gear(subs=[(SPD, "4.0"), (CRIT_DMG, "50%")])]
+        goals = [
+            CharacterGoal("A", {"CRIT DMG": 1}, min_stats={"SPD": 100}),
+            CharacterGoal("B", {"CRIT DMG": 1}, min_stats={"SPD": 8}),
+        ]
+        allocation = optimize_team(gears, goals)
+        assert [loadout.satisfied for loadout in allocation.loadouts] == [False, True]
+        assert allocation.loadouts[0].gears == {"Weapon System": gears[1]}
+        assert allocation.loadouts[1].gears == {"Weapon System": gears[0]}
+
+    def test_min_star(self):
+        gears = [_gear(subs=[(CRIT_DMG, "60%")], star=4), _gear(subs=[(CRIT_DMG, "10%")], star=6)]
+        allocation = optimize_team(gears, [CharacterGoal("A", {"CRIT DMG": 1}, min_star=5)])
+        assert allocation.loadouts[0].gears == {"Weapon System": gears[1]}
+
+    def test_invalid_goals(self):
+        with pytest.raises(ValueError):
+            optimize_team([], [CharacterGoal("A", {"Luck": 1})])
+        with pytest.raises(ValueError):
+            optimize_team([], [CharacterGoal("A", {}, gear_sets={"Hat set": 2})])
+        with pytest.raises(ValueError):
+            optimize_team([], [CharacterGoal("A", {}, gear_sets={"SPD set": 4, "ATK set": 4})])
+        with pytest.raises(ValueError):
+            optimize_team([], [CharacterGoal("A", {}), CharacterGoal("A", {})])
+
+    def test_large_inventory(self):
+        """A team of 5 is allocated a few thousand gears quickly, meeting every constraint."""
+        rng = np.random.default_rng(0)
+        stat_types = np.array([code for code in STAT_TYPE_MAPPING.values() if code > 0])
+        gears = []
+        for _ in range(3000):
+            subs = [(stat_type, f"{rng.integers(1, 20)}.0") for stat_type in rng.choice(stat_types, 4, replace=False)]
+            gears.append(_gear(rng.integers(1, 7), subs, gear_set=rng.integers(1, 13), star=rng.integers(3, 7)))
+        goals = [
+            CharacterGoal(f"Character {i}", {"CRIT DMG": 1, "Critical": 1} if i % 2 else {"HP (%)": 1}, {"SPD": 60})
+            for i in range(5)
+        ]
+        goals[0] = goals[0]._replace(gear_sets={"SPD set": 4}, min_star=5)
+
+        allocation = optimize_team(gears, goals, time_limit=60)
+        assert len(set(_assigned(allocation))) == len(_assigned(allocation)) == 30
+        assert all(loadout.satisfied for loadout in allocation.loadouts)
+        assert all(gear.gear_star >= 5 for gear in allocation.loadouts[0].gears.values())
+        assert sum(gear.gear_set == "SPD set" for gear in allocation.loadouts[0].gears.values()) >= 4
+        assert {GEAR_TYPE_MAPPING[gear_type] for gear_type in allocation.loadouts[0].gears} == set(range(1, 7))
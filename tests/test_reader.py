@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.reader import (
+    MAX_STATS,
+    iter_chunk_ranges,
+    iter_decoded_chunks,
+    iter_gears,
+)
+
+ENCODED_GEARS = [f"{i % 12 + 1},{i % 6 + 1},1,6,1,-1,{i}.0,8,2,{i % 10}.5%" for i in range(200)]
+MALFORMED = {50: "1,2,3", 120: "5,5,2,3,10,-1,43%,7,4"}
+
+
+@pytest.fixture
+def dump(tmp_path):
+    lines = list(ENCODED_GEARS)
+    for index, line in sorted(MALFORMED.items()):
+        lines.insert(index, line)
+    path = tmp_path / "dump.txt"
+    path.write_text("\n".join(lines) + "\n\n")
+    return path, lines
+
+
+class TestStreamingReader:
+    """Test chunked decoding of encoded gear dumps."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 100, 1 << 20])
+    def test_chunk_ranges(self, dump, chunk_size):
+        path, _ = dump
+        data = path.read_bytes()
+        ranges = list(iter_chunk_ranges(path, chunk_size))
+
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert all(data[end - 1 : end] == b"\n" for _, end in ranges)
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_gears(self, dump, workers):
+        path, lines = dump
+        malformed = []
+        gears = list(iter_gears(path, chunk_size=256, workers=workers, on_malformed=malformed.append))
+
+        assert gears == [Gear.decode(line) for line in ENCODED_GEARS]
+        data = path.read_bytes()
+        assert [line.line for line in malformed] == [MALFORMED[50], MALFORMED[120]]
+        assert all(data[i.offset :].startswith(i.line.encode()) for i in malformed)
+
+    def test_columnar(self, dump):
+        path, _ = dump
+        batches = list(iter_decoded_chunks(path, columnar=True, chunk_size=1000, on_malformed=None))
+        batch = {name: np.concatenate([i[name] for i in batches]) for name in batches[0]}
+
+        assert len(batch["offset"]) == len(ENCODED_GEARS)
+        assert batch["stat_value"].shape == (len(ENCODED_GEARS), MAX_STATS)
+        assert batch["gear_set"][:3].tolist() == [1, 2, 3]
+        assert batch["stat_value"][7, :2].tolist() == [7.0, 7.5]
+        assert batch["stat_is_percent"][7, :3].tolist() == [False, True, False]
+        assert batch["stat_type"][0].tolist() == [1, 8, -1, -1, -1] and math.isnan(batch["stat_value"][0, 2])
+
+        # Columns can be filtered without building Gear objects, e.g. Critical sub stats of at least 9%
+        mask = ((batch["stat_type"] == 8) & (batch["stat_value"] >= 9)).any(axis=1)
+        assert mask.sum() == len(ENCODED_GEARS) // 10
+
+    def test_columnar_ascii_only(self, tmp_path):
+        """Non-ASCII digits are malformed rather than decoded as numbers."""
+        path = tmp_path / "dump.txt"
+        path.write_text("1,1,1,6,1,-1,4\u0663%\n1,1,1,6,1,-1,43%\n", encoding="utf-8")
+        malformed = []
+        batches = list(iter_decoded_chunks(path, columnar=True, on_malformed=malformed.append))
+
+        assert [line.offset for line in malformed] == [0]
+        assert sum(len(batch["offset"]) for batch in batches) == 1
+
+    def test_empty(self, tmp_path):
+        path = tmp_path / "empty.txt"
+        path.write_text("")
+        assert not list(iter_gears(path))
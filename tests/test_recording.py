@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+import pytest
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.recording import (
+    ingest_recording,
+    iter_frames,
+    select_stable_frames,
+)
+
+SHADES = (40, 120, 200)
+HOLD_FRAMES = 8
+TRANSITION_FRAMES = 3
+
+
+def _screen(shade):
+    image = np.full((120, 160, 3), 30, dtype=np.uint8)
+    image[20:100, 40:120] = shade
+    return image
+
+
+@pytest.fixture(scope="module")
+def recording(tmp_path_factory):
+    """A recording showing each shade for a while, with fading transitions in between."""
+    path = tmp_path_factory.mktemp("recording") / "recording.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (160, 120))
+    for i, shade in enumerate(SHADES):
+        if i:
+            for step in range(1, TRANSITION_FRAMES + 1):
+                fade = SHADES[i - 1] + (shade - SHADES[i - 1]) * step // (TRANSITION_FRAMES + 1)
+                writer.write(_screen(fade))
+        for _ in range(HOLD_FRAMES):
+            writer.write(_screen(shade))
+    writer.release()
+    return path
+
+
+def _parser(image, scaling_factor):
+    return Gear(gear_star=int(round(image[60, 80, 0] / 40)))
+
+
+class TestRecording:
+    def test_iter_frames(self, recording):
+        """Every frame is decoded in order, or every stride-th one."""
+        total = len(SHADES) * HOLD_FRAMES + (len(SHADES) - 1) * TRANSITION_FRAMES
+        frames = list(iter_frames(recording))
+        assert [frame.number for frame in frames] == list(range(total))
+        assert frames[0].image.shape == (120, 160, 3)
+        assert [frame.number for frame in iter_frames(recording, stride=4)] == list(range(0, total, 4))
+
+    def test_iter_frames_missing(self, tmp_path):
+        """A video that can't be opened raises."""
+        with pytest.raises(ValueError):
+            list(iter_frames(tmp_path / "missing.avi"))
+
+    def test_select_stable_frames(self, recording):
+        """One settled frame is picked per distinct screen, skipping the transitions."""
+        picked = list(select_stable_frames(iter_frames(recording)))
+        assert [int(frame.image[60, 80, 0]) // 10 for frame in picked] == [shade // 10 for shade in SHADES]
+        assert all(frame.number % (HOLD_FRAMES + TRANSITION_FRAMES) >= 2 for frame in picked)
+
+    def test_select_stable_frames_region(self, recording):
+        """Changes outside the info box region are ignored."""
+        picked = list(select_stable_frames(iter_frames(recording), info_box_region=(0, 0, 30, 120)))
+        assert len(picked) == 1
+
+    @pytest.mark.parametrize("workers", (1, 3))
+    def test_ingest_recording(self, recording, workers):
+        """Picked frames are parsed, and results come back in recording order."""
+        results = list(ingest_recording(recording, parser=_parser, workers=workers))
+        assert [gear.gear_star for _, gear in results] == [1, 3, 5]
+        assert [frame.number for frame, _ in results] == sorted(frame.number for frame, _ in results)
@@ -0,0 +1,157 @@
+import time
+
+import numpy as np
+import pytest
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.replay import (
+    FrameArchiveWriter,
+    ReplayDevice,
+    benchmark_replay,
+    iter_archive,
+    record_session,
+)
+
+SHADES = (40, 120, 200)
+HOLD_FRAMES = 5
+
+
+def _screen(shade, size=(120, 160)):
+    image = np.full((*size, 3), 30, dtype=np.uint8)
+    image[20:100, 40:120] = shade
+    return image
+
+
+@pytest.fixture
+def session():
+    """Frames of a session showing each shade for a while, 0.05s apart."""
+    return [(i * 0.05, _screen(shade)) for i, shade in enumerate(s for s in SHADES for _ in range(HOLD_FRAMES))]
+
+
+@pytest.fixture
+def archive(tmp_path, session):
+    path = tmp_path / "session.agfrec"
+    with FrameArchiveWriter(path, keyframe_interval=4) as writer:
+        for timestamp, image in session:
+            writer.write(image, timestamp)
+    return path
+
+
+class _FakeDevice:
+    serial = "fake"
+
+    def __init__(self):
+        self.frames = 0
+
+    def screenshot(self):
+        self.frames += 1
+        return _screen(self.frames % 256)
+
+
+def _parser(image, scaling_factor):
+    return Gear(gear_star=int(round(image[60, 80, 0] / 40)))
+
+
+class TestArchive:
+    def test_round_trip(self, archive, session):
+        """Every frame is restored exactly, with its timestamp, across keyframes."""
+        frames = list(iter_archive(archive))
+        assert len(frames) == len(session)
+        for (timestamp, image), (expected_timestamp, expected) in zip(frames, session):
+            assert timestamp == expected_timestamp
+            np.testing.assert_array_equal(image, expected)
+        assert not frames[0][1].flags.writeable
+
+    def test_shape_change_and_grayscale(self, tmp_path):
+        """Frames of different sizes and grayscale frames round trip."""
+        images = [_screen(40), _screen(80, (60, 80)), np.full((60, 80), 7, dtype=np.uint8), _screen(120)]
+        with FrameArchiveWriter(tmp_path / "mixed.agfrec") as writer:
+            for image in images:
+                writer.write(image)
+        for (_, image), expected in zip(iter_archive(tmp_path / "mixed.agfrec"), images, strict=True):
+            np.testing.assert_array_equal(image, expected)
+
+    def test_compression(self, archive, session):
+        """Deltas of mostly identical frames are much smaller than the raw frames."""
+        assert archive.stat().st_size * 20 < sum(image.nbytes for _, image in session)
+
+    def test_buffer_reuse(self, tmp_path):
+        """Frames written from a reused buffer are stored as they were when written."""
+        buffer = _screen(40)
+        with FrameArchiveWriter(tmp_path / "reuse.agfrec") as writer:
+            for shade in SHADES:
+                buffer[20:100, 40:120] = shade
+                writer.write(buffer)
+        assert [int(image[60, 80, 0]) for _, image in iter_archive(tmp_path / "reuse.agfrec")] == list(SHADES)
+
+    def test_truncated(self, archive, session):
+        """A truncated last frame is dropped."""
+        archive.write_bytes(archive.read_bytes()[:-10])
+        assert len(list(iter_archive(archive))) == len(session) - 1
+
+    def test_not_an_archive(self, tmp_path):
+        """Files that aren't archives raise."""
+        (tmp_path / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+        with pytest.raises(ValueError):
+            list(iter_archive(tmp_path / "image.png"))
+
+    def test_invalid_keyframe_interval(self, tmp_path):
+        with pytest.raises(ValueError):
+            FrameArchiveWriter(tmp_path / "session.agfrec", keyframe_interval=0)
+
+
+class TestReplayDevice:
+    def test_frames(self, archive, session):
+        """Frames are served in order, then the device raises."""
+        device = ReplayDevice(archive, speed=None)
+        for _, expected in session:
+            np.testing.assert_array_equal(device.screenshot(), expected)
+        with pytest.raises(EOFError):
+            device.screenshot()
+        assert device.frames_served == len(session)
+
+    def test_cadence(self, archive, session):
+        """Frames are served at the recorded cadence, divided by the speed."""
+        for speed in (1.0, 4.0):
+            device = ReplayDevice(archive, speed=speed)
+            device.screenshot()
+            started_at = time.monotonic()
+            for _ in session[1:]:
+                device.screenshot()
+            expected = session[-1][0] / speed
+            assert expected <= time.monotonic() - started_at + 0.01 < expected + 0.5
+
+    def test_loop(self, archive, session):
+        """A looping device starts over once exhausted."""
+        device = ReplayDevice(archive, speed=None, loop=True)
+        images = [device.screenshot() for _ in range(len(session) + 2)]
+        np.testing.assert_array_equal(images[len(session)], session[0][1])
+
+    def test_shell(self, archive):
+        """Shell commands are recorded but not run."""
+        device = ReplayDevice(archive)
+        assert device.shell(["input", "tap", "10", "20"]) == ""
+        assert device.commands == [["input", "tap", "10", "20"]]
+
+    def test_invalid_speed(self, archive):
+        with pytest.raises(ValueError):
+            ReplayDevice(archive, speed=0)
+
+
+class TestRecordAndBenchmark:
+    def test_record_session(self, tmp_path):
+        """Screenshots of a device are recorded until enough frames are taken."""
+        device = _FakeDevice()
+        assert record_session(device, tmp_path / "session.agfrec", interval=0, max_frames=6) == 6
+        frames = list(iter_archive(tmp_path / "session.agfrec"))
+        assert [int(image[60, 80, 0]) for _, image in frames] == list(range(1, 7))
+        assert [timestamp for timestamp, _ in frames] == sorted(timestamp for timestamp, _ in frames)
+
+    def test_benchmark_replay(self, archive, session):
+        """Every frame is captured, and one settled frame per shade is parsed."""
+        parsed = []
+        results = benchmark_replay(archive, parser=lambda image, _: parsed.append(_parser(image, _)))
+        assert results["frames"] == len(session)
+        assert results["parsed"] == len(SHADES)
+        assert [gear.gear_star for gear in parsed] == [1, 3, 5]
+        assert results["total_seconds"] >= results["capture_seconds"] + results["parse_seconds"]
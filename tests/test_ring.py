@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from agf_toolkit import templates
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.processor.image import extract_info_box, extract_info_box_rescaled
+from agf_toolkit.utils.farm import CaptureFarm, parse_info_box
+from agf_toolkit.utils.ring import FrameRing, create_executor, parse_slot
+
+
+def _parser(image, scaling_factor):
+    return Gear(gear_star=int(image.sum() // image.size))
+
+
+def _height_parser(image, scaling_factor):
+    return Gear(gear_star=image.shape[0])
+
+
+def _slow_parser(image, scaling_factor):
+    time.sleep(0.2)
+    return _parser(image, scaling_factor)
+
+
+class _FakeDevice:
+    def __init__(self, serial, value):
+        self.serial = serial
+        self.value = value
+
+    def screenshot(self):
+        time.sleep(0.01)
+        return np.full((90, 160, 3), self.value, dtype=np.uint8)
+
+
+class _ScreenshotDevice:
+    serial = "screenshot"
+
+    def screenshot(self):
+        return cv2.imread("tests/Normal_1.jpg")
+
+
+async def _collect(farm, **kwargs):
+    return [result async for result in farm.run(**kwargs)]
+
+
+@pytest.fixture
+def ring():
+    with FrameRing(slots=3, slot_size=90 * 160 * 3, crop_info_box=False) as frame_ring:
+        yield frame_ring
+
+
+class TestFrameRing:
+    """Test slot allocation, reference counting and hand-off to worker processes."""
+
+    def test_put_and_view(self, ring):
+        """Frames are copied into shared memory once, and views read them in place."""
+        image = np.arange(90 * 160 * 3, dtype=np.uint8).reshape(90, 160, 3)
+        crop = image[10:50, 20:100]
+        handle = ring.put(crop)
+        view = ring.view(handle)
+        assert handle.shape == (40, 80, 3)
+        assert np.array_equal(view, crop)
+        assert not np.shares_memory(view, image)
+        assert np.shares_memory(view, ring.view(handle))
+
+        with pytest.raises(ValueError):
+            ring.put(np.zeros((91, 160, 3), dtype=np.uint8))
+
+    def test_info_box_crops(self):
+        """By default, only the info box of a frame is put into the ring, with slots sized for it."""
+        with FrameRing(slots=2) as info_box_ring:
+            assert info_box_ring.slot_size >= templates.INFO_BOX.nbytes
+            image = cv2.imread("tests/Normal_1.jpg")
+            handle = info_box_ring.put(image)
+            assert handle.shape == templates.INFO_BOX.shape
+            assert np.array_equal(info_box_ring.view(handle), extract_info_box(image, templates.INFO_BOX))
+
+            image = cv2.imread("tests/Foreign_1.png")
+            handle = info_box_ring.put(image, scaling_factor=0.7529)
+            rescaled = extract_info_box_rescaled(image, templates.INFO_BOX, 0.7529)
+            assert np.array_equal(info_box_ring.view(handle), rescaled)
+
+            with create_executor(info_box_ring, workers=1) as executor:
+                assert executor._initargs[1] is parse_info_box
+
+        with pytest.raises(ValueError):
+            FrameRing(slots=1, crop_info_box=False)
+
+    def test_refcounts(self, ring):
+        handle = ring.put(np.ones((2, 2), dtype=np.float32), refs=2)
+        ring.retain(handle)
+        for _ in range(3):
+            assert ring.held() == 1
+            ring.release(handle)
+        assert ring.held() == 0
+        with pytest.raises(ValueError):
+            ring.release(handle)
+
+    def test_backpressure(self, ring):
+        """Putting into a full ring waits until a slot is released."""
+        handles = [ring.put(np.full((4, 4), i, dtype=np.uint8)) for i in range(3)]
+        with pytest.raises(TimeoutError):
+            ring.put(np.zeros((4, 4), dtype=np.uint8), timeout=0.05)
+
+        ring.release(handles[1])
+        handle = ring.put(np.full((4, 4), 7, dtype=np.uint8), timeout=0.05)
+        assert handle.slot == handles[1].slot
+        assert ring.view(handles[0])[0, 0] == 0 and ring.view(handles[2])[0, 0] == 2
+
+    def test_workers(self, ring):
+        """Workers parse frames from their slots and release them."""
+        with create_executor(ring, workers=2, parser=_parser) as executor:
+            futures = [
+                executor.submit(parse_slot, ring.put(np.full((90, 160, 3), i, np.uint8)), None) for i in range(9)
+            ]
+            assert [future.result().gear_star for future in futures] == list(range(9))
+        assert ring.held() == 0
+
+    def test_parse_slot_outside_worker(self, ring):
+        with pytest.raises(RuntimeError):
+            parse_slot(ring.put(np.zeros((4, 4), dtype=np.uint8)), None)
+
+    def test_farm(self, ring):
+        """The capture farm hands frames to process workers through the ring."""
+        with create_executor(ring, workers=2, parser=_parser) as executor:
+            farm = CaptureFarm(
+                [_FakeDevice("a", 1), _FakeDevice("b", 2)], executor=executor, min_interval=0.02, ring=ring
+            )
+            results = asyncio.run(_collect(farm, max_frames=10))
+
+        assert len(results) == 10
+        assert all(gear.gear_star == {"a": 1, "b": 2}[frame.device] for frame, gear in results)
+
+        with pytest.raises(ValueError):
+            CaptureFarm([_FakeDevice("a", 1)], ring=ring)
+
+    def test_farm_info_boxes(self):
+        """The capture farm hands only info boxes to the workers of a cropping ring."""
+        with FrameRing(slots=2) as info_box_ring:
+            with create_executor(info_box_ring, workers=1, parser=_height_parser) as executor:
+                farm = CaptureFarm([_ScreenshotDevice()], executor=executor, min_interval=0.01, ring=info_box_ring)
+                results = asyncio.run(_collect(farm, max_frames=2))
+            assert [gear.gear_star for _, gear in results] == [templates.INFO_BOX.shape[0]] * 2
+            assert info_box_ring.held() == 0
+
+    def test_farm_stops_with_full_ring(self):
+        """Stopping a farm waiting on a full ring releases every slot of the frames it dropped."""
+        with FrameRing(slots=2, slot_size=90 * 160 * 3, crop_info_box=False) as small_ring:
+            with create_executor(small_ring, workers=1, parser=_slow_parser) as executor:
+                devices = [_FakeDevice(serial, 1) for serial in "abcd"]
+                farm = CaptureFarm(devices, executor=executor, min_interval=0.01, ring=small_ring)
+                results = asyncio.run(_collect(farm, max_frames=3))
+            assert len(results) == 3
+            assert small_ring.held() == 0
@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+
+from agf_toolkit import templates
+
+
+class TestTemplateBundle:
+    """Test the precompiled template bundle."""
+
+    def test_up_to_date(self, tmp_path):
+        """The shipped bundle is what the source PNGs compile to."""
+        templates.build_bundle(tmp_path)
+        built = sorted(path.name for path in tmp_path.iterdir())
+        assert built == sorted(path.name for path in templates.BUNDLE_DIR.iterdir())
+        for name in built:
+            assert np.array_equal(np.load(tmp_path / name), np.load(templates.BUNDLE_DIR / name)), name
+
+    def test_memory_mapped(self):
+        assert isinstance(templates.INFO_BOX, np.memmap) and not templates.INFO_BOX.flags.writeable
+        assert templates.INFO_BOX is templates.INFO_BOX
+        assert np.array_equal(templates._load("sub_stats"), templates.SUB_STATS)
+
+    def test_derived_forms(self):
+        assert templates.INFO_BOX_GRAY.shape == templates.INFO_BOX.shape[:2]
+        assert set(np.unique(templates.STARS_THRESH[6])) <= {0, 255}
+        assert np.array_equal(templates.STARS_LAB[1], cv2.cvtColor(templates.STARS[1], cv2.COLOR_BGR2LAB))
+
+    def test_scaled_info_box(self):
+        template_h, template_w = templates.INFO_BOX.shape[:2]
+        assert templates.get_scaled_info_box(0.75).shape == (round(template_h / 0.75), round(template_w / 0.75), 3)
+        assert templates.get_scaled_info_box(1080 / 720).shape == (round(template_h / 1.5), round(template_w / 1.5), 3)
@@ -0,0 +1,155 @@
+import cv2
+import pytest
+
+from agf_toolkit import templates
+from agf_toolkit.__main__ import main
+from agf_toolkit.abc import OCRBackend, OCRLine
+from agf_toolkit.processor import text
+from agf_toolkit.processor.gear import Gear, Stat
+from agf_toolkit.processor.image import (
+    extract_gear_star,
+    extract_info_box,
+    extract_sub_stat_rarity,
+    rarity_from_pixels,
+    sample_rarity_pixels,
+    score_gear_star,
+)
+from agf_toolkit.processor.transcript import StatRow, Transcript, TranscriptStore
+from agf_toolkit.processor.utils import parse_transcript
+
+EXPECTED_GEAR = Gear(
+    gear_set="SPD set",
+    gear_type="Weapon System",
+    gear_rarity="Yellow",
+    gear_star=6,
+    main_stat=Stat(stat_type="ATK", stat_value=125.0, stat_rarity=None),
+    sub_stats=[
+        Stat(stat_type="HP", stat_value=527.0, stat_rarity="Blue"),
+        Stat(stat_type="Status ACC", stat_value="13.9%", stat_rarity="Blue"),
+        Stat(stat_type="Status RES", stat_value="9.2%", stat_rarity="Blue"),
+        Stat(stat_type="DEF", stat_value=104.0, stat_rarity="Purple"),
+    ],
+)
+
+
+class _NoOCR(OCRBackend):
+    def recognise_lines(self, images):
+        raise AssertionError("OCR must not run when parsing transcripts.")
+
+
+@pytest.fixture(autouse=True)
+def no_ocr(monkeypatch):
+    monkeypatch.setattr(text, "TEXT_BACKEND", _NoOCR())
+    monkeypatch.setattr(text, "NUMERIC_BACKEND", _NoOCR())
+
+
+@pytest.fixture(scope="module")
+def info_box():
+    return extract_info_box(cv2.imread("tests/Normal_3.jpg"), templates.INFO_BOX)
+
+
+@pytest.fixture
+def transcript(info_box):
+    """Transcript of Normal_3.jpg, with the OCR readings written out by hand."""
+    star_scores, six_star_pixels = score_gear_star(info_box, templates.STARS)
+    return Transcript(
+        lines=[OCRLine("SPD set", (40, 60, 160, 90), 0.97), OCRLine("Weapon System", (40, 100, 240, 130), 0.99)],
+        stat_rows=[
+            StatRow("ATK", 0.99, "125", 1.0),
+            StatRow("HP", 0.98, "527", 0.99),
+            StatRow("Status ACC", 0.97, "13.9%", 0.95),
+            StatRow("Status RES", 0.96, "9.2%", 0.97),
+            StatRow("DEF", 0.99, "104", 0.99),
+            StatRow("Enhance", 0.9, "+15", 0.9),
+        ],
+        rarity_pixels=sample_rarity_pixels(info_box),
+        star_scores=star_scores,
+        six_star_pixels=six_star_pixels,
+    )
+
+
+class TestTranscript:
+    """Test deriving gears from stored transcripts, without OCR."""
+
+    def test_pixel_readings(self, info_box):
+        """Stored pixel readings give the same results as reading the image."""
+        assert rarity_from_pixels(sample_rarity_pixels(info_box)) == extract_sub_stat_rarity(info_box)
+        star_scores, six_star_pixels = score_gear_star(info_box, templates.STARS)
+        assert set(star_scores) == set(range(1, 7))
+        assert six_star_pixels > 0
+        assert extract_gear_star(info_box, templates.STARS) == 6
+
+    def test_parse_transcript(self, transcript):
+        gear = parse_transcript(transcript)
+        assert gear == EXPECTED_GEAR
+        assert gear.sub_stats[1].confidence == {"stat_type": 0.97, "stat_value": 0.95}
+        assert gear.confidence == {"gear_set": 0.97, "gear_type": 0.99}
+
+    def test_parse_free_text_transcript(self, transcript):
+        """Transcripts read without a numeric backend hold the stats in the free text."""
+        free_text = transcript._replace(
+            lines=[
+                *transcript.lines,
+                OCRLine("ATK 125 HP 527 Status ACC", (40, 300, 500, 460), 0.9),
+                OCRLine("13.9% Status RES 9.2% DEF 104 ", (40, 460, 500, 560), 0.8),
+            ],
+            stat_rows=None,
+        )
+        gear = parse_transcript(free_text)
+        assert gear == EXPECTED_GEAR
+        # Names and values carry the confidence of their own lines
+        assert gear.sub_stats[1].confidence == {"stat_type": 0.9, "stat_value": 0.8}
+        assert gear.sub_stats[2].confidence == {"stat_type": 0.8, "stat_value": 0.8}
+
+    def test_line_confidence(self):
+        """Text is only found in lines holding it as whole tokens."""
+        lines = [OCRLine("110", (0, 0, 10, 10), 0.9), OCRLine("10.5%", (0, 0, 10, 10), 0.8)]
+        assert text.line_confidence(lines, "10") == 0.0
+        assert text.line_confidence([*lines, OCRLine("DEF 10", (0, 0, 10, 10), 0.6)], "10") == 0.6
+        assert text.line_confidence(lines, "10.5%") == 0.8
+        assert text.line_confidence(lines, None) == 0.0
+
+    def test_wrapped_line_confidence(self):
+        """Text wrapped over two lines gets their mean confidence."""
+        lines = [
+            OCRLine("Critical DMG", (0, 0, 10, 10), 0.9),
+            OCRLine("set", (0, 10, 10, 20), 0.7),
+            OCRLine("Critical DMG set", (0, 20, 10, 30), 0.6),
+        ]
+        assert text.line_confidence(lines[:2], "Critical DMG set") == pytest.approx(0.8)
+        assert text.line_confidence(lines, "Critical DMG set") == pytest.approx(0.8)
+        assert text.line_confidence(lines[1:], "Critical DMG set") == 0.6
+
+    def test_store(self, tmp_path, transcript):
+        path = tmp_path / "transcripts.jsonl"
+        with TranscriptStore(path) as store:
+            store.add("a.png", transcript)
+        with TranscriptStore(path) as store:
+            store.add(tmp_path / "b.png", transcript._replace(stat_rows=None))
+        with open(path, "a", encoding="utf-8") as file:
+            file.write('{"source": "broken"}\n')
+
+        stored = list(TranscriptStore(path))
+        assert [source for source, _ in stored] == ["a.png", str(tmp_path / "b.png")]
+        assert stored[0][1] == transcript
+        assert stored[1][1].stat_rows is None
+
+        with pytest.raises(RuntimeError):
+            TranscriptStore(path).add("c.png", transcript)
+
+    def test_reparse_command(self, tmp_path, transcript, capsys):
+        path = tmp_path / "transcripts.jsonl"
+        unknown_set = transcript._replace(lines=[OCRLine("Weapon System", (40, 100, 240, 130), 0.99)])
+        with TranscriptStore(path) as store:
+            for i, item in enumerate((transcript, unknown_set, transcript)):
+                store.add(f"{i}.png", item)
+
+        main(["reparse", str(path), "--format", "encoded"])
+        assert capsys.readouterr().out.split() == [EXPECTED_GEAR.encode(), Gear().encode(), EXPECTED_GEAR.encode()]
+
+        # Transcribed again by a resumed run
+        with TranscriptStore(path) as store:
+            store.add("1.png", transcript)
+            store.add("2.png", transcript)
+        main(["reparse", str(path), "--format", "encoded"])
+        assert capsys.readouterr().out.split() == [EXPECTED_GEAR.encode()] * 3
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.walker import GridLayout, InventoryWalker
+
+
+def _shade(index):
+    return 10 + index * 7 % 240
+
+
+INFO_BOX_REGION = (0, 300, 400, 100)
+
+
+class _FakeInventory:
+    """
+    Device showing the grid above an info box with the last tapped gear, a couple of screenshots after the tap.
+
+    The grid stops scrolling once its last row is visible, like the game's.
+    """
+
+    def __init__(self, layout, gears=22, lag=2):
+        self.layout = layout
+        self.lag = lag
+        self.rows = -(-gears // layout.columns)
+        self.scrolled_rows = 0
+        self.shown = None
+        self.pending = None
+        self.screenshots = 0
+        self.commands = []
+
+    def shell(self, command):
+        self.commands.append(command[1])
+        if command[1] == "swipe":
+            last_page = max(0, self.rows - self.layout.visible_rows)
+            self.scrolled_rows = min(self.scrolled_rows + self.layout.rows_per_swipe, last_page)
+            return
+        x, y = int(command[2]), int(command[3])
+        column = (x - self.layout.origin[0]) // self.layout.pitch[0]
+        row = (y - self.layout.origin[1]) // self.layout.pitch[1] + self.scrolled_rows
+        self.pending = [row * self.layout.columns + column, self.lag]
+
+    def screenshot(self):
+        self.screenshots += 1
+        if self.pending is not None:
+            self.pending[1] -= 1
+            if self.pending[1] < 0:
+                self.shown, self.pending = self.pending[0], None
+        image = np.zeros((400, 400, 3), dtype=np.uint8)
+        for visible_row in range(self.layout.visible_rows):
+            row = self.scrolled_rows + visible_row
+            if row < self.rows:
+                image[visible_row * 100 : (visible_row + 1) * 100] = 20 + row * 37 % 200
+        image[300:] = 0 if self.shown is None else _shade(self.shown)
+        return image
+
+
+def _parser(image, scaling_factor):
+    return Gear(gear_star=int(image[300, 0, 0]))
+
+
+def _walker(device, layout, **kwargs):
+    return InventoryWalker(device, layout, parser=_parser, info_box_region=INFO_BOX_REGION, **kwargs)
+
+
+@pytest.fixture
+def layout():
+    return GridLayout(origin=(50, 50), pitch=(100, 100), columns=4, visible_rows=3, rows_per_swipe=2)
+
+
+class TestInventoryWalker:
+    """Test the inventory walker against a fake device."""
+
+    def test_walk(self, layout):
+        """The last swipe only scrolls one row, as the grid has six rows."""
+        device = _FakeInventory(layout)
+        results = list(_walker(device, layout).walk(total=22))
+
+        assert [index for index, _ in results] == list(range(22))
+        assert [gear.gear_star for _, gear in results] == [_shade(i) for i in range(22)]
+        assert device.commands.count("swipe") == 2
+        assert device.scrolled_rows == 3
+
+    def test_full_pages(self, layout):
+        device = _FakeInventory(layout, gears=28)
+        results = list(_walker(device, layout).walk(total=28))
+
+        assert [gear.gear_star for _, gear in results] == [_shade(i) for i in range(28)]
+        assert device.scrolled_rows == 4
+
+    def test_grid_stuck(self, layout):
+        device = _FakeInventory(layout, gears=12)
+        with pytest.raises(RuntimeError, match="didn't scroll"):
+            list(_walker(device, layout).walk(total=22))
+
+    def test_resume(self, layout):
+        device = _FakeInventory(layout)
+        results = list(_walker(device, layout).walk(total=22, start=17))
+
+        assert [gear.gear_star for _, gear in results] == [_shade(i) for i in range(17, 22)]
+
+    def test_unchanged_screen(self, layout):
+        device = _FakeInventory(layout, lag=100)
+        walker = _walker(device, layout, max_polls=5)
+        ((_, gear),) = walker.walk(total=1)
+
+        assert gear.gear_star == 0
+        assert device.screenshots == 7  # Baseline, first capture and 5 polls
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from agf_toolkit.processor.gear import Gear
+from agf_toolkit.utils.writer import GearWriter, write_parsed
+
+ENCODED_GEARS = [f"{i % 12 + 1},{i % 6 + 1},1,6,1,-1,{i}.0" for i in range(25)]
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def _parser(encoded):
+    return Gear.decode(encoded)
+
+
+class TestGearWriter:
+    """Test streaming output and resuming from checkpoints."""
+
+    @pytest.mark.parametrize("output_format", ["json", "encoded"])
+    def test_stream(self, tmp_path, output_format):
+        path = tmp_path / "out.txt"
+        with GearWriter(path, output_format, flush_every=10) as writer:
+            assert write_parsed(ENCODED_GEARS, _parser, writer) == len(ENCODED_GEARS)
+
+        lines = path.read_text().splitlines()
+        if output_format == "json":
+            assert [json.loads(i) for i in lines] == [Gear.decode(gear).as_dict() for gear in ENCODED_GEARS]
+        else:
+            assert lines == ENCODED_GEARS
+        assert not writer.checkpoint_path.exists()
+
+    def test_resume(self, tmp_path):
+        path = tmp_path / "out.txt"
+
+        def _flaky_parser(encoded):
+            if encoded == ENCODED_GEARS[17]:
+                raise _Interrupted
+            return _parser(encoded)
+
+        with pytest.raises(_Interrupted):
+            with GearWriter(path, "encoded", flush_every=5) as writer:
+                write_parsed(ENCODED_GEARS, _flaky_parser, writer)
+        assert writer.checkpoint_path.exists()
+
+        with GearWriter(path, "encoded", flush_every=5, resume=True) as writer:
+            assert writer.completed == 17
+            assert write_parsed(ENCODED_GEARS, _parser, writer) == len(ENCODED_GEARS) - 17
+
+        assert path.read_text().splitlines() == ENCODED_GEARS
+
+    def test_resume_format_mismatch(self, tmp_path):
+        path = tmp_path / "out.txt"
+        GearWriter(path, "encoded").close(finished=False)
+        with pytest.raises(ValueError):
+            GearWriter(path, "json", resume=True)
+
+    def test_append(self, tmp_path):
+        path = tmp_path / "out.txt"
+        for gears in (ENCODED_GEARS[:3], ENCODED_GEARS[3:5]):
+            with GearWriter(path, "encoded", append=True) as writer:
+                write_parsed(gears, _parser, writer)
+        assert path.read_text().splitlines() == ENCODED_GEARS[:5]
+
+        with pytest.raises(ValueError):
+            GearWriter(path, "encoded", resume=True, append=True)